@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Service, ProductCategory, Product, Course, SiteSettings, ThreeDPrintingProject, ContactMessage
+from .changelist import FastChangeListMixin, IndexedSearchMixin, PrefixSearchMixin
+from .models import Service, ProductCategory, Product, Course, SiteSettings, ThreeDPrintingProject, ContactMessage, OutboxEmail, ArchivedContactMessage
 
 
 # Customize the default admin site
@@ -51,12 +52,15 @@ class ProductCategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(FastChangeListMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['name_en', 'name_ar', 'category', 'is_featured', 'order', 'created_at']
+    list_select_related = ['category']
     list_filter = ['category', 'is_featured', 'created_at']
     list_editable = ['order', 'is_featured']
     search_fields = ['name_en', 'name_ar', 'description_en', 'description_ar']
     ordering = ['order', 'name_en']
+    # Only columns an index can sort
+    sortable_by = ['order', 'created_at']
     
     fieldsets = (
         ('Category', {
@@ -75,12 +79,14 @@ class ProductAdmin(admin.ModelAdmin):
 
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(FastChangeListMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['title_en', 'title_ar', 'level', 'duration', 'is_featured', 'order', 'created_at']
     list_filter = ['level', 'is_featured', 'created_at']
     list_editable = ['order', 'is_featured']
     search_fields = ['title_en', 'title_ar', 'description_en', 'description_ar']
     ordering = ['order', 'title_en']
+    # Only columns an index can sort
+    sortable_by = ['order', 'created_at']
     
     fieldsets = (
         ('English Content', {
@@ -125,12 +131,14 @@ class SiteSettingsAdmin(admin.ModelAdmin):
 
 
 @admin.register(ThreeDPrintingProject)
-class ThreeDPrintingProjectAdmin(admin.ModelAdmin):
+class ThreeDPrintingProjectAdmin(FastChangeListMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['title_en', 'title_ar', 'material', 'print_time', 'is_featured', 'order', 'created_at']
     list_filter = ['is_featured', 'created_at']
     list_editable = ['order', 'is_featured']
     search_fields = ['title_en', 'title_ar', 'description_en', 'description_ar']
     ordering = ['order', 'title_en']
+    # Only columns an index can sort
+    sortable_by = ['order', 'created_at']
     
     fieldsets = (
         ('English Content', {
@@ -149,13 +157,17 @@ class ThreeDPrintingProjectAdmin(admin.ModelAdmin):
 
 
 @admin.register(ContactMessage)
-class ContactMessageAdmin(admin.ModelAdmin):
+class ContactMessageAdmin(FastChangeListMixin, PrefixSearchMixin, admin.ModelAdmin):
     list_display = ['name', 'email', 'subject', 'status', 'created_at']
     list_filter = ['status', 'created_at']
     list_editable = ['status']
-    search_fields = ['name', 'email', 'subject', 'message']
+    search_fields = ['name', 'email', 'subject']
+    prefix_search_fields = ['name', 'email', 'subject']
+    search_help_text = 'Matches the start of the name, email or subject. Older messages are in the archive.'
     readonly_fields = ['name', 'email', 'phone', 'subject', 'message', 'created_at']
     ordering = ['-created_at']
+    # Only columns an index can sort
+    sortable_by = ['status', 'created_at']
     
     fieldsets = (
         ('Contact Information', {
@@ -172,3 +184,62 @@ class ContactMessageAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         # Don't allow adding messages through admin (they come from form)
         return False
+
+
+@admin.register(ArchivedContactMessage)
+class ArchivedContactMessageAdmin(admin.ModelAdmin):
+    list_display = ['name', 'email', 'subject', 'status', 'created_at', 'archived_at']
+    list_filter = ['status']
+    search_fields = ['name', 'email', 'subject', 'message']
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at']
+    # Counting a large archive for every page costs more than the page itself
+    show_full_result_count = False
+
+    fieldsets = (
+        ('Contact Information', {
+            'fields': ('name', 'email', 'phone')
+        }),
+        ('Message Details', {
+            'fields': ('subject', 'message', 'status')
+        }),
+        ('Dates', {
+            'fields': ('created_at', 'updated_at', 'archived_at', 'original_id')
+        }),
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        # The archive is read-only; view permission still shows each message
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['recipient', 'subject']
+    list_select_related = ['contact_message']
+    readonly_fields = [
+        'contact_message', 'recipient', 'subject', 'body', 'attempts',
+        'last_error', 'sent_at', 'created_at'
+    ]
+    ordering = ['-created_at']
+
+    fieldsets = (
+        ('Email', {
+            'fields': ('contact_message', 'recipient', 'subject', 'body')
+        }),
+        ('Delivery', {
+            'fields': ('status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at', 'created_at')
+        }),
+    )
+
+    def has_add_permission(self, request):
+        # Emails are queued by the contact form
+        return False
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class ContentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'content'
+
+    def ready(self):
+        from . import cache, database, signals  # noqa: F401
+        checks.register(database.check_shared_cache, checks.Tags.caches)
+        checks.register(cache.check_shared_cache, checks.Tags.caches, deploy=True)
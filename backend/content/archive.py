@@ -0,0 +1,61 @@
+"""
+Archival of handled contact messages.
+
+``ContactMessage`` only needs the messages that still want attention. Replied
+and archived messages older than ``CONTACT_ARCHIVE_AFTER_DAYS`` are copied to
+``ArchivedContactMessage`` and deleted from the hot table, together with their
+outbox emails, one chunk per transaction so the single SQLite writer is only
+held briefly. Messages with emails still waiting to be sent are left alone.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedContactMessage, ContactMessage
+
+
+ARCHIVE_STATUSES = ('replied', 'archived')
+ARCHIVED_FIELDS = ('name', 'email', 'phone', 'subject', 'message', 'status', 'created_at', 'updated_at')
+
+
+def get_archive_after():
+    return timedelta(days=getattr(settings, 'CONTACT_ARCHIVE_AFTER_DAYS', 180))
+
+
+def get_archivable(older_than=None):
+    """Messages due for archival, oldest first."""
+    cutoff = timezone.now() - (older_than if older_than is not None else get_archive_after())
+    return (
+        ContactMessage.objects
+        .filter(status__in=ARCHIVE_STATUSES, created_at__lt=cutoff)
+        .exclude(emails__status='pending')
+        .order_by('created_at', 'id')
+    )
+
+
+def archive_chunk(older_than=None, chunk_size=500):
+    """Move one chunk of due messages to the archive. Returns the number moved."""
+    with transaction.atomic():
+        messages = list(get_archivable(older_than).values('id', *ARCHIVED_FIELDS)[:chunk_size])
+        if not messages:
+            return 0
+        ids = [message.pop('id') for message in messages]
+        ArchivedContactMessage.objects.bulk_create(
+            [ArchivedContactMessage(original_id=pk, **message) for pk, message in zip(ids, messages)],
+            # A message copied by an interrupted run is already in the archive
+            ignore_conflicts=True,
+        )
+        ContactMessage.objects.filter(pk__in=ids).delete()
+    return len(messages)
+
+
+def archive_contact_messages(older_than=None, chunk_size=500):
+    """Archive every due message. Returns the number moved."""
+    total = 0
+    while True:
+        moved = archive_chunk(older_than, chunk_size)
+        total += moved
+        if moved < chunk_size:
+            return total
@@ -0,0 +1,464 @@
+"""
+Latency benchmark for every route in ``content.urls``.
+
+``run`` seeds synthetic datasets of increasing size and requests each route
+through the in-process test client. It records p50/p95/p99 latency, queries
+per request and response size, both with an empty response cache ("cold")
+and with a primed one ("warm"). Results are plain JSON, so a run can be
+saved as a baseline and later runs checked against it with ``compare``.
+
+``measure_concurrency`` instead keeps many requests in flight at once against
+the ASGI or WSGI handler, to compare the two deployment modes under load.
+With ``writers``, contact form submissions are posted at the same time, to
+show how each database profile's reads hold up during a write burst.
+"""
+import asyncio
+import itertools
+import json
+import math
+import multiprocessing
+import platform
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+import django
+from django.core.cache import cache as default_cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, connections as db_connections, transaction
+from django.test import Client
+from django.urls import reverse
+
+from . import synthetic
+from .changes import get_latest_seq
+from .urls import router, urlpatterns
+
+
+# Dataset size is the number of products and contact messages; the other
+# models grow more slowly, as they would on the real site
+def get_counts(size):
+    return {
+        'services': max(3, size // 1000),
+        'categories': max(5, size // 1000),
+        'products': size,
+        'courses': max(10, size // 10),
+        'projects': max(10, size // 10),
+        'messages': size,
+    }
+
+
+MODES = ('cold', 'warm')
+LATENCY_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms')
+# Latency checked by compare() by default; tail percentiles of a few dozen
+# requests vary too much between runs on a busy machine
+COMPARED_METRICS = ('p50_ms',)
+
+CONTACT_PAYLOAD = {
+    'name': 'Benchmark',
+    'email': 'benchmark@example.com',
+    'subject': 'Quote request',
+    'message': 'Please send a quote for two control panels.',
+}
+
+
+# Responses that never finish, so there is nothing to time
+STREAMING_ROUTES = {'change-events'}
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class Case:
+    def __init__(self, name, path, method='get', data=None):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.data = data
+
+    def request(self, client):
+        return getattr(client, self.method)(self.path, self.data)
+
+
+def get_cases():
+    """One case per route: router lists and details plus the named views."""
+    cases = [Case('api-root', reverse('api-root'))]
+    for prefix, viewset, basename in router.registry:
+        cases.append(Case(f'{basename}-list', reverse(f'{basename}-list')))
+        queryset = viewset.queryset.order_by('pk')
+        count = queryset.count()
+        if count:
+            # The middle row, so the lookup isn't favoured by the index
+            value = queryset.values_list(viewset.lookup_field, flat=True)[count // 2]
+            cases.append(Case(
+                f'{basename}-detail', reverse(f'{basename}-detail', kwargs={viewset.lookup_field: value})
+            ))
+    cases += [
+        Case('home', reverse('home')),
+        Case('search', reverse('search'), data={'q': 'control pump'}),
+        # A client polling with an up-to-date cursor
+        Case('changes', reverse('changes'), data={'since': get_latest_seq()}),
+        Case('site-settings', reverse('site-settings')),
+        Case('contact', reverse('contact'), method='post', data=CONTACT_PAYLOAD),
+    ]
+    return cases
+
+
+def get_route_names():
+    names = {pattern.name for pattern in router.urls if pattern.name}
+    names |= {pattern.name for pattern in urlpatterns if getattr(pattern, 'name', None)}
+    return names - STREAMING_ROUTES
+
+
+def check_coverage(cases):
+    """Fail if a route was added to ``content.urls`` without a benchmark case."""
+    missing = get_route_names() - {case.name for case in cases}
+    if missing:
+        raise BenchmarkError(f'No benchmark case for: {", ".join(sorted(missing))}')
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile."""
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+class QueryCounter:
+    """Counts queries with an execute wrapper, which is cheaper than capturing them."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(client, case, requests, mode):
+    timings = []
+    queries = []
+    sizes = []
+    if mode == 'warm':
+        case.request(client)
+    for i in range(requests):
+        if mode == 'cold':
+            default_cache.clear()
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = case.request(client)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise BenchmarkError(f'{case.method.upper()} {case.path} returned {response.status_code}')
+        timings.append(elapsed * 1000)
+        queries.append(counter.count)
+        sizes.append(len(response.content))
+    return {
+        'requests': requests,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': round(statistics.fmean(queries), 2),
+        'bytes': round(statistics.fmean(sizes)),
+    }
+
+
+def measure_all(requests=50, cases=None):
+    """Measure every case in every mode against the current database."""
+    client = Client()
+    results = {}
+    for case in cases or get_cases():
+        results[case.name] = {mode: measure(client, case, requests, mode) for mode in MODES}
+    return results
+
+
+def run(sizes, requests=50, seed=None, stdout=None):
+    """
+    Grow the current database through ``sizes`` and measure each one.
+    Meant to run against a throwaway database (see the ``benchmark`` command).
+    """
+    report = {
+        'meta': {
+            'requests': requests,
+            'seed': seed,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'results': {},
+    }
+    generator = synthetic.Generator(seed=seed, stdout=stdout)
+    seeded = {name: 0 for name in synthetic.COUNT_NAMES}
+    for size in sorted(sizes):
+        counts = get_counts(size)
+        # Only add the rows the previous size didn't already create
+        with transaction.atomic():
+            generator.generate({name: counts[name] - seeded[name] for name in counts})
+            synthetic.finalize(generator.written)
+        generator.written.clear()
+        seeded = counts
+        cases = get_cases()
+        check_coverage(cases)
+        report['results'][str(size)] = measure_all(requests, cases)
+    return report
+
+
+def compare(report, baseline, threshold=0.25, min_delta_ms=1.0, metrics=COMPARED_METRICS):
+    """
+    Return regressions of ``report`` against ``baseline``: one of the latency
+    ``metrics`` more than ``threshold`` (a fraction) and ``min_delta_ms``
+    slower, or more queries per request.
+    """
+    regressions = []
+    for size, cases in baseline.get('results', {}).items():
+        for name, modes in cases.items():
+            for mode, before in modes.items():
+                after = report.get('results', {}).get(size, {}).get(name, {}).get(mode)
+                if after is None:
+                    continue
+                label = f'{size} {name} ({mode})'
+                for metric in metrics:
+                    if after[metric] > before[metric] * (1 + threshold) and after[metric] - before[metric] > min_delta_ms:
+                        regressions.append(f'{label} {metric}: {before[metric]} -> {after[metric]}')
+                if after['queries'] > before['queries']:
+                    regressions.append(f'{label} queries: {before["queries"]} -> {after["queries"]}')
+    return regressions
+
+
+SERVERS = ('asgi', 'wsgi')
+# Cacheable reads that make up most of the site's traffic
+CONCURRENCY_PATHS = ('/api/home/', '/api/products/', '/api/site-settings/')
+WRITE_PATH = '/api/contact/'
+
+
+async def asgi_request(application, url):
+    """Send one GET through an ASGI application. Returns the status code."""
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'root_path': '',
+        'path': parts.path, 'raw_path': parts.path.encode(), 'query_string': parts.query.encode(),
+        'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client stays connected; Django cancels this once it has responded
+        await asyncio.Event().wait()
+
+    status = None
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    return status
+
+
+def get_wsgi_environ(method, url, body=b'', content_type=''):
+    parts = urlsplit(url)
+    return {
+        'REQUEST_METHOD': method, 'PATH_INFO': parts.path, 'QUERY_STRING': parts.query,
+        'CONTENT_TYPE': content_type, 'CONTENT_LENGTH': str(len(body)),
+        'SCRIPT_NAME': '', 'SERVER_NAME': 'testserver', 'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1', 'HTTP_HOST': 'testserver',
+        'wsgi.input': BytesIO(body), 'wsgi.errors': BytesIO(), 'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+
+
+def call_wsgi(application, environ):
+    """Run one request through a WSGI application. Returns the status code."""
+    status = []
+    result = application(environ, lambda status_line, headers, exc_info=None: status.append(status_line))
+    try:
+        b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return int(status[0].split()[0])
+
+
+def wsgi_request(application, url):
+    """Send one GET through a WSGI application. Returns the status code."""
+    return call_wsgi(application, get_wsgi_environ('GET', url))
+
+
+def wsgi_post(application, url, payload):
+    """POST ``payload`` as JSON through a WSGI application. Returns the status code."""
+    body = json.dumps(payload).encode('utf-8')
+    return call_wsgi(application, get_wsgi_environ('POST', url, body, 'application/json'))
+
+
+def _write(stopping, results, number, step, interval):
+    """Writer process: post a submission every ``interval`` seconds until ``stopping`` is set."""
+    application = WSGIHandler()
+    timings = []
+    errors = 0
+    due = time.perf_counter()
+    while not stopping.wait(max(0.0, due - time.perf_counter())):
+        due += interval
+        payload = {
+            'name': 'Benchmark', 'email': f'writer{number}@example.com',
+            'subject': 'Write burst', 'message': f'Submission {number}',
+        }
+        started = time.perf_counter()
+        if wsgi_post(application, WRITE_PATH, payload) >= 400:
+            errors += 1
+        timings.append((time.perf_counter() - started) * 1000)
+        number += step
+    db_connections.close_all()
+    results.put((timings, errors))
+
+
+class WriteBurst:
+    """
+    Post contact form submissions from ``writers`` processes from ``start()``
+    until ``stop()``, ``rate`` per second in total (as fast as they can if
+    None). Separate processes behave like separate server workers and don't
+    compete with the readers for the GIL. A fixed rate puts the same write load
+    on every database profile. The contact form's rate limits would refuse
+    most submissions, so callers should turn those off.
+    """
+    def __init__(self, writers, rate=None):
+        self.writers = writers
+        self.rate = rate
+        self.processes = []
+        self.timings = []
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def start(self):
+        if not self.writers:
+            return
+        # Forked children inherit the settings and test database; they must
+        # not share the parent's open connections
+        db_connections.close_all()
+        context = multiprocessing.get_context('fork')
+        self.stopping = context.Event()
+        self.results = context.SimpleQueue()
+        interval = self.writers / self.rate if self.rate else 0.0
+        self.processes = [
+            context.Process(
+                target=_write, args=(self.stopping, self.results, number, self.writers, interval), daemon=True
+            )
+            for number in range(self.writers)
+        ]
+        self.started = time.perf_counter()
+        for process in self.processes:
+            process.start()
+
+    def stop(self):
+        if not self.processes:
+            return
+        self.stopping.set()
+        for process in self.processes:
+            timings, errors = self.results.get()
+            self.timings += timings
+            self.errors += errors
+        for process in self.processes:
+            process.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def get_results(self):
+        timings = self.timings or [0.0]
+        return {
+            'writes': len(self.timings),
+            'write_errors': self.errors,
+            'write_rps': round(len(self.timings) / self.elapsed, 1) if self.elapsed else 0.0,
+            'write_p95_ms': round(percentile(timings, 95), 3),
+        }
+
+
+async def _run_asgi_clients(paths, connections, requests):
+    application = ASGIHandler()
+    for path in paths:
+        await asgi_request(application, path)
+    timings = []
+    errors = 0
+    numbers = itertools.count()
+
+    async def client():
+        nonlocal errors
+        while (number := next(numbers)) < requests:
+            started = time.perf_counter()
+            status = await asgi_request(application, paths[number % len(paths)])
+            timings.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for i in range(connections)))
+    return timings, errors, time.perf_counter() - started
+
+
+def _run_wsgi_clients(paths, connections, requests):
+    application = WSGIHandler()
+    for path in paths:
+        wsgi_request(application, path)
+    timings = []
+    errors = []
+    numbers = itertools.count()
+
+    def client():
+        while (number := next(numbers)) < requests:
+            started = time.perf_counter()
+            status = wsgi_request(application, paths[number % len(paths)])
+            timings.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors.append(status)
+
+    started = time.perf_counter()
+    # A thread per connection, like a threaded WSGI server with enough threads
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        for future in [executor.submit(client) for i in range(connections)]:
+            future.result()
+    return timings, len(errors), time.perf_counter() - started
+
+
+def measure_concurrency(server, paths=CONCURRENCY_PATHS, connections=500, requests=5000, writers=0,
+                        write_rate=None):
+    """
+    Issue ``requests`` GETs over ``paths`` from ``connections`` concurrent
+    clients through the in-process ``server`` ('asgi' or 'wsgi') handler, after
+    one warm-up request per path, while ``writers`` processes post contact form
+    submissions (see ``WriteBurst``). Writers need a database file: forked
+    processes can't share an in-memory SQLite database.
+    """
+    paths = list(paths)
+    if server not in SERVERS:
+        raise BenchmarkError(f'Unknown server {server!r}, expected one of: {", ".join(SERVERS)}')
+    burst = WriteBurst(writers, write_rate)
+    burst.start()
+    try:
+        if server == 'asgi':
+            timings, errors, elapsed = asyncio.run(_run_asgi_clients(paths, connections, requests))
+        else:
+            timings, errors, elapsed = _run_wsgi_clients(paths, connections, requests)
+    finally:
+        burst.stop()
+    return {
+        'server': server,
+        'connections': connections,
+        'requests': requests,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(requests / elapsed, 1),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'writers': writers,
+        **burst.get_results(),
+    }
@@ -0,0 +1,221 @@
+"""
+Response cache for the read-only content API.
+
+Cached payloads are keyed by scheme, host, path, query string and active
+language, plus a generation number for every model the view depends on; the
+bodies hold absolute URLs, so each host and scheme gets its own copy. Saving or
+deleting a model bumps its generation (see ``content.signals``), so entries
+built from the old rows are never looked up again and simply expire.
+
+Generations live in ``CONTENT_CACHE_ALIAS``, which must be shared by every
+worker process (Redis, Memcached) for a change made in one to reach the
+others; ``check_shared_cache`` reports a per-process backend on
+``check --deploy``.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import translation
+
+
+KEY_PREFIX = 'content'
+
+# Process-level copies of hot objects, keyed by model label
+_local = {}
+
+
+def get_cache():
+    return caches[getattr(settings, 'CONTENT_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'CONTENT_CACHE_TIMEOUT', 60 * 60)
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """Deployment check: invalidations only reach the workers sharing the cache."""
+    if not isinstance(get_cache(), LocMemCache):
+        return []
+    return [checks.Warning(
+        'CONTENT_CACHE_ALIAS uses a per-process cache.',
+        hint='With more than one worker process, a change only invalidates the cached responses '
+             'and SiteSettings copy of the process that saved it. Use a shared backend such as '
+             'Redis or Memcached.',
+        id='content.W002',
+    )]
+
+
+def _generation_key(model):
+    return f'{KEY_PREFIX}:gen:{model._meta.label_lower}'
+
+
+def stat_key(name):
+    """Key of the counter ``name``; counters never expire."""
+    return f'{KEY_PREFIX}:stat:{name}'
+
+
+def incr(cache, key, delta=1):
+    """Increment a counter, starting it at ``delta`` if it is missing."""
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Missing or evicted key; start counting again from here.
+        cache.set(key, delta, None)
+        return delta
+
+
+async def acall(cache, method, *args):
+    """
+    Call a cache method from async code. Django's ``a*`` cache methods run the
+    sync method in a worker thread; in-process backends never block, so they
+    are called directly on the event loop instead.
+    """
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        return getattr(cache, method)(*args)
+    return await getattr(cache, f'a{method}')(*args)
+
+
+async def aincr(cache, key, delta=1):
+    try:
+        return await acall(cache, 'incr', key, delta)
+    except ValueError:
+        await acall(cache, 'set', key, delta, None)
+        return delta
+
+
+def get_generations(models):
+    """Return the current generation of each model, initialising missing ones."""
+    cache = get_cache()
+    keys = [_generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # Seed from the clock so an evicted counter never falls back to a
+            # value that older entries were built with.
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+async def aget_generations(models):
+    cache = get_cache()
+    keys = [_generation_key(model) for model in models]
+    generations = await acall(cache, 'get_many', keys)
+    for key in keys:
+        if key not in generations:
+            await acall(cache, 'add', key, time.time_ns(), None)
+            generations[key] = await acall(cache, 'get', key)
+    return [generations[key] for key in keys]
+
+
+def invalidate_model(model):
+    """Orphan every cached response built from ``model``."""
+    cache = get_cache()
+    key = _generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+    incr(cache, stat_key(f'invalidations:{model._meta.label_lower}'))
+
+
+def get_local(model, loader):
+    """
+    Return a process-level copy of ``loader()``, reloaded only when the
+    shared generation of ``model`` changes (i.e. after a save in any worker).
+    """
+    generation = get_generations([model])[0]
+    label = model._meta.label_lower
+    entry = _local.get(label)
+    if entry is None or entry[0] != generation:
+        entry = (generation, loader())
+        _local[label] = entry
+    return entry[1]
+
+
+async def aget_local(model, loader):
+    """Async ``get_local``; ``loader`` is a coroutine function."""
+    generation = (await aget_generations([model]))[0]
+    label = model._meta.label_lower
+    entry = _local.get(label)
+    if entry is None or entry[0] != generation:
+        entry = (generation, await loader())
+        _local[label] = entry
+    return entry[1]
+
+
+def _response_key(request, generations):
+    query = sorted(request.GET.lists())
+    parts = [
+        request.scheme,
+        request.get_host(),
+        request.path,
+        repr(query),
+        translation.get_language() or '',
+        repr(generations),
+    ]
+    digest = hashlib.md5('|'.join(parts).encode('utf-8'), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:response:{digest}'
+
+
+def build_key(request, models):
+    """Build the cache key for ``request`` against the given model generations."""
+    return _response_key(request, get_generations(models))
+
+
+async def abuild_key(request, models):
+    return _response_key(request, await aget_generations(models))
+
+
+def get_response(key):
+    cache = get_cache()
+    entry = cache.get(key)
+    incr(cache, stat_key('hits' if entry is not None else 'misses'))
+    return entry
+
+
+async def aget_response(key):
+    cache = get_cache()
+    entry = await acall(cache, 'get', key)
+    await aincr(cache, stat_key('hits' if entry is not None else 'misses'))
+    return entry
+
+
+def set_response(key, entry):
+    get_cache().set(key, entry, get_timeout())
+
+
+async def aset_response(key, entry):
+    await acall(get_cache(), 'set', key, entry, get_timeout())
+
+
+def get_stats(models=()):
+    """Return hit/miss counters, hit ratio and per-model invalidation counts."""
+    cache = get_cache()
+    labels = [model._meta.label_lower for model in models]
+    keys = [stat_key('hits'), stat_key('misses')]
+    keys += [stat_key(f'invalidations:{label}') for label in labels]
+    values = cache.get_many(keys)
+    hits = values.get(stat_key('hits'), 0)
+    misses = values.get(stat_key('misses'), 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+        'invalidations': {
+            label: values.get(stat_key(f'invalidations:{label}'), 0)
+            for label in labels
+        },
+    }
+
+
+def reset_stats(models=()):
+    keys = [stat_key('hits'), stat_key('misses')]
+    keys += [stat_key(f'invalidations:{model._meta.label_lower}') for model in models]
+    get_cache().delete_many(keys)
@@ -0,0 +1,176 @@
+"""
+Admin changelists that stay fast on tables with millions of rows.
+
+``FastChangeListMixin`` replaces the two ``COUNT(*)`` queries of every
+changelist page with one bounded count: up to ``EXACT_COUNT_LIMIT`` rows are
+counted exactly, larger results use the database's estimate where it keeps
+one and are shown as "more than ``EXACT_COUNT_LIMIT``" elsewhere. Only the pages within that limit are linked by number, since a deep
+``OFFSET`` walks every row before it. From the last numbered page a cursor link
+continues through the rest with keyset queries (see ``content.pagination``),
+which cost the same however deep they go.
+
+``IndexedSearchMixin`` answers the search box from the full-text index in
+``content.search`` and ``PrefixSearchMixin`` from ``Lower()`` expression
+indexes, instead of ``icontains`` scans over every text column.
+"""
+import json
+import math
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils.functional import cached_property
+
+from . import search
+from .pagination import decode_cursor, encode_cursor, get_ordering, get_position, get_position_filter
+
+
+CURSOR_VAR = 'cursor'
+EXACT_COUNT_LIMIT = 5000
+
+
+def estimate_count(queryset):
+    """Planner row estimate on PostgreSQL; None elsewhere."""
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        # SQLite keeps no row estimates, and a full count scans every row
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    exact_count_limit = EXACT_COUNT_LIMIT
+    # Set by count when it stopped at the limit without an estimate
+    capped = False
+
+    @cached_property
+    def count(self):
+        exact = self.object_list.order_by()[:self.exact_count_limit + 1].count()
+        if exact <= self.exact_count_limit:
+            return exact
+        estimate = estimate_count(self.object_list)
+        if estimate is None:
+            self.capped = True
+            return exact
+        return estimate
+
+    @cached_property
+    def num_pages(self):
+        # Pages past the exact count are reached with cursor links instead
+        reachable = max(self.exact_count_limit, self.per_page)
+        return max(1, math.ceil(min(self.count, reachable) / self.per_page))
+
+    @property
+    def truncated(self):
+        return self.count > self.num_pages * self.per_page
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ``ChangeList`` that also accepts ``?cursor=``: the page then holds the
+    rows following the cursor's position in the changelist ordering.
+    """
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR) or None
+        super().__init__(request, *args, **kwargs)
+        # Filter, sort and search links start again from the first page
+        self.params.pop(CURSOR_VAR, None)
+        self.filter_params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_keyset_ordering(self):
+        # Ordering by an expression (e.g. an admin method) has no position to resume from
+        if not all(isinstance(field, str) for field in self.queryset.query.order_by):
+            return None
+        return get_ordering(self.queryset)
+
+    def get_results(self, request):
+        super().get_results(request)
+        if self.cursor is None:
+            return
+        ordering = self.get_keyset_ordering()
+        if ordering is None:
+            raise IncorrectLookupParameters
+        try:
+            position, _ = decode_cursor(self.cursor, ordering)
+        except ValueError:
+            raise IncorrectLookupParameters
+        self.result_list = self.queryset.filter(get_position_filter(ordering, position))[:self.list_per_page]
+        self.multi_page = True
+        self.can_show_all = False
+
+    @cached_property
+    def next_page_url(self):
+        """Cursor link to the rows after this page, past the numbered pages."""
+        paginator = self.paginator
+        if self.cursor is None and not (
+            getattr(paginator, 'truncated', False) and self.page_num == paginator.num_pages
+        ):
+            return None
+        ordering = self.get_keyset_ordering()
+        rows = list(self.result_list)
+        if ordering is None or len(rows) < self.list_per_page:
+            return None
+        cursor = encode_cursor(get_position(ordering, rows[-1]))
+        return self.get_query_string({CURSOR_VAR: cursor}, remove=[PAGE_VAR])
+
+
+class FastChangeListMixin:
+    paginator = EstimatedCountPaginator
+    # Rendering the row widgets, not the queries, dominates a changelist page
+    list_per_page = 50
+    show_full_result_count = False
+    change_list_template = 'admin/keyset_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+class IndexedSearchMixin:
+    """Search through the ``content.search`` index, newest ``search_limit`` matches."""
+    search_limit = 1000
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        search_type = search.get_search_type(self.model)
+        results = search.search(search_term, types=[search_type], limit=self.search_limit, ranked=False)
+        pks = [pk for _, pk, _ in results]
+        return queryset.filter(pk__in=pks), False
+
+
+class PrefixSearchMixin:
+    """
+    Match every search term against the start of one of the
+    ``prefix_search_fields``, ignoring case. Each field needs a
+    ``Lower(field)`` index for the range lookups to use.
+    """
+    prefix_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        terms = search_term.split()
+        if not terms:
+            return queryset, False
+        queryset = queryset.alias(**{f'{field}_lower': Lower(field) for field in self.prefix_search_fields})
+        for term in terms:
+            term = term.lower()
+            condition = Q()
+            for field in self.prefix_search_fields:
+                # A range rather than LIKE, which SQLite can't serve from the index
+                condition |= Q(**{f'{field}_lower__gte': term, f'{field}_lower__lt': term + '\U0010ffff'})
+            queryset = queryset.filter(condition)
+        return queryset, False
@@ -0,0 +1,181 @@
+"""
+Change feed for delta sync (``/api/changes/``).
+
+Every save and delete of a content model is recorded in ``ContentChange`` in
+the same transaction, under a new ``seq`` from the table's auto-increment
+primary key. The feed returns the changes after a client's cursor in ``seq``
+order, so a client that has nothing to fetch pays for one primary key range
+scan and a few bytes of JSON.
+
+Only the latest change to each object is kept: recording one removes the
+object's earlier entry, as a client that hasn't read it yet only needs the
+current state. Deletions stay behind as tombstones until ``compact_changes``
+removes those older than ``CHANGE_FEED_RETENTION_DAYS``. Each compaction
+stores its horizon, the highest ``seq`` it removed, and a client whose cursor
+is below the horizon may have missed a deletion and must sync again from
+the lists.
+
+Bulk writes (``seed_data --bulk``) bypass the signals and are recorded
+afterwards with ``record_bulk``. The feed starts empty, so a client starts
+from the lists and takes its first cursor from ``/api/changes/`` without
+``since``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import (
+    ChangeCompaction, ContentChange, Course, Product, ProductCategory, Service, SiteSettings, ThreeDPrintingProject,
+)
+
+
+CREATED, UPDATED, DELETED = 'created', 'updated', 'deleted'
+
+# Change type -> model
+CHANGE_MODELS = {
+    'service': Service,
+    'product-category': ProductCategory,
+    'product': Product,
+    'course': Course,
+    '3d-printing': ThreeDPrintingProject,
+    'site-settings': SiteSettings,
+}
+
+# Change type -> (change type, foreign key) of the objects whose data embeds it
+DEPENDENT_CHANGES = {
+    'product-category': [('product', 'category')],
+}
+
+# Any constant; content writers hold it while they record a change
+FEED_LOCK_ID = 0x636f6e74
+# Object ids per query in record_bulk, below SQLite's bound parameter limit
+BULK_BATCH_SIZE = 500
+
+
+def get_retention():
+    return timedelta(days=getattr(settings, 'CHANGE_FEED_RETENTION_DAYS', 30))
+
+
+def get_change_type(model):
+    for change_type, change_model in CHANGE_MODELS.items():
+        if change_model is model:
+            return change_type
+    return None
+
+
+def lock_feed():
+    """
+    Hold back other content writers until this transaction commits, so
+    changes commit in ``seq`` order and a reader can't move its cursor past
+    a lower ``seq`` that is still uncommitted. SQLite already has a single
+    writer; PostgreSQL hands out sequence values before commit.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [FEED_LOCK_ID])
+
+
+def record_change(instance, action):
+    change_type = get_change_type(type(instance))
+    with transaction.atomic():
+        lock_feed()
+        # Insert first and remove the entries below the new seq. seq is an
+        # AUTOINCREMENT column on SQLite and a sequence on PostgreSQL, so it
+        # is never handed out again after the entry holding it is deleted;
+        # cursors rely on that
+        change = ContentChange.objects.create(change_type=change_type, object_id=instance.pk, action=action)
+        ContentChange.objects.filter(change_type=change_type, object_id=instance.pk, seq__lt=change.seq).delete()
+        if action == UPDATED:
+            for dependent_type, field in DEPENDENT_CHANGES.get(change_type, []):
+                dependents = CHANGE_MODELS[dependent_type].objects.filter(**{field: instance.pk}).order_by('pk')
+                record_updates(dependent_type, list(dependents.values_list('pk', flat=True)), after=change.seq)
+    return change
+
+
+def record_updates(change_type, pks, after):
+    """
+    Record an update of each of ``pks`` in bulk and remove their entries
+    below ``after``, inside a transaction that holds the feed lock.
+    """
+    if not pks:
+        return
+    ContentChange.objects.bulk_create([
+        ContentChange(change_type=change_type, object_id=pk, action=UPDATED) for pk in pks
+    ])
+    ContentChange.objects.filter(change_type=change_type, object_id__in=pks, seq__lt=after).delete()
+
+
+def record_bulk(written):
+    """
+    Record an update of each object written with ``bulk_create`` or
+    ``update()``, and of the objects whose data embeds them. ``written`` maps
+    models to the primary keys of their inserted or updated rows.
+    """
+    pks_by_type = {}
+    for model, pks in written.items():
+        change_type = get_change_type(model)
+        if change_type is not None:
+            pks_by_type.setdefault(change_type, set()).update(pks)
+    with transaction.atomic():
+        lock_feed()
+        for change_type, pks in list(pks_by_type.items()):
+            for dependent_type, field in DEPENDENT_CHANGES.get(change_type, []):
+                dependents = CHANGE_MODELS[dependent_type].objects.values_list('pk', flat=True)
+                for batch in _batches(sorted(pks)):
+                    pks_by_type.setdefault(dependent_type, set()).update(dependents.filter(**{f'{field}__in': batch}))
+        # seq only grows, so every entry of this batch is above the current one
+        after = get_latest_seq() + 1
+        for change_type, pks in pks_by_type.items():
+            for batch in _batches(sorted(pks)):
+                record_updates(change_type, batch, after=after)
+
+
+def _batches(items):
+    for start in range(0, len(items), BULK_BATCH_SIZE):
+        yield items[start:start + BULK_BATCH_SIZE]
+
+
+def get_changes(since):
+    return ContentChange.objects.filter(seq__gt=since).order_by('seq')
+
+
+def get_latest_seq():
+    return ContentChange.objects.aggregate(seq=Max('seq'))['seq'] or 0
+
+
+async def aget_latest_seq():
+    return (await ContentChange.objects.aaggregate(seq=Max('seq')))['seq'] or 0
+
+
+def get_horizon():
+    return ChangeCompaction.objects.aggregate(horizon=Max('horizon'))['horizon'] or 0
+
+
+async def aget_horizon():
+    return (await ChangeCompaction.objects.aaggregate(horizon=Max('horizon')))['horizon'] or 0
+
+
+def get_expired_tombstones(older_than=None):
+    cutoff = timezone.now() - (older_than if older_than is not None else get_retention())
+    # The newest entry stays: the feed position is read from it, and an
+    # emptied feed would send every cursor back to 0
+    return (
+        ContentChange.objects
+        .filter(action=DELETED, changed_at__lt=cutoff, seq__lt=get_latest_seq())
+    )
+
+
+def compact_changes(older_than=None):
+    """Remove tombstones past the retention age. Returns the number removed."""
+    with transaction.atomic():
+        lock_feed()
+        expired = get_expired_tombstones(older_than)
+        horizon = expired.aggregate(seq=Max('seq'))['seq']
+        if horizon is None:
+            return 0
+        removed, _ = expired.filter(seq__lte=horizon).delete()
+        ChangeCompaction.objects.create(horizon=horizon, removed=removed)
+    return removed
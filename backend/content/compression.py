@@ -0,0 +1,105 @@
+"""
+Precompressed bodies for cached API responses.
+
+``CachedResponseMixin`` keeps the rendered body of each JSON response in its
+cache entry, next to the data, along with a Brotli or gzip copy for every
+encoding a client has asked for. The entry belongs to one generation of the
+content (see ``content.cache``), so each representation is rendered and
+compressed once per change and later hits are answered with the stored bytes.
+
+Bodies shorter than ``COMPRESSION_MIN_SIZE`` bytes are always sent as they
+are. Brotli is offered only if the ``brotli`` package is installed. Responses
+that may be compressed carry ``Vary: Accept-Encoding``, and a compressed
+body gets a weak ETag, as Django's ``GZipMiddleware`` does.
+"""
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+IDENTITY = 'identity'
+
+
+def get_min_size():
+    return getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+
+def get_encodings():
+    """Supported encodings, most preferred first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def parse_accept_encoding(header):
+    """Return ``{coding: q}`` for an ``Accept-Encoding`` header."""
+    accepted = {}
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def get_encoding(request):
+    """The best encoding ``request`` accepts, or ``IDENTITY``."""
+    accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    best, best_q = IDENTITY, 0.0
+    for encoding in get_encodings():
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body)
+    return gzip.compress(body, 9, mtime=0)
+
+
+def get_media_type(request):
+    """Key for the bodies rendered for ``request``; None if they aren't stored."""
+    renderer = getattr(request, 'accepted_renderer', None)
+    if renderer is None or renderer.format != 'json':
+        # The browsable API renders forms and links for the current user
+        return None
+    return request.accepted_media_type
+
+
+def add_body(bodies, request, content):
+    """
+    Keep the rendered ``content`` in ``bodies``, an ``{encoding: body}`` dict,
+    with the copy ``request`` asks for, compressing it if it is missing.
+    Returns ``(encoding, body)`` to send.
+    """
+    bodies.setdefault(IDENTITY, content)
+    encoding = get_encoding(request) if len(content) >= get_min_size() else IDENTITY
+    if encoding not in bodies:
+        bodies[encoding] = compress(content, encoding)
+    return encoding, bodies[encoding]
+
+
+def set_body(response, encoding, body):
+    """Give ``response`` the stored ``body`` and its encoding headers."""
+    response.content = body
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if encoding != IDENTITY:
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and not etag.startswith('W/'):
+            response['ETag'] = f'W/{etag}'
+    return response
@@ -0,0 +1,200 @@
+"""
+Per-connection database setup for the profiles in ``settings.DATABASE_PROFILE``,
+and routing of the public read-only API to read replicas.
+
+SQLite reads its tuning from PRAGMAs that only last for the connection, so
+``configure_connection`` applies ``SQLITE_PRAGMAS`` whenever Django opens one
+(see ``content.signals``). ``journal_mode=WAL`` is stored in the database
+file itself; setting it again is a no-op.
+
+Views wrapped in ``use_replica()`` (see ``ReplicaReadMixin``) read from one of
+``DATABASE_REPLICAS``, picked on the request's first query. Everything else,
+including the contact form, the admin and every write, uses the primary. A
+replica that fails to connect is skipped for ``DATABASE_REPLICA_RETRY``
+seconds, and without a working replica reads fall back to the primary.
+
+Replicas lag behind the primary, so every content change pins all reads to the
+primary for ``DATABASE_REPLICA_MAX_LAG`` seconds from its commit. The pin is
+shared by every client rather than kept per session: the response cache and
+``SiteSettings.cached()`` are shared too, and a replica read that hasn't seen a
+change yet must not fill them under the generation that change created. It is
+kept in the content cache, which must therefore be shared by every worker
+process; ``check_shared_cache`` reports a per-process backend.
+
+A client that has just written through the admin also carries a cookie that
+keeps its own reads on the primary for as long (see ``pin_client``), so its
+session reads its writes even if the shared pin is evicted early.
+"""
+import contextlib
+import contextvars
+import random
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.urls import reverse
+
+from .cache import KEY_PREFIX, get_cache
+
+
+PROFILES = ('sqlite', 'sqlite-tuned', 'postgresql')
+PIN_KEY = f'{KEY_PREFIX}:replica:pinned'
+PIN_COOKIE = 'content_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_replica = contextvars.ContextVar('content_replica', default=None)
+
+# Replica alias -> time.monotonic() after which it is tried again
+_unavailable = {}
+
+
+def get_profile():
+    return getattr(settings, 'DATABASE_PROFILE', 'sqlite')
+
+
+def get_sqlite_pragmas():
+    return getattr(settings, 'SQLITE_PRAGMAS', {})
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_replica_max_lag():
+    return getattr(settings, 'DATABASE_REPLICA_MAX_LAG', 10)
+
+
+def get_replica_retry():
+    return getattr(settings, 'DATABASE_REPLICA_RETRY', 30)
+
+
+def configure_connection(connection):
+    pragmas = get_sqlite_pragmas()
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    if connection.alias in get_replicas():
+        # Replicas are opened read-only; their copy decides the journal mode
+        pragmas = {name: value for name, value in pragmas.items() if name != 'journal_mode'}
+    # The raw connection, so the PRAGMAs skip execute wrappers and query logging
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def get_sqlite_settings(connection):
+    """Current values of the configured PRAGMAs, e.g. to check a deployment."""
+    return {
+        name: connection.connection.execute(f'PRAGMA {name}').fetchone()[0]
+        for name in get_sqlite_pragmas()
+    }
+
+
+def pin_primary():
+    """Read from the primary until the replicas have caught up with a change just committed."""
+    lag = get_replica_max_lag()
+    if get_replicas() and lag:
+        get_cache().set(PIN_KEY, True, lag)
+
+
+def is_pinned():
+    return get_cache().get(PIN_KEY) is not None
+
+
+def pin_client(request, response):
+    """After a successful admin write, keep the client's reads on the primary."""
+    lag = get_replica_max_lag()
+    if (
+        get_replicas() and lag and request.method not in SAFE_METHODS and response.status_code < 400
+        and request.path.startswith(reverse('admin:index'))
+    ):
+        response.set_cookie(PIN_COOKIE, '1', max_age=lag, httponly=True, samesite='Lax')
+
+
+def is_client_pinned(request):
+    return request is not None and PIN_COOKIE in request.COOKIES
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """With replicas, the primary pin needs a cache that every worker process sees."""
+    if not get_replicas() or not isinstance(get_cache(), (LocMemCache, DummyCache)):
+        return []
+    # The development server is a single process
+    level, check_id = (checks.Warning, 'content.W001') if settings.DEBUG else (checks.Error, 'content.E001')
+    return [level(
+        'DATABASE_REPLICAS are configured, but CONTENT_CACHE_ALIAS uses a per-process cache.',
+        hint='Only the process that saved a change would stop reading from lagging replicas. '
+             'Use a shared backend such as Redis or Memcached.',
+        id=check_id,
+    )]
+
+
+def choose_replica(request=None):
+    """Return the alias of a working replica, or None to read from the primary."""
+    replicas = get_replicas()
+    if not replicas or is_client_pinned(request) or is_pinned():
+        return None
+    now = time.monotonic()
+    candidates = [alias for alias in replicas if _unavailable.get(alias, 0) <= now]
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            _unavailable[alias] = now + get_replica_retry()
+            continue
+        return alias
+    return None
+
+
+class ReplicaReads:
+    """The replica one request reads from, chosen on its first query."""
+    def __init__(self, request=None):
+        self.request = request
+        self.chosen = False
+        self.alias = None
+
+    def get_alias(self):
+        if not self.chosen:
+            self.alias = choose_replica(self.request)
+            self.chosen = True
+        return self.alias
+
+
+@contextlib.contextmanager
+def use_replica(request=None):
+    """
+    Send the reads made inside the block to a replica, unless ``request``
+    comes from a client pinned to the primary. The choice is kept in a
+    context variable, which async views pass on to their ORM worker threads.
+    """
+    token = _replica.set(ReplicaReads(request))
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    """Reads inside ``use_replica()`` go to a replica; everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        reads = _replica.get()
+        return reads.get_alias() if reads is not None else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema from the primary
+        if db in get_replicas():
+            return False
+        return None
@@ -0,0 +1,185 @@
+"""
+Contact form emails.
+
+The contact view only queues ``OutboxEmail`` rows in the same transaction as
+the ``ContactMessage``; the ``send_outbox`` management command delivers them
+in batches over a single SMTP connection, retrying failures with backoff.
+"""
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from .models import OutboxEmail, SiteSettings
+
+
+# Delay before retry n is RETRY_BASE_DELAY * 2 ** (n - 1), capped at RETRY_MAX_DELAY
+RETRY_BASE_DELAY = timedelta(minutes=1)
+RETRY_MAX_DELAY = timedelta(hours=1)
+# How long a claimed row stays reserved for the worker that claimed it
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+logger = logging.getLogger(__name__)
+
+
+def build_admin_email(contact_message):
+    subject = f'New Contact Form Submission: {contact_message.subject}'
+    # The prefix can push a full-length subject past the outbox column
+    subject = Truncator(subject).chars(OutboxEmail._meta.get_field('subject').max_length)
+    body = f"""
+New contact form submission from Hydratech website:
+
+Name: {contact_message.name}
+Email: {contact_message.email}
+Phone: {contact_message.phone or 'Not provided'}
+Subject: {contact_message.subject}
+
+Message:
+{contact_message.message}
+
+---
+Received at: {contact_message.created_at}
+            """
+    return subject, body
+
+
+def build_auto_reply(contact_message):
+    subject = 'Thank you for contacting Hydratech'
+    body = f"""
+Dear {contact_message.name},
+
+Thank you for contacting Hydratech. We have received your message regarding "{contact_message.subject}".
+
+Our team will review your inquiry and get back to you as soon as possible.
+
+Best regards,
+Hydratech Team
+
+---
+This is an automated response. Please do not reply to this email.
+            """
+    return subject, body
+
+
+def queue_contact_emails(contact_message):
+    """Queue the admin notification and the customer auto-reply."""
+    emails = []
+
+    recipient_email = SiteSettings.cached().email
+    if recipient_email:
+        subject, body = build_admin_email(contact_message)
+        emails.append(OutboxEmail(
+            contact_message=contact_message, recipient=recipient_email, subject=subject, body=body
+        ))
+
+    subject, body = build_auto_reply(contact_message)
+    emails.append(OutboxEmail(
+        contact_message=contact_message, recipient=contact_message.email, subject=subject, body=body
+    ))
+
+    return OutboxEmail.objects.bulk_create(emails)
+
+
+def get_retry_delay(attempts):
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def claim_batch(batch_size):
+    """
+    Reserve up to ``batch_size`` due emails by pushing their next attempt past
+    the claim timeout, so concurrent workers do not pick them up too.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if batch:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=now + CLAIM_TIMEOUT
+            )
+    return batch
+
+
+def release_batch(batch, error):
+    """Make a claimed ``batch`` due again, e.g. when the mail server can't be reached."""
+    OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+        next_attempt_at=timezone.now(), last_error=f'{type(error).__name__}: {error}'
+    )
+
+
+def reset_connection(connection):
+    # A failed send can leave the SMTP session unusable; start a fresh one
+    try:
+        connection.close()
+        connection.open()
+    except Exception:
+        pass
+
+
+def deliver_batch(batch, connection, max_attempts):
+    """
+    Send ``batch`` over an open ``connection`` and record each outcome.
+    Returns ``(sent, failed)`` counts.
+    """
+    sent = failed = 0
+    for email in batch:
+        message = EmailMessage(
+            email.subject, email.body, settings.DEFAULT_FROM_EMAIL, [email.recipient],
+            connection=connection,
+        )
+        email.attempts += 1
+        try:
+            connection.send_messages([message])
+        except Exception as e:
+            email.last_error = f'{type(e).__name__}: {e}'
+            reset_connection(connection)
+            if email.attempts >= max_attempts:
+                email.status = 'failed'
+            else:
+                email.next_attempt_at = timezone.now() + get_retry_delay(email.attempts)
+            failed += 1
+        else:
+            email.status = 'sent'
+            email.sent_at = timezone.now()
+            email.last_error = ''
+            sent += 1
+        email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at', 'updated_at'])
+    return sent, failed
+
+
+def send_outbox(batch_size=50, max_attempts=5, connection=None):
+    """
+    Drain every due outbox email, reusing one mail connection, which is
+    only opened once there is something to send. If it can't be opened,
+    the emails stay due for the next run. Returns ``(sent, failed)`` counts.
+    """
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except (OSError, smtplib.SMTPException) as e:
+        logger.warning('Could not open the mail connection, retrying on the next run: %s', e)
+        release_batch(batch, e)
+        return 0, 0
+
+    total_sent = total_failed = 0
+    try:
+        while batch:
+            sent, failed = deliver_batch(batch, connection, max_attempts)
+            total_sent += sent
+            total_failed += failed
+            batch = claim_batch(batch_size)
+    finally:
+        connection.close()
+    return total_sent, total_failed
@@ -0,0 +1,239 @@
+"""
+Server-Sent Events for live content invalidation (``/api/changes/events/``).
+
+Each process runs one ``ChangeBroker`` on its event loop. While any client is
+connected, the broker reads new entries of the change feed (see
+``content.changes``) every ``CHANGE_EVENTS_POLL_INTERVAL`` seconds and hands a
+``{model, id, version, action}`` event to every subscriber's queue. The feed
+lives in the database, so a change made through any worker or host reaches
+every process, at the cost of one primary key range query per interval and
+process however many clients are listening. A change committed in the same
+process wakes the broker at once.
+
+A client is an async generator and an ``asyncio.Queue``, not a thread, so a
+process holds thousands of idle streams. Idle streams get a comment line
+every ``CHANGE_EVENTS_HEARTBEAT`` seconds to keep proxies from closing them.
+The event id is the change's ``seq``: a reconnecting ``EventSource`` sends it
+back in ``Last-Event-ID`` and gets the changes it missed, up to
+``CHANGE_EVENTS_REPLAY_LIMIT``. A client that falls further behind, whose
+cursor was compacted away or whose queue overflows gets a ``reset`` event and
+should drop everything it has cached.
+
+Streams are only served through ASGI (``hydratech_backend/asgi.py``), where
+``EventStreamASGIHandler`` also keeps Django from parking a thread per stream.
+"""
+import asyncio
+import contextvars
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import DatabaseError
+from django.urls import reverse
+
+from . import changes
+
+
+RESET = object()
+# Milliseconds a disconnected EventSource waits before reconnecting
+RETRY = 3000
+
+
+def get_poll_interval():
+    return getattr(settings, 'CHANGE_EVENTS_POLL_INTERVAL', 1.0)
+
+
+def get_heartbeat():
+    return getattr(settings, 'CHANGE_EVENTS_HEARTBEAT', 15)
+
+
+def get_queue_size():
+    return getattr(settings, 'CHANGE_EVENTS_QUEUE_SIZE', 100)
+
+
+def get_replay_limit():
+    return getattr(settings, 'CHANGE_EVENTS_REPLAY_LIMIT', 1000)
+
+
+def get_event(change):
+    return {
+        'model': change.change_type,
+        'id': change.object_id,
+        'version': change.seq,
+        'action': change.action,
+    }
+
+
+def format_event(event):
+    data = json.dumps(event, separators=(',', ':'))
+    return f'id: {event["version"]}\nevent: change\ndata: {data}\n\n'
+
+
+def format_reset():
+    return 'event: reset\ndata: {}\n\n'
+
+
+class Subscription:
+    """One client's queue, starting after the feed position ``cursor``."""
+    def __init__(self, cursor, maxsize):
+        self.cursor = cursor
+        self.queue = asyncio.Queue(maxsize)
+
+    def put(self, event):
+        """Queue ``event``; False if the client is too far behind to keep."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def reset(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESET)
+
+
+class ChangeBroker:
+    """Polls the change feed for the subscribers on one event loop."""
+    def __init__(self):
+        self.subscribers = set()
+        self.cursor = 0
+        self.loop = None
+        self.task = None
+        self.wakeup = None
+
+    def is_running(self):
+        return (
+            self.task is not None and not self.task.done()
+            and self.loop is asyncio.get_running_loop()
+        )
+
+    async def subscribe(self):
+        if not self.is_running():
+            cursor = await changes.aget_latest_seq()
+            if not self.is_running():
+                self.start(cursor)
+        subscription = Subscription(self.cursor, get_queue_size())
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+
+    def start(self, cursor):
+        self.cursor = cursor
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        # In an empty context, not that of the request that happens to start
+        # it, whose Server-Timing timer would collect every later poll
+        self.task = contextvars.Context().run(self.loop.create_task, self.run())
+
+    def notify(self):
+        """Poll now; callable from any thread, e.g. after a commit."""
+        loop, wakeup = self.loop, self.wakeup
+        if loop is None or wakeup is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            # The loop has been closed
+            pass
+
+    async def run(self):
+        # Stops with the last subscriber; the next one starts it again
+        while self.subscribers:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), get_poll_interval())
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.poll()
+            except DatabaseError:
+                # Try again on the next interval; the cursor hasn't moved
+                pass
+
+    async def poll(self):
+        batch = get_queue_size()
+        while True:
+            entries = [change async for change in changes.get_changes(self.cursor)[:batch]]
+            for change in entries:
+                self.publish(get_event(change))
+            if entries:
+                self.cursor = entries[-1].seq
+            if len(entries) < batch:
+                return
+
+    def publish(self, event):
+        for subscription in list(self.subscribers):
+            if not subscription.put(event):
+                self.unsubscribe(subscription)
+                subscription.reset()
+
+
+broker = ChangeBroker()
+
+
+async def get_backlog(last_event_id, until):
+    """
+    Events after ``last_event_id`` up to the broker position ``until``, or
+    ``[RESET]`` if they can't all be replayed.
+    """
+    if last_event_id >= until:
+        # A client reconnecting from a process whose broker polled later is
+        # ahead of this one; only an id past the whole feed is unknown
+        if last_event_id > until and last_event_id > await changes.aget_latest_seq():
+            return [RESET]
+        return []
+    limit = get_replay_limit()
+    if last_event_id < await changes.aget_horizon():
+        return [RESET]
+    entries = [change async for change in changes.get_changes(last_event_id).filter(seq__lte=until)[:limit + 1]]
+    if len(entries) > limit:
+        return [RESET]
+    return [get_event(change) for change in entries]
+
+
+async def stream(last_event_id=None):
+    """Async iterator of SSE messages for one client."""
+    subscription = await broker.subscribe()
+    try:
+        backlog = await get_backlog(last_event_id, subscription.cursor) if last_event_id is not None else []
+        yield f'retry: {RETRY}\n\n'
+        for event in backlog:
+            if event is RESET:
+                yield format_reset()
+                return
+            yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), get_heartbeat())
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event is RESET:
+                yield format_reset()
+                return
+            if last_event_id is None or event['version'] > last_event_id:
+                yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+class EventStreamASGIHandler(ASGIHandler):
+    """
+    Django's ASGI handler, except that event streams run outside a
+    ``ThreadSensitiveContext``. The context gives each request its own thread
+    for sync code such as the ``request_started`` receivers, and that thread
+    stays parked until the response ends, which for a stream is when the
+    client leaves. Streams share asgiref's process-wide sync thread instead.
+    """
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and self.is_stream(scope):
+            await self.handle(scope, receive, send)
+        else:
+            await super().__call__(scope, receive, send)
+
+    def is_stream(self, scope):
+        path = scope['path'].removeprefix(scope.get('root_path', ''))
+        return path == reverse('change-events')
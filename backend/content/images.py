@@ -0,0 +1,200 @@
+"""
+Responsive image renditions for ``Product.image`` and ``ThreeDPrintingProject.image``.
+
+Uploads are stored untouched. The ``process_images`` command then writes
+resized copies in every configured width and format next to the original,
+under ``<upload dir>/renditions/``. It records their names in
+``image_renditions`` together with the name of the source they were built
+from, so a row only needs processing again when its image changes. Rendition
+files that already exist are reused, which keeps reprocessing idempotent.
+"""
+import posixpath
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from . import cache, changes, database, events, snapshots
+from .models import Product, ThreeDPrintingProject
+
+
+IMAGE_MODELS = (Product, ThreeDPrintingProject)
+
+# Format -> (Pillow format name, file extension, Pillow feature, save options)
+FORMATS = {
+    'avif': ('AVIF', 'avif', 'avif', {'quality': 60}),
+    'webp': ('WEBP', 'webp', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', None, {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def get_widths():
+    return getattr(settings, 'IMAGE_RENDITION_WIDTHS', [320, 640, 960, 1280])
+
+
+def get_formats():
+    """Configured formats the installed Pillow can actually encode."""
+    formats = getattr(settings, 'IMAGE_RENDITION_FORMATS', ['avif', 'webp', 'jpeg'])
+    return [
+        name for name in formats
+        if name in FORMATS and (FORMATS[name][2] is None or features.check(FORMATS[name][2]))
+    ]
+
+
+def get_stale_queryset(model, force=False):
+    """Rows with an image whose renditions are missing or were built from another file."""
+    queryset = model.objects.exclude(image='').exclude(image__isnull=True)
+    if not force:
+        queryset = queryset.filter(
+            Q(image_renditions__source__isnull=True) | ~Q(image_renditions__source=F('image'))
+        )
+    return queryset.order_by('pk')
+
+
+def is_current(renditions, image_name):
+    """Whether ``renditions`` (and the stored size) describe the file ``image_name``."""
+    return bool(image_name) and bool(renditions) and renditions.get('source') == image_name
+
+
+def get_rendition_name(source_name, width, extension):
+    directory, filename = posixpath.split(source_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'renditions', f'{stem}-{width}w.{extension}')
+
+
+def encode(image, format_name):
+    pillow_format, extension, feature, options = FORMATS[format_name]
+    if pillow_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def build_renditions(field_file, force=False):
+    """
+    Write every rendition of ``field_file`` and return the ``image_renditions``
+    mapping plus the source's intrinsic width and height.
+    """
+    storage = field_file.storage
+    with field_file.open('rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+    width, height = original.size
+    if original.mode not in ('RGB', 'RGBA', 'L'):
+        original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+    # Never upscale; an image narrower than every width gets a single rendition
+    widths = [w for w in get_widths() if w < width] + [min(width, max(get_widths()))]
+    renditions = {'source': field_file.name, 'formats': {}}
+    for format_name in get_formats():
+        extension = FORMATS[format_name][1]
+        entries = {}
+        for target_width in sorted(set(widths)):
+            name = get_rendition_name(field_file.name, target_width, extension)
+            if force or not storage.exists(name):
+                target_height = max(1, round(height * target_width / width))
+                resized = original.resize((target_width, target_height), Image.Resampling.LANCZOS)
+                if storage.exists(name):
+                    storage.delete(name)
+                name = storage.save(name, ContentFile(encode(resized, format_name)))
+            entries[str(target_width)] = name
+        renditions['formats'][format_name] = entries
+    return renditions, width, height
+
+
+def process_instance(instance, force=False):
+    renditions, width, height = build_renditions(instance.image, force=force)
+    # Update only if the image was not replaced meanwhile. This bypasses the
+    # signals, so do what content.signals does for a save explicitly.
+    with transaction.atomic():
+        updated = type(instance).objects.filter(pk=instance.pk, image=instance.image.name).update(
+            image_renditions=renditions,
+            image_width=width,
+            image_height=height,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            changes.record_change(instance, changes.UPDATED)
+    if updated:
+        database.pin_primary()
+        cache.invalidate_model(type(instance))
+        events.broker.notify()
+        if getattr(settings, 'SNAPSHOT_AUTO_EXPORT', False):
+            snapshots.schedule_export(instance)
+    return bool(updated)
+
+
+def process_pending(models=IMAGE_MODELS, force=False, limit=None, on_error=None):
+    """Process stale rows of ``models``. Returns ``(processed, failed)`` counts."""
+    processed = failed = 0
+    for model in models:
+        queryset = get_stale_queryset(model, force=force).only('pk', 'image', 'image_renditions')
+        if limit is not None:
+            queryset = queryset[:max(0, limit - processed)]
+        for instance in queryset.iterator():
+            try:
+                if process_instance(instance, force=force):
+                    processed += 1
+            except (OSError, ValueError) as e:
+                # Remember the failure so the row is not retried until its
+                # image changes (or --force is used)
+                model.objects.filter(pk=instance.pk, image=instance.image.name).update(
+                    image_renditions={'source': instance.image.name, 'error': str(e)},
+                    image_width=None,
+                    image_height=None,
+                )
+                failed += 1
+                if on_error:
+                    on_error(instance, e)
+    return processed, failed
+
+
+# Names made of unreserved characters, without empty or dot segments: quoting
+# and URL joining leave them untouched, so their URL is a prefix plus the name
+PLAIN_FILE_NAME = re.compile(r'[\w-][\w.-]*(/[\w-][\w.-]*)*', re.ASCII)
+
+
+def get_url_builder(request, storage=default_storage):
+    """
+    Return a function mapping a file name to the URL serializers output for
+    it: the storage URL, made absolute when there is a request. With the file
+    system storage, plain names skip the per-name URL joining and quoting.
+    """
+    def build_url(name):
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    if not isinstance(storage, FileSystemStorage):
+        return build_url
+    probe = build_url('x')
+    if not probe.endswith('/x'):
+        return build_url
+    prefix = probe[:-1]
+
+    def build_plain_url(name):
+        return prefix + name if PLAIN_FILE_NAME.fullmatch(name) else build_url(name)
+    return build_plain_url
+
+
+def get_srcset(request, renditions, build_url=None):
+    """
+    Return ``{format: "url 320w, url 640w, ..."}`` for serializers.
+    ``build_url`` is a ``get_url_builder`` function to reuse across rows.
+    """
+    if not renditions or not renditions.get('formats'):
+        return None
+    build_url = build_url or get_url_builder(request)
+    srcset = {}
+    for format_name, entries in renditions.get('formats', {}).items():
+        candidates = []
+        for width, name in sorted(entries.items(), key=lambda item: int(item[0])):
+            candidates.append(f'{build_url(name)} {width}w')
+        srcset[format_name] = ', '.join(candidates)
+    return srcset
@@ -0,0 +1,47 @@
+"""
+Helpers for language-projected API responses (``?lang=en|ar``).
+
+Bilingual models store each translatable field twice, suffixed ``_en`` and
+``_ar``. When a client asks for one language, the other language's columns are
+neither read from the database nor serialized.
+"""
+from django.conf import settings
+
+
+LANGUAGE_PARAM = 'lang'
+
+
+def get_language_codes():
+    return [code for code, name in settings.LANGUAGES]
+
+
+def get_projection_language(request):
+    """Return the language requested via ``?lang=``, or None for both."""
+    if request is None:
+        return None
+    lang = request.GET.get(LANGUAGE_PARAM)
+    if lang in get_language_codes():
+        return lang
+    return None
+
+
+def get_excluded_suffixes(lang):
+    return tuple(f'_{code}' for code in get_language_codes() if code != lang)
+
+
+def get_deferred_fields(model, lang, related=()):
+    """
+    Return the column names to ``defer()`` for ``lang``, including those on
+    ``select_related`` relations listed in ``related``.
+    """
+    suffixes = get_excluded_suffixes(lang)
+    deferred = [
+        field.name for field in model._meta.concrete_fields
+        if field.name.endswith(suffixes)
+    ]
+    for relation in related:
+        related_model = model._meta.get_field(relation).related_model
+        deferred += [
+            f'{relation}__{name}' for name in get_deferred_fields(related_model, lang)
+        ]
+    return deferred
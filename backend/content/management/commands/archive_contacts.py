@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from content.archive import archive_contact_messages, get_archivable, get_archive_after
+
+
+class Command(BaseCommand):
+    help = 'Move replied and archived contact messages past the retention age to the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Archive messages older than this many days (default: CONTACT_ARCHIVE_AFTER_DAYS)'
+        )
+        parser.add_argument('--chunk-size', type=int, default=500, help='Messages moved per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the messages that would be archived')
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options['days']) if options['days'] is not None else get_archive_after()
+
+        if options['dry_run']:
+            count = get_archivable(older_than).count()
+            self.stdout.write(f'{count} messages would be archived')
+            return
+
+        moved = archive_contact_messages(older_than, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} messages'))
@@ -0,0 +1,94 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from content import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure latency, queries and response size of every API route on synthetic datasets. '
+        'Runs against a throwaway test database, never the configured one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+            help='Dataset sizes (products and contact messages) to measure',
+        )
+        parser.add_argument('--requests', type=int, default=50, help='Requests per route and cache mode')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the synthetic data')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Fail if results regress against this JSON file')
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help='Allowed latency increase over the baseline as a fraction (default: 0.25)',
+        )
+        parser.add_argument(
+            '--min-delta-ms', type=float, default=1.0,
+            help='Ignore latency increases smaller than this many milliseconds',
+        )
+        parser.add_argument(
+            '--metric', action='append', choices=benchmark.LATENCY_METRICS,
+            help='Latency metric compared against the baseline (repeatable; default: p50_ms)',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        report = self.run(options)
+        self.print_report(report)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+        if baseline is not None:
+            regressions = benchmark.compare(
+                report, baseline, threshold=options['threshold'], min_delta_ms=options['min_delta_ms'],
+                metrics=options['metric'] or benchmark.COMPARED_METRICS,
+            )
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def run(self, options):
+        # Same setup as the test runner: a fresh database, DEBUG off and
+        # uploads kept out of MEDIA_ROOT. Every contact submission is let
+        # through, so the contact case measures the write rather than the
+        # throttle's 429 or the duplicate check's short-circuit.
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as media_root, override_settings(
+                DEBUG=False, MEDIA_ROOT=media_root, CONTACT_THROTTLE_BUCKETS={}, CONTACT_DEDUP_WINDOW=0,
+            ):
+                return benchmark.run(
+                    options['sizes'], requests=options['requests'], seed=options['seed'], stdout=self.stdout
+                )
+        except benchmark.BenchmarkError as e:
+            raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def print_report(self, report):
+        header = f'{"route":<32} {"mode":<5} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"queries":>8} {"bytes":>9}'
+        for size, cases in report['results'].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\nDataset size {size}'))
+            self.stdout.write(header)
+            for name, modes in cases.items():
+                for mode, result in modes.items():
+                    self.stdout.write(
+                        f'{name:<32} {mode:<5} {result["p50_ms"]:>9.2f} {result["p95_ms"]:>9.2f} '
+                        f'{result["p99_ms"]:>9.2f} {result["queries"]:>8g} {result["bytes"]:>9}'
+                    )
@@ -0,0 +1,154 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from content import benchmark, database, synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput and latency of the ASGI and WSGI handlers and of the database profiles with many '
+        'concurrent clients, optionally during a burst of contact form writes. Each server and profile runs in its '
+        'own process against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server', action='append', choices=benchmark.SERVERS,
+            help='Handler to measure (repeatable; default: both)',
+        )
+        parser.add_argument(
+            '--profile', action='append', choices=database.PROFILES,
+            help='Database profile to measure (repeatable; default: the current DATABASE_PROFILE)',
+        )
+        parser.add_argument('--connections', type=int, default=500, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=5000, help='Total requests per server')
+        parser.add_argument(
+            '--path', action='append',
+            help=f'Path to request, cycled across clients (repeatable; default: {" ".join(benchmark.CONCURRENCY_PATHS)})',
+        )
+        parser.add_argument('--size', type=int, default=10000, help='Dataset size (see the benchmark command)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the synthetic data')
+        parser.add_argument(
+            '--writers', type=int, default=0,
+            help='Also measure the reads while this many processes post contact form submissions',
+        )
+        parser.add_argument(
+            '--write-rate', type=float, default=20.0,
+            help='Submissions per second across all writers; 0 posts as fast as they can',
+        )
+        parser.add_argument(
+            '--uncached', action='store_true',
+            help='Bypass the response cache, so that every read queries the database',
+        )
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        if options['connections'] < 1 or options['requests'] < 1:
+            raise CommandError('--connections and --requests must be at least 1')
+        if options['writers'] < 0 or options['write_rate'] < 0:
+            raise CommandError('--writers and --write-rate must not be negative')
+        runs = [
+            (profile, server)
+            for profile in options['profile'] or [database.get_profile()]
+            for server in options['server'] or benchmark.SERVERS
+        ]
+        if runs == [(database.get_profile(), self.current_server())]:
+            results = self.measure(runs[0][1], options)
+        else:
+            # The views are built as async or sync when the URLconf is loaded
+            # and the database is set up with the settings, so each run gets a
+            # process with CONTENT_ASYNC_VIEWS and DATABASE_PROFILE to match
+            results = [result for profile, server in runs for result in self.spawn(profile, server, options)]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        self.stdout.write(
+            f'{"profile":<13} {"server":<6} {"connections":>11} {"requests":>9} {"errors":>7} {"req/s":>9} '
+            f'{"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"writers":>8} {"writes/s":>9} {"w errors":>9}'
+        )
+        for result in results:
+            self.stdout.write(
+                f'{result["profile"]:<13} {result["server"]:<6} {result["connections"]:>11} '
+                f'{result["requests"]:>9} {result["errors"]:>7} {result["throughput_rps"]:>9.1f} '
+                f'{result["p50_ms"]:>9.2f} {result["p95_ms"]:>9.2f} {result["p99_ms"]:>9.2f} '
+                f'{result["writers"]:>8} {result["write_rps"]:>9.1f} {result["write_errors"]:>9}'
+            )
+
+    def current_server(self):
+        return 'asgi' if settings.CONTENT_ASYNC_VIEWS else 'wsgi'
+
+    def spawn(self, profile, server, options):
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_concurrency', '--json', '--server', server,
+            '--connections', str(options['connections']), '--requests', str(options['requests']),
+            '--size', str(options['size']), '--seed', str(options['seed']), '--writers', str(options['writers']),
+            '--write-rate', str(options['write_rate']),
+        ]
+        for path in options['path'] or ():
+            command += ['--path', path]
+        if options['uncached']:
+            command.append('--uncached')
+        env = dict(os.environ, CONTENT_ASYNC_VIEWS='1' if server == 'asgi' else '0', DATABASE_PROFILE=profile)
+        completed = subprocess.run(
+            command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if completed.returncode:
+            raise CommandError(f'The {profile} {server} run failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def measure(self, server, options):
+        """Measure the reads alone and, with --writers, during a write burst."""
+        setup_test_environment()
+        test_settings = connection.settings_dict['TEST']
+        old_name, old_test_name = connection.settings_dict['NAME'], test_settings['NAME']
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if connection.vendor == 'sqlite':
+                # SQLite's test database is in memory by default, where WAL and
+                # the other PRAGMAs don't apply
+                test_settings['NAME'] = os.path.join(temp_dir, 'benchmark.sqlite3')
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                with override_settings(
+                    DEBUG=False, MEDIA_ROOT=temp_dir, **self.get_settings(options)
+                ):
+                    generator = synthetic.Generator(seed=options['seed'])
+                    with transaction.atomic():
+                        generator.generate(benchmark.get_counts(options['size']))
+                        synthetic.finalize(generator.written)
+                    results = []
+                    for writers in sorted({0, options['writers']}):
+                        result = benchmark.measure_concurrency(
+                            server, paths=options['path'] or benchmark.CONCURRENCY_PATHS,
+                            connections=options['connections'], requests=options['requests'], writers=writers,
+                            write_rate=options['write_rate'] or None,
+                        )
+                        results.append(dict(result, profile=database.get_profile()))
+                    return results
+            except benchmark.BenchmarkError as e:
+                raise CommandError(str(e))
+            finally:
+                connection.close()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                test_settings['NAME'] = old_test_name
+                teardown_test_environment()
+
+    def get_settings(self, options):
+        overrides = {}
+        if options['writers']:
+            # Let every submission through to the database
+            overrides.update(CONTACT_THROTTLE_BUCKETS={}, CONTACT_DEDUP_WINDOW=0)
+        if options['uncached']:
+            overrides.update(
+                CACHES=dict(settings.CACHES, benchmark={'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}),
+                CONTENT_CACHE_ALIAS='benchmark',
+            )
+        return overrides
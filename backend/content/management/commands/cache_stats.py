@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from content import cache
+from content.signals import CACHED_MODELS
+
+
+class Command(BaseCommand):
+    help = 'Show hit ratio and invalidation counts for the content API response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = cache.get_stats(CACHED_MODELS)
+
+        self.stdout.write(f"Hits:      {stats['hits']}")
+        self.stdout.write(f"Misses:    {stats['misses']}")
+        self.stdout.write(f"Hit ratio: {stats['hit_ratio']:.1%}")
+        self.stdout.write('Invalidations:')
+        for label, count in stats['invalidations'].items():
+            self.stdout.write(f'  {label}: {count}')
+
+        if options['reset']:
+            cache.reset_stats(CACHED_MODELS)
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from content.changes import compact_changes, get_expired_tombstones, get_retention
+
+
+class Command(BaseCommand):
+    help = 'Remove tombstones past the retention age from the /api/changes/ feed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Remove tombstones older than this many days (default: CHANGE_FEED_RETENTION_DAYS)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count the tombstones that would be removed')
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options['days']) if options['days'] is not None else get_retention()
+
+        if options['dry_run']:
+            count = get_expired_tombstones(older_than).count()
+            self.stdout.write(f'{count} tombstones would be removed')
+            return
+
+        removed = compact_changes(older_than)
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} tombstones'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from content import throttling
+
+
+class Command(BaseCommand):
+    help = 'Show accepted, deduplicated and rate-limited contact form submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = throttling.get_stats()
+
+        self.stdout.write(f"Accepted:        {stats['accepted']}")
+        self.stdout.write(f"Deduplicated:    {stats['deduplicated']}")
+        self.stdout.write(f"Rejected (IP):   {stats['rejected:ip']}")
+        self.stdout.write(f"Rejected (all):  {stats['rejected:global']}")
+
+        if options['reset']:
+            throttling.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from content import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Pre-render API responses as static JSON files with precompressed variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--route',
+            action='append',
+            choices=list(snapshots.get_routes()),
+            help='Only export this route (repeatable); defaults to every route plus home and site settings'
+        )
+        parser.add_argument('--output', help='Publish directory (defaults to SNAPSHOT_ROOT)')
+
+    def handle(self, *args, **options):
+        exporter = snapshots.Exporter(root=options['output'])
+        if options['route']:
+            for prefix in options['route']:
+                exporter.export_route(prefix)
+        else:
+            exporter.export_all()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {exporter.written} files to {exporter.root}, removed {exporter.removed}'
+        ))
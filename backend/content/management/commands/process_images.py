@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from content.images import IMAGE_MODELS, process_pending
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive image renditions for products and 3D printing projects'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild renditions for every image, not only new or changed ones')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new uploads instead of exiting')
+        parser.add_argument('--interval', type=float, default=10.0, help='Seconds between polls with --loop')
+        parser.add_argument('--limit', type=int, help='Maximum number of images to process per pass')
+
+    def handle(self, *args, **options):
+        force = options['force']
+        while True:
+            processed, failed = process_pending(
+                IMAGE_MODELS, force=force, limit=options['limit'], on_error=self.report_error
+            )
+            if processed or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Processed {processed} images, {failed} failed'))
+            if not options['loop']:
+                break
+            # --force applies to the first pass only
+            force = False
+            time.sleep(options['interval'])
+
+    def report_error(self, instance, error):
+        self.stderr.write(f'{instance._meta.label} {instance.pk}: {error}')
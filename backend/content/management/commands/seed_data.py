@@ -1,11 +1,81 @@
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from content import synthetic
 from content.models import Service, ProductCategory, Product, Course, SiteSettings, ThreeDPrintingProject
 
 
 class Command(BaseCommand):
     help = 'Seed database with initial data matching frontend content'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bulk', action='store_true',
+            help='Upsert rows with bulk_create in one transaction instead of one get_or_create per row; '
+                 'existing rows are updated to the seed content',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk INSERT')
+        parser.add_argument('--seed', type=int, help='Random seed for reproducible synthetic data')
+        for name in synthetic.COUNT_NAMES:
+            parser.add_argument(
+                f'--{name}', type=int, default=0, metavar='N',
+                help=f'Also generate N synthetic {name} (implies --bulk)',
+            )
+
+    def handle(self, *args, **options):
+        counts = {name: options[name] for name in synthetic.COUNT_NAMES}
+        if any(count < 0 for count in counts.values()):
+            raise CommandError('Counts must not be negative')
+        self.bulk = options['bulk'] or any(counts.values())
+        self.batch_size = options['batch_size']
+
+        started = time.perf_counter()
+        if self.bulk:
+            # Bulk inserts bypass signals, so finalize() catches up on the
+            # change feed, search index and response cache before the commit
+            generator = synthetic.Generator(seed=options['seed'], batch_size=self.batch_size, stdout=self.stdout)
+            self.written = generator.written
+            with transaction.atomic():
+                self.seed()
+                generator.generate(counts)
+                synthetic.finalize(generator.written)
+        else:
+            self.seed()
+        self.stdout.write(self.style.SUCCESS(
+            f'\nDatabase seeding completed successfully in {time.perf_counter() - started:.1f}s!'
+        ))
+
+    def upsert(self, model, rows, lookup):
+        """
+        Create the rows that don't exist yet, matching on the ``lookup`` fields.
+        In bulk mode existing rows are updated as well.
+        """
+        if not self.bulk:
+            for row in rows:
+                model.objects.get_or_create(defaults=row, **{field: row[field] for field in lookup})
+            return
+
+        fields = [model._meta.get_field(field) for field in lookup]
+        unique = len(fields) == 1 and fields[0].unique
+        existing = {}
+        if not unique:
+            attnames = [field.attname for field in fields]
+            existing = {tuple(values[:-1]): values[-1] for values in model.objects.values_list(*attnames, 'pk')}
+        objects = []
+        for row in rows:
+            instance = model(**row)
+            if not unique:
+                instance.pk = existing.get(tuple(getattr(instance, field.attname) for field in fields))
+            objects.append(instance)
+        unique_fields = lookup if unique else ['id']
+        objects = model.objects.bulk_create(
+            objects, batch_size=self.batch_size, update_conflicts=True, unique_fields=unique_fields,
+            update_fields=[field for field in list(rows[0]) + ['updated_at'] if field not in unique_fields],
+        )
+        self.written.setdefault(model, []).extend(obj.pk for obj in objects)
+
+    def seed(self):
         self.stdout.write('Seeding database...')
 
         # Create Services
@@ -36,11 +106,7 @@ class Command(BaseCommand):
             },
         ]
 
-        for service_data in services_data:
-            Service.objects.get_or_create(
-                title_en=service_data['title_en'],
-                defaults=service_data
-            )
+        self.upsert(Service, services_data, ['title_en'])
         self.stdout.write(self.style.SUCCESS(f'Created {len(services_data)} services'))
 
         # Create Product Categories
@@ -52,11 +118,7 @@ class Command(BaseCommand):
             {'name_en': 'Equipment & Machinery', 'name_ar': 'المعدات والآلات', 'slug': 'equipment-machinery', 'order': 5},
         ]
 
-        for cat_data in categories_data:
-            ProductCategory.objects.get_or_create(
-                slug=cat_data['slug'],
-                defaults=cat_data
-            )
+        self.upsert(ProductCategory, categories_data, ['slug'])
         self.stdout.write(self.style.SUCCESS(f'Created {len(categories_data)} product categories'))
 
         # Create Products
@@ -94,12 +156,7 @@ class Command(BaseCommand):
             },
         ]
 
-        for product_data in products_data:
-            Product.objects.get_or_create(
-                name_en=product_data['name_en'],
-                category=product_data['category'],
-                defaults=product_data
-            )
+        self.upsert(Product, products_data, ['name_en', 'category'])
         self.stdout.write(self.style.SUCCESS(f'Created {len(products_data)} products'))
 
         # Create Courses
@@ -139,11 +196,7 @@ class Command(BaseCommand):
             },
         ]
 
-        for course_data in courses_data:
-            Course.objects.get_or_create(
-                title_en=course_data['title_en'],
-                defaults=course_data
-            )
+        self.upsert(Course, courses_data, ['title_en'])
         self.stdout.write(self.style.SUCCESS(f'Created {len(courses_data)} courses'))
 
         # Create Site Settings
@@ -201,12 +254,6 @@ class Command(BaseCommand):
             },
         ]
 
-        for project_data in printing_projects_data:
-            ThreeDPrintingProject.objects.get_or_create(
-                title_en=project_data['title_en'],
-                defaults=project_data
-            )
+        self.upsert(ThreeDPrintingProject, printing_projects_data, ['title_en'])
         self.stdout.write(self.style.SUCCESS(f'Created {len(printing_projects_data)} 3D printing projects'))
 
-        self.stdout.write(self.style.SUCCESS('\nDatabase seeding completed successfully!'))
-
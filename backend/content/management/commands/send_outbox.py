@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from content.emails import send_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued contact form emails over a single mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails claimed per batch')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Attempts before an email is marked failed')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_outbox(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+            )
+            if sent or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Sent {sent} emails, {failed} failed'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
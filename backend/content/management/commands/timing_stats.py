@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from content import timing
+
+
+class Command(BaseCommand):
+    help = 'Show average SQL, serializer and render time per API route over the recent window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, help='Minutes to aggregate (defaults to SERVER_TIMING_WINDOW)')
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = timing.get_route_stats(options['window'])
+        if not stats:
+            self.stdout.write('No requests recorded in the window')
+        else:
+            self.stdout.write(
+                f'{"route":<48} {"requests":>8} {"mean ms":>9} {"sql ms":>8} {"queries":>8} '
+                f'{"serialize ms":>12} {"render ms":>9}'
+            )
+            for route, row in sorted(stats.items(), key=lambda item: -item[1]['mean_ms'] * item[1]['requests']):
+                self.stdout.write(
+                    f'{route:<48} {row["requests"]:>8} {row["mean_ms"]:>9.2f} {row["sql_ms"]:>8.2f} '
+                    f'{row["queries"]:>8.1f} {row["serialize_ms"]:>12.2f} {row["render_ms"]:>9.2f}'
+                )
+
+        if options['reset']:
+            timing.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
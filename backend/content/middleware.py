@@ -0,0 +1,94 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import database, timing
+
+
+class ServerTimingMiddleware:
+    """
+    Time SQL, serializers and rendering for every request, feed the per-route
+    aggregate and, for staff and allow-listed clients, add a ``Server-Timing``
+    header. Removes itself from the stack unless ``SERVER_TIMING_ENABLED``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not timing.is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Lets the async handler call the hook without a thread hop
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = timing.Timer()
+        token = timing.activate(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.deactivate(token)
+        timer.finish()
+        return self.finish(request, response, timer, timing.can_view(request))
+
+    async def __acall__(self, request):
+        timer = timing.Timer()
+        token = timing.activate(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.deactivate(token)
+        timer.finish()
+        return self.finish(request, response, timer, await timing.acan_view(request))
+
+    def finish(self, request, response, timer, allowed):
+        route = timing.get_route(request)
+        if route is not None:
+            timing.record(route, timer)
+        if allowed:
+            response['Server-Timing'] = timer.get_header()
+        return response
+
+    def process_template_response(self, request, response):
+        return self.time_render(response)
+
+    async def aprocess_template_response(self, request, response):
+        return self.time_render(response)
+
+    def time_render(self, response):
+        # DRF responses are rendered after the view returns, right after this hook
+        timer = timing.get_timer()
+        if timer is not None:
+            timer.start_render()
+            response.add_post_render_callback(timer.finish_render)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Keep a client that has just written through the admin on the primary
+    database (see ``content.database.pin_client``). Place after
+    ``SessionMiddleware``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        database.pin_client(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        database.pin_client(request, response)
+        return response
@@ -0,0 +1,75 @@
+import re
+
+from django.db import migrations
+
+
+# Frozen copies of the content.search schema and rules as of this migration,
+# so it replays whatever the models and helpers become. The
+# rebuild_search_index command re-indexes with the current rules.
+SEARCH_TABLE = 'content_search'
+CODE_BITS = 3
+# Model -> (code stored in the low bits of the rowid, name prefix)
+SEARCH_MODELS = {
+    'Product': (1, 'name'),
+    'Service': (2, 'title'),
+    'Course': (3, 'title'),
+    'ThreeDPrintingProject': (4, 'title'),
+}
+TASHKEEL_RE = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+ARABIC_LETTER_MAP = {
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+}
+
+
+def normalize_arabic(text):
+    text = TASHKEEL_RE.sub('', text or '')
+    for letter, replacement in ARABIC_LETTER_MAP.items():
+        text = text.replace(letter, replacement)
+    return text
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            f"USING fts5(title, body, tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        for model_name, (code, prefix) in SEARCH_MODELS.items():
+            model = apps.get_model('content', model_name)
+            rows = model.objects.using(connection.alias).values_list(
+                'pk', f'{prefix}_en', f'{prefix}_ar', 'description_en', 'description_ar'
+            )
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, title, body) VALUES (%s, %s, %s)',
+                [
+                    (
+                        (pk << CODE_BITS) | code,
+                        normalize_arabic(f'{title_en} {title_ar}'),
+                        normalize_arabic(f'{description_en} {description_ar}'),
+                    )
+                    for pk, title_en, title_ar, description_en, description_ar in rows
+                ],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0004_outboxemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['-created_at'], name='contact_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['status', '-created_at'], name='contact_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['order', 'title_en'], name='course_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['level', 'order', 'title_en'], name='course_level_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['order', 'title_en'], name='course_featured_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['created_at'], name='course_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['order', 'name_en'], name='product_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'order', 'name_en'], name='product_category_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['order', 'name_en'], name='product_featured_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at'], name='product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productcategory',
+            index=models.Index(fields=['order', 'name_en'], name='category_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['order', 'title_en'], name='service_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threedprintingproject',
+            index=models.Index(fields=['order', 'title_en'], name='printing_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threedprintingproject',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['order', 'title_en'], name='printing_featured_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threedprintingproject',
+            index=models.Index(fields=['created_at'], name='printing_created_idx'),
+        ),
+    ]
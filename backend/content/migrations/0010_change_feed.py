@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0009_contact_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCompaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('horizon', models.BigIntegerField(verbose_name='Horizon')),
+                ('removed', models.PositiveIntegerField(default=0, verbose_name='Tombstones Removed')),
+                ('compacted_at', models.DateTimeField(auto_now_add=True, verbose_name='Compacted At')),
+            ],
+            options={
+                'verbose_name': 'Change Compaction',
+                'verbose_name_plural': 'Change Compactions',
+                'ordering': ['-horizon'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ContentChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False, verbose_name='Sequence')),
+                ('change_type', models.CharField(max_length=30, verbose_name='Type')),
+                ('object_id', models.BigIntegerField(verbose_name='Object ID')),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10, verbose_name='Action')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Changed At')),
+            ],
+            options={
+                'verbose_name': 'Content Change',
+                'verbose_name_plural': 'Content Changes',
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['change_type', 'object_id'], name='change_object_idx'), models.Index(fields=['action', 'changed_at'], name='change_action_changed_idx')],
+            },
+        ),
+    ]
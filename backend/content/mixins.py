@@ -0,0 +1,387 @@
+import hashlib
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from . import cache, compression, database
+from .languages import get_deferred_fields, get_projection_language
+from .renderers import FastJSONRenderer
+from .serializers import ValuesSerializer
+
+
+def use_async_views():
+    return getattr(settings, 'CONTENT_ASYNC_VIEWS', False)
+
+
+class AsyncDispatchMixin:
+    """
+    Serve a DRF view from ``async_<action>`` (viewsets) or ``async_<method>``
+    coroutines when built with ``async_mode=True``, which is the default when
+    ``CONTENT_ASYNC_VIEWS`` is on (the ASGI deployment). Handlers without an
+    async variant, and authentication if the view has any, run in a worker
+    thread. Otherwise the view is the usual synchronous DRF view.
+    """
+    async_mode = False
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        initkwargs.setdefault('async_mode', use_async_views())
+        view = super().as_view(*args, **initkwargs)
+        if not initkwargs['async_mode']:
+            return view
+
+        # DRF's view function returns the coroutine from dispatch(); awaiting
+        # it in a coroutine function lets Django call the view natively
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+        return update_wrapper(async_view, view)
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.async_mode:
+            return self.async_dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def async_dispatch(self, request, *args, **kwargs):
+        """``APIView.dispatch`` with awaited handlers."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            if request.authenticators:
+                # Authenticators may load the session or user from the database
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+            else:
+                self.initial(request, *args, **kwargs)
+
+            method = request.method.lower()
+            if method in self.http_method_names:
+                name = getattr(self, 'action', None) or ('get' if method == 'head' else method)
+                handler = getattr(self, f'async_{name}', None)
+                if handler is None:
+                    handler = sync_to_async(getattr(self, method, self.http_method_not_allowed))
+            else:
+                handler = sync_to_async(self.http_method_not_allowed)
+            response = await handler(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class ReplicaReadMixin:
+    """
+    Read from a replica when ``DATABASE_REPLICAS`` are configured (see
+    ``content.database``). Place before ``AsyncDispatchMixin``.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        if getattr(self, 'async_mode', False):
+            # Enters use_replica() in async_dispatch, inside the coroutine
+            return super().dispatch(request, *args, **kwargs)
+        with database.use_replica(request):
+            return super().dispatch(request, *args, **kwargs)
+
+    async def async_dispatch(self, request, *args, **kwargs):
+        with database.use_replica(request):
+            return await super().async_dispatch(request, *args, **kwargs)
+
+
+class AsyncReadOnlyModelMixin:
+    """Async ``list`` and ``retrieve`` on the async ORM, mirroring DRF's model mixins."""
+
+    async def async_list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.async_paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer([instance async for instance in queryset], many=True)
+        return Response(serializer.data)
+
+    async def async_retrieve(self, request, *args, **kwargs):
+        instance = await self.async_get_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    async def async_get_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+    async def async_paginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        if hasattr(self.paginator, 'apaginate_queryset'):
+            return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+        return await sync_to_async(self.paginator.paginate_queryset)(queryset, self.request, view=self)
+
+
+class ValuesListMixin:
+    """
+    Build ``list`` responses from ``values()`` rows with ``ValuesSerializer``
+    rather than from model instances, and render them with orjson when it is
+    installed. Responses are identical to the regular path's, which is used
+    when the serializer has fields ``ValuesSerializer`` can't read from rows.
+    """
+    renderer_classes = [FastJSONRenderer] + [
+        renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES if renderer is not JSONRenderer
+    ]
+
+    def get_values_serializer(self):
+        values_serializer = ValuesSerializer(self.get_serializer())
+        return values_serializer if values_serializer.supported else None
+
+    def get_values_queryset(self, queryset, values_serializer):
+        # Keyset pagination reads the ordering fields from the rows
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        ordering = [field.lstrip('-') for field in ordering if isinstance(field, str) and field != '?']
+        return queryset.values(*dict.fromkeys(values_serializer.columns + ordering + ['id']))
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = self.get_values_serializer()
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.get_values_queryset(self.filter_queryset(self.get_queryset()), values_serializer)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.serialize(page))
+        return Response(values_serializer.serialize(queryset))
+
+    async def async_list(self, request, *args, **kwargs):
+        values_serializer = self.get_values_serializer()
+        if values_serializer is None:
+            return await super().async_list(request, *args, **kwargs)
+        queryset = self.get_values_queryset(self.filter_queryset(self.get_queryset()), values_serializer)
+        page = await self.async_paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.serialize(page))
+        return Response(values_serializer.serialize([row async for row in queryset]))
+
+
+class CachedResponseMixin:
+    """
+    Serve list and detail responses from the content cache, with
+    ETag / Last-Modified validators derived from ``updated_at``.
+    Entries are invalidated whenever one of ``cache_models`` changes.
+    """
+    cache_models = None
+    # Timestamp fields whose maximum versions the response body
+    validator_fields = ('updated_at',)
+
+    def get_cache_models(self):
+        if self.cache_models is not None:
+            return self.cache_models
+        return (self.queryset.model,)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    async def async_list(self, request, *args, **kwargs):
+        return await self.async_cached_response(super().async_list, request, *args, **kwargs)
+
+    async def async_retrieve(self, request, *args, **kwargs):
+        return await self.async_cached_response(super().async_retrieve, request, *args, **kwargs)
+
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if getattr(self, 'action', None) == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_validator_aggregates(self):
+        aggregates = {
+            f'last_{index}': Max(field) for index, field in enumerate(self.validator_fields)
+        }
+        return dict(aggregates, count=Count('pk'))
+
+    def get_validators_from(self, result):
+        timestamps = [result[key] for key in result if key.startswith('last_') and result[key] is not None]
+        return (max(timestamps) if timestamps else None), result['count']
+
+    def get_validators(self):
+        """
+        Return ``(last_modified, count)`` for the rows behind this response,
+        using a single aggregate query.
+        """
+        result = self.get_validator_queryset().aggregate(**self.get_validator_aggregates())
+        return self.get_validators_from(result)
+
+    async def async_get_validators(self):
+        result = await self.get_validator_queryset().aaggregate(**self.get_validator_aggregates())
+        return self.get_validators_from(result)
+
+    def get_etag(self, request, validators):
+        last_modified, count = validators
+        parts = [
+            request.scheme,
+            request.get_host(),
+            request.path,
+            repr(sorted(request.GET.lists())),
+            translation.get_language() or '',
+            getattr(request, 'accepted_media_type', '') or '',
+            last_modified.isoformat() if last_modified else '',
+            str(count),
+        ]
+        digest = hashlib.md5('|'.join(parts).encode('utf-8'), usedforsecurity=False).hexdigest()
+        return f'"{digest}"'
+
+    def set_validator_headers(self, request, response, validators):
+        last_modified = validators[0]
+        response['ETag'] = self.get_etag(request, validators)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    def get_not_modified_response(self, request, validators):
+        last_modified = validators[0]
+        response = get_conditional_response(
+            request,
+            etag=self.get_etag(request, validators),
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+        if response is not None:
+            self.set_validator_headers(request, response, validators)
+        return response
+
+    def get_hit_response(self, request, key, entry):
+        """
+        Return the response for a cache hit, and whether ``entry`` gained a
+        compressed body that the caller should save.
+        """
+        validators = entry['validators']
+        not_modified = self.get_not_modified_response(request, validators)
+        if not_modified is not None:
+            not_modified['X-Cache'] = 'HIT'
+            return not_modified, False
+        stored = entry.get('bodies', {}).get(compression.get_media_type(request))
+        if stored is not None:
+            content_type, bodies = stored
+            count = len(bodies)
+            encoding, body = compression.add_body(bodies, request, bodies[compression.IDENTITY])
+            response = HttpResponse(content_type=content_type, headers={'X-Cache': 'HIT'})
+            self.set_validator_headers(request, response, validators)
+            return compression.set_body(response, encoding, body), len(bodies) != count
+        response = Response(entry['data'], headers={'X-Cache': 'HIT'})
+        self.store_body(request, key, entry, response)
+        return self.set_validator_headers(request, response, validators), False
+
+    def store_body(self, request, key, entry, response):
+        """Save the body of ``response`` in ``entry`` once it is rendered (see ``content.compression``)."""
+        media_type = compression.get_media_type(request)
+        if media_type is None:
+            return
+
+        # Rendering runs in a worker thread under ASGI too
+        def store(response):
+            content_type, bodies = entry.setdefault('bodies', {}).setdefault(media_type, (response['Content-Type'], {}))
+            encoding, body = compression.add_body(bodies, request, response.content)
+            cache.set_response(key, entry)
+            return compression.set_body(response, encoding, body)
+        response.add_post_render_callback(store)
+
+    def get_miss_not_modified_response(self, request, validators):
+        # A detail lookup that matches nothing falls through to the 404 path
+        if getattr(self, 'action', None) == 'retrieve' and not validators[1]:
+            return None
+        not_modified = self.get_not_modified_response(request, validators)
+        if not_modified is not None:
+            not_modified['X-Cache'] = 'MISS'
+        return not_modified
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = cache.build_key(request, self.get_cache_models())
+        entry = cache.get_response(key)
+        if entry is not None:
+            response, changed = self.get_hit_response(request, key, entry)
+            if changed:
+                cache.set_response(key, entry)
+            return response
+
+        validators = self.get_validators()
+        not_modified = self.get_miss_not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        response['X-Cache'] = 'MISS'
+        if response.status_code == 200:
+            entry = {'data': response.data, 'validators': validators}
+            cache.set_response(key, entry)
+            self.store_body(request, key, entry, response)
+            self.set_validator_headers(request, response, validators)
+        return response
+
+    async def async_cached_response(self, handler, request, *args, **kwargs):
+        """``cached_response`` for async views; ``handler`` is a coroutine function."""
+        key = await cache.abuild_key(request, self.get_cache_models())
+        entry = await cache.aget_response(key)
+        if entry is not None:
+            response, changed = self.get_hit_response(request, key, entry)
+            if changed:
+                await cache.aset_response(key, entry)
+            return response
+
+        validators = await self.async_get_validators()
+        not_modified = self.get_miss_not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        response = await handler(request, *args, **kwargs)
+        response['X-Cache'] = 'MISS'
+        if response.status_code == 200:
+            entry = {'data': response.data, 'validators': validators}
+            await cache.aset_response(key, entry)
+            self.store_body(request, key, entry, response)
+            self.set_validator_headers(request, response, validators)
+        return response
+
+
+class LanguageViewMixin:
+    """
+    Honour ``?lang=en|ar`` by serializing only that language's fields and
+    deferring the other language's columns, including on ``language_related``
+    ``select_related`` relations.
+    """
+    language_related = ()
+
+    def get_projection_language(self):
+        return get_projection_language(self.request)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['lang'] = self.get_projection_language()
+        return context
+
+    def project_queryset(self, queryset, related=()):
+        lang = self.get_projection_language()
+        if lang:
+            queryset = queryset.defer(*get_deferred_fields(queryset.model, lang, related))
+        return queryset
+
+    def get_queryset(self):
+        return self.project_queryset(super().get_queryset(), self.language_related)
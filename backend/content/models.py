@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -15,6 +17,9 @@ class Service(models.Model):
 
     class Meta:
         ordering = ['order', 'title_en']
+        indexes = [
+            models.Index(fields=['order', 'title_en'], name='service_order_idx'),
+        ]
         verbose_name = _('Service')
         verbose_name_plural = _('Services')
 
@@ -33,6 +38,9 @@ class ProductCategory(models.Model):
 
     class Meta:
         ordering = ['order', 'name_en']
+        indexes = [
+            models.Index(fields=['order', 'name_en'], name='category_order_idx'),
+        ]
         verbose_name = _('Product Category')
         verbose_name_plural = _('Product Categories')
 
@@ -53,6 +61,14 @@ class Product(models.Model):
     description_en = models.TextField(verbose_name=_('Description (English)'))
     description_ar = models.TextField(verbose_name=_('Description (Arabic)'))
     image = models.ImageField(upload_to='products/', blank=True, null=True, verbose_name=_('Image'))
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False, verbose_name=_('Image Width'))
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False, verbose_name=_('Image Height'))
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_('Resized copies of the image, generated by the process_images command')
+    )
     is_featured = models.BooleanField(default=False, verbose_name=_('Featured'))
     order = models.IntegerField(default=0, help_text=_('Display order'))
     created_at = models.DateTimeField(auto_now_add=True)
@@ -60,6 +76,16 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['order', 'name_en']
+        indexes = [
+            models.Index(fields=['order', 'name_en'], name='product_order_idx'),
+            models.Index(fields=['category', 'order', 'name_en'], name='product_category_order_idx'),
+            models.Index(
+                fields=['order', 'name_en'],
+                condition=models.Q(is_featured=True),
+                name='product_featured_order_idx'
+            ),
+            models.Index(fields=['created_at'], name='product_created_idx'),
+        ]
         verbose_name = _('Product')
         verbose_name_plural = _('Products')
 
@@ -89,6 +115,16 @@ class Course(models.Model):
 
     class Meta:
         ordering = ['order', 'title_en']
+        indexes = [
+            models.Index(fields=['order', 'title_en'], name='course_order_idx'),
+            models.Index(fields=['level', 'order', 'title_en'], name='course_level_order_idx'),
+            models.Index(
+                fields=['order', 'title_en'],
+                condition=models.Q(is_featured=True),
+                name='course_featured_order_idx'
+            ),
+            models.Index(fields=['created_at'], name='course_created_idx'),
+        ]
         verbose_name = _('Course')
         verbose_name_plural = _('Courses')
 
@@ -128,6 +164,33 @@ class SiteSettings(models.Model):
         obj, created = cls.objects.get_or_create(pk=1)
         return obj
 
+    @classmethod
+    def read(cls):
+        """Return the stored settings, or unsaved defaults; never writes."""
+        obj = cls.objects.filter(pk=1).first()
+        return obj if obj is not None else cls(pk=1)
+
+    @classmethod
+    async def aread(cls):
+        obj = await cls.objects.filter(pk=1).afirst()
+        return obj if obj is not None else cls(pk=1)
+
+    @classmethod
+    def cached(cls):
+        """
+        Return the settings from a process-level cache that is refreshed after
+        every save. The instance is shared, so treat it as read-only. Saves in
+        other processes are only seen through a shared content cache (see
+        ``content.cache.check_shared_cache``).
+        """
+        from .cache import get_local
+        return get_local(cls, cls.read)
+
+    @classmethod
+    async def acached(cls):
+        from .cache import aget_local
+        return await aget_local(cls, cls.aread)
+
 
 class ThreeDPrintingProject(models.Model):
     """3D Printing project or showcase"""
@@ -136,6 +199,14 @@ class ThreeDPrintingProject(models.Model):
     description_en = models.TextField(verbose_name=_('Description (English)'))
     description_ar = models.TextField(verbose_name=_('Description (Arabic)'))
     image = models.ImageField(upload_to='3d-printing/', blank=True, null=True, verbose_name=_('Image'))
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False, verbose_name=_('Image Width'))
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False, verbose_name=_('Image Height'))
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_('Resized copies of the image, generated by the process_images command')
+    )
     is_featured = models.BooleanField(default=False, verbose_name=_('Featured'))
     material = models.CharField(max_length=100, blank=True, help_text=_('e.g., PLA, ABS, PETG'))
     print_time = models.CharField(max_length=100, blank=True, help_text=_('Estimated print time'))
@@ -145,6 +216,15 @@ class ThreeDPrintingProject(models.Model):
 
     class Meta:
         ordering = ['order', 'title_en']
+        indexes = [
+            models.Index(fields=['order', 'title_en'], name='printing_order_idx'),
+            models.Index(
+                fields=['order', 'title_en'],
+                condition=models.Q(is_featured=True),
+                name='printing_featured_order_idx'
+            ),
+            models.Index(fields=['created_at'], name='printing_created_idx'),
+        ]
         verbose_name = _('3D Printing Project')
         verbose_name_plural = _('3D Printing Projects')
 
@@ -172,8 +252,120 @@ class ContactMessage(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='contact_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='contact_status_created_idx'),
+            # Prefix search in the admin (see PrefixSearchMixin)
+            models.Index(Lower('name'), name='contact_name_lower_idx'),
+            models.Index(Lower('email'), name='contact_email_lower_idx'),
+            models.Index(Lower('subject'), name='contact_subject_lower_idx'),
+        ]
         verbose_name = _('Contact Message')
         verbose_name_plural = _('Contact Messages')
 
     def __str__(self):
         return f"{self.name} - {self.subject}"
+
+
+class OutboxEmail(models.Model):
+    """Queued email for a contact form submission, delivered by the send_outbox command"""
+    STATUS_CHOICES = [
+        ('pending', _('Pending')),
+        ('sent', _('Sent')),
+        ('failed', _('Failed')),
+    ]
+
+    contact_message = models.ForeignKey(
+        ContactMessage,
+        on_delete=models.CASCADE,
+        related_name='emails',
+        verbose_name=_('Contact Message')
+    )
+    recipient = models.EmailField(verbose_name=_('Recipient'))
+    subject = models.CharField(max_length=300, verbose_name=_('Subject'))
+    body = models.TextField(verbose_name=_('Body'))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name=_('Status'))
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_('Attempts'))
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name=_('Next Attempt At'))
+    last_error = models.TextField(blank=True, verbose_name=_('Last Error'))
+    sent_at = models.DateTimeField(blank=True, null=True, verbose_name=_('Sent At'))
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+        ]
+        verbose_name = _('Outbox Email')
+        verbose_name_plural = _('Outbox Emails')
+
+    def __str__(self):
+        return f"{self.recipient} - {self.subject}"
+
+
+class ArchivedContactMessage(models.Model):
+    """Handled contact message moved out of ContactMessage by the archive_contacts command"""
+    original_id = models.BigIntegerField(unique=True, verbose_name=_('Original ID'))
+    name = models.CharField(max_length=200, verbose_name=_('Name'))
+    email = models.EmailField(verbose_name=_('Email'))
+    phone = models.CharField(max_length=50, blank=True, verbose_name=_('Phone'))
+    subject = models.CharField(max_length=300, verbose_name=_('Subject'))
+    message = models.TextField(verbose_name=_('Message'))
+    status = models.CharField(max_length=20, choices=ContactMessage.STATUS_CHOICES, verbose_name=_('Status'))
+    created_at = models.DateTimeField(verbose_name=_('Received At'))
+    updated_at = models.DateTimeField(verbose_name=_('Last Updated'))
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Archived At'))
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='archived_contact_created_idx'),
+        ]
+        verbose_name = _('Archived Contact Message')
+        verbose_name_plural = _('Archived Contact Messages')
+
+    def __str__(self):
+        return f"{self.name} - {self.subject}"
+
+
+class ContentChange(models.Model):
+    """Latest change to one content object, read by the /api/changes/ feed (see content/changes.py)"""
+    ACTION_CHOICES = [
+        ('created', _('Created')),
+        ('updated', _('Updated')),
+        ('deleted', _('Deleted')),
+    ]
+
+    seq = models.BigAutoField(primary_key=True, verbose_name=_('Sequence'))
+    change_type = models.CharField(max_length=30, verbose_name=_('Type'))
+    object_id = models.BigIntegerField(verbose_name=_('Object ID'))
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name=_('Action'))
+    changed_at = models.DateTimeField(default=timezone.now, verbose_name=_('Changed At'))
+
+    class Meta:
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['change_type', 'object_id'], name='change_object_idx'),
+            models.Index(fields=['action', 'changed_at'], name='change_action_changed_idx'),
+        ]
+        verbose_name = _('Content Change')
+        verbose_name_plural = _('Content Changes')
+
+    def __str__(self):
+        return f"{self.seq} {self.action} {self.change_type} {self.object_id}"
+
+
+class ChangeCompaction(models.Model):
+    """Run of the compact_changes command; feed cursors up to its horizon have lost tombstones"""
+    horizon = models.BigIntegerField(verbose_name=_('Horizon'))
+    removed = models.PositiveIntegerField(default=0, verbose_name=_('Tombstones Removed'))
+    compacted_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Compacted At'))
+
+    class Meta:
+        ordering = ['-horizon']
+        verbose_name = _('Change Compaction')
+        verbose_name_plural = _('Change Compactions')
+
+    def __str__(self):
+        return f"{self.horizon} ({self.compacted_at:%Y-%m-%d})"
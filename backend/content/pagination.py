@@ -0,0 +1,243 @@
+"""
+Pagination for the catalogue endpoints.
+
+Page-number pagination stays the default. Passing ``?cursor=`` switches a list
+to keyset pagination on the queryset's ordering plus ``id``: every page is a
+single indexed range query with no ``COUNT(*)`` and no ``OFFSET``, so deep pages
+cost the same as the first and rows added or removed concurrently never shift a
+page. ``?count=true`` opts back into the total count.
+
+Both classes also provide ``apaginate_queryset`` for the async views, which
+runs the same queries through the async ORM. The keyset helpers are shared
+with the admin changelists (see ``content.changelist``).
+"""
+import base64
+import json
+from operator import attrgetter
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def get_ordering(queryset):
+    """The queryset's field ordering, ending with ``id`` so positions are unique."""
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+    ordering = [field for field in ordering if isinstance(field, str) and field != '?']
+    if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+        ordering.append('id')
+    return ordering
+
+
+def get_position(ordering, instance):
+    """The values of the ``ordering`` fields for ``instance``, as JSON-safe values."""
+    values = []
+    for field in ordering:
+        name = field.lstrip('-')
+        # values() rows (see ValuesListMixin) are keyed by the field path
+        if isinstance(instance, dict):
+            value = instance[name]
+        else:
+            value = attrgetter(name.replace('__', '.'))(instance)
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    return values
+
+
+def get_position_filter(ordering, position, reverse=False):
+    """
+    Build ``(f1, f2, ...) > (v1, v2, ...)`` honouring each field's
+    direction, as ``f1 >= v1 AND (f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...)``.
+    The redundant bound on ``f1`` lets the database start an index range scan
+    at the position instead of testing the OR against every row.
+    """
+    condition = Q()
+    equal = {}
+    bound = None
+    for field, value in zip(ordering, position):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != reverse
+        lookup = 'lt' if descending else 'gt'
+        if bound is None:
+            bound = Q(**{f'{name}__{lookup}e': value})
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    if bound is None or len(equal) == 1:
+        return condition
+    return bound & condition
+
+
+def encode_cursor(position, reverse=False):
+    payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(encoded, ordering):
+    """Return ``(position, reverse)``; raise ValueError for a malformed cursor."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        position, reverse = payload['p'], bool(payload['r'])
+    except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(position, list) or len(position) != len(ordering):
+        raise ValueError('Invalid cursor')
+    return position, reverse
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """``PageNumberPagination`` with an async variant of ``paginate_queryset``."""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Count up front so the paginator never has to query synchronously
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [instance async for instance in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+
+class KeysetPagination(AsyncPageNumberPagination):
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def use_keyset(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        count_queryset, page_queryset = self.prepare_keyset(queryset, request)
+        if page_queryset is None:
+            return None
+        self.count = count_queryset.count() if count_queryset is not None else None
+        return self.finish_keyset(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request)
+        if not self.keyset:
+            return await super().apaginate_queryset(queryset, request, view)
+
+        count_queryset, page_queryset = self.prepare_keyset(queryset, request)
+        if page_queryset is None:
+            return None
+        self.count = await count_queryset.acount() if count_queryset is not None else None
+        return self.finish_keyset([instance async for instance in page_queryset])
+
+    def prepare_keyset(self, queryset, request):
+        """
+        Return the queryset to count (None unless ``?count=true``) and the
+        page's queryset, which fetches one extra row to detect a next page.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None, None
+
+        self.ordering = self.get_ordering(queryset)
+        count_queryset = queryset.order_by() if self.include_count(request) else None
+        self.position, self.reverse = self.decode_cursor(request)
+        if self.reverse:
+            queryset = queryset.order_by(*[self.invert(field) for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if self.position is not None:
+            try:
+                queryset = queryset.filter(self.get_position_filter(self.position, self.reverse))
+            except (TypeError, ValueError, DjangoValidationError):
+                # A well-formed cursor with values the fields can't take
+                self.invalid_cursor()
+        return count_queryset, queryset[:self.page_size + 1]
+
+    def finish_keyset(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results:
+            if has_more or self.reverse:
+                self.next_position = self.get_position(results[-1])
+            if self.position is not None and (has_more or not self.reverse):
+                self.previous_position = self.get_position(results[0])
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        payload = {}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.get_next_link()
+        payload['previous'] = self.get_previous_link()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        return self.build_link(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if self.previous_position is None:
+            return None
+        return self.build_link(self.previous_position, reverse=True)
+
+    def include_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true')
+
+    def get_ordering(self, queryset):
+        return get_ordering(queryset)
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def get_position(self, instance):
+        return get_position(self.ordering, instance)
+
+    def get_position_filter(self, position, reverse):
+        return get_position_filter(self.ordering, position, reverse)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            return decode_cursor(encoded, self.ordering)
+        except ValueError:
+            self.invalid_cursor()
+
+    def invalid_cursor(self):
+        raise ValidationError({self.cursor_query_param: [self.invalid_cursor_message]})
+
+    def encode_cursor(self, position, reverse):
+        return encode_cursor(position, reverse)
+
+    def build_link(self, position, reverse):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
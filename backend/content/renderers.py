@@ -0,0 +1,36 @@
+"""
+A ``JSONRenderer`` that encodes with ``orjson`` when it is installed.
+
+The output is byte-for-byte what DRF's renderer produces for the content
+API's data (strings, integers, booleans, None, lists and dicts): compact
+separators, non-ASCII kept as UTF-8, and U+2028/U+2029 escaped. Anything
+orjson doesn't handle the same way goes through DRF's encoder, and
+indented output (``; indent=N`` in the Accept header) is left to DRF.
+Floats are formatted differently by the two encoders, so only use this
+renderer on responses without them.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # Dates, times and dataclasses go through DRF's encoder, like lazy strings do
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, for embedding in JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,211 @@
+"""
+Bilingual full-text search over products, services, courses and 3D printing
+projects.
+
+On SQLite the index is an FTS5 table (``content_search``) using the porter
+stemmer over unicode61 tokens. Arabic text is normalised in Python before it
+is indexed or queried, so both sides see the same spelling. Each row's
+``rowid`` encodes the model and primary key, which makes upserts and deletes
+single index lookups. Other database backends fall back to ``icontains``
+filtering.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Product, Service, Course, ThreeDPrintingProject
+
+
+SEARCH_TABLE = 'content_search'
+
+# Search type -> (model, code stored in the low bits of the rowid, name prefix)
+SEARCH_MODELS = {
+    'product': (Product, 1, 'name'),
+    'service': (Service, 2, 'title'),
+    'course': (Course, 3, 'title'),
+    '3d-printing': (ThreeDPrintingProject, 4, 'title'),
+}
+CODE_BITS = 3
+
+TASHKEEL_RE = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+ARABIC_LETTER_MAP = {
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+}
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_arabic(text):
+    """Strip tashkeel and tatweel and unify alef, ya and ta marbuta variants."""
+    text = TASHKEEL_RE.sub('', text or '')
+    # One str.replace per letter is far faster than str.translate, which
+    # looks up every character of the text in a dict
+    for letter, replacement in ARABIC_LETTER_MAP.items():
+        text = text.replace(letter, replacement)
+    return text
+
+
+def get_search_type(model):
+    for search_type, (search_model, code, prefix) in SEARCH_MODELS.items():
+        if search_model is model:
+            return search_type
+    return None
+
+
+def get_rowid(search_type, pk):
+    return (pk << CODE_BITS) | SEARCH_MODELS[search_type][1]
+
+
+def split_rowid(rowid):
+    code = rowid & ((1 << CODE_BITS) - 1)
+    for search_type, (model, model_code, prefix) in SEARCH_MODELS.items():
+        if model_code == code:
+            return search_type, rowid >> CODE_BITS
+    return None, None
+
+
+def get_document(search_type, instance):
+    prefix = SEARCH_MODELS[search_type][2]
+    title = ' '.join([getattr(instance, f'{prefix}_en'), getattr(instance, f'{prefix}_ar')])
+    body = ' '.join([instance.description_en, instance.description_ar])
+    return normalize_arabic(title), normalize_arabic(body)
+
+
+def get_connection(model):
+    return connections[router.db_for_write(model)]
+
+
+def uses_fts(connection):
+    return connection.vendor == 'sqlite'
+
+
+def create_index(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            f"USING fts5(title, body, tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+
+
+def drop_index(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def index_instance(instance):
+    search_type = get_search_type(type(instance))
+    connection = get_connection(type(instance))
+    if search_type is None or not uses_fts(connection):
+        return
+    title, body = get_document(search_type, instance)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, title, body) VALUES (%s, %s, %s)',
+            [get_rowid(search_type, instance.pk), title, body],
+        )
+
+
+def remove_instance(instance):
+    search_type = get_search_type(type(instance))
+    connection = get_connection(type(instance))
+    if search_type is None or not uses_fts(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [get_rowid(search_type, instance.pk)])
+
+
+def rebuild_index(batch_size=2000):
+    """Re-index every searchable row. Returns the number of rows indexed."""
+    total = 0
+    # Recreating the table is much cheaper than deleting every row of it
+    for connection in {get_connection(model) for model, code, prefix in SEARCH_MODELS.values()}:
+        if uses_fts(connection):
+            drop_index(connection)
+            create_index(connection)
+    for search_type, (model, code, prefix) in SEARCH_MODELS.items():
+        connection = get_connection(model)
+        if not uses_fts(connection):
+            continue
+        fields = ['pk', f'{prefix}_en', f'{prefix}_ar', 'description_en', 'description_ar']
+        with connection.cursor() as cursor:
+            rows = []
+            for pk, title_en, title_ar, description_en, description_ar in (
+                model.objects.order_by().values_list(*fields).iterator(chunk_size=batch_size)
+            ):
+                rows.append((
+                    get_rowid(search_type, pk),
+                    normalize_arabic(f'{title_en} {title_ar}'),
+                    normalize_arabic(f'{description_en} {description_ar}'),
+                ))
+                if len(rows) >= batch_size:
+                    cursor.executemany(f'INSERT INTO {SEARCH_TABLE} (rowid, title, body) VALUES (%s, %s, %s)', rows)
+                    total += len(rows)
+                    rows = []
+            if rows:
+                cursor.executemany(f'INSERT INTO {SEARCH_TABLE} (rowid, title, body) VALUES (%s, %s, %s)', rows)
+                total += len(rows)
+    return total
+
+
+def build_match_expression(query):
+    """
+    Turn free text into an FTS5 expression matching every term; the last term
+    also matches as a prefix so partially typed words still find results.
+    """
+    tokens = [f'"{token}"' for token in TOKEN_RE.findall(normalize_arabic(query))]
+    if tokens:
+        tokens[-1] += '*'
+    return ' '.join(tokens)
+
+
+def search(query, types=None, limit=20, ranked=True):
+    """
+    Return ranked ``(search_type, pk, rank)`` tuples for ``query``.
+    Lower ranks are better matches. Unranked searches return the newest
+    matches instead, with a rank of 0, and stop after ``limit`` rows rather
+    than scoring every match.
+    """
+    types = [search_type for search_type in (types or SEARCH_MODELS) if search_type in SEARCH_MODELS]
+    if not types:
+        return []
+    connection = get_connection(SEARCH_MODELS[types[0]][0])
+    if not uses_fts(connection):
+        return search_fallback(query, types, limit)
+
+    expression = build_match_expression(query)
+    if not expression:
+        return []
+    codes = [SEARCH_MODELS[search_type][1] for search_type in types]
+    placeholders = ', '.join(['%s'] * len(codes))
+    # Title matches weigh ten times as much as body matches
+    rank, order = (f'bm25({SEARCH_TABLE}, 10.0, 1.0)', 'rank') if ranked else ('0.0', 'rowid DESC')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, {rank} AS rank FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND (rowid & %s) IN ({placeholders}) '
+            f'ORDER BY {order} LIMIT %s',
+            [expression, (1 << CODE_BITS) - 1, *codes, limit],
+        )
+        rows = cursor.fetchall()
+    return [(*split_rowid(rowid), rank) for rowid, rank in rows]
+
+
+def search_fallback(query, types, limit):
+    results = []
+    terms = query.split()
+    if not terms:
+        return []
+    for search_type in types:
+        model, code, prefix = SEARCH_MODELS[search_type]
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(**{f'{prefix}_en__icontains': term}) | Q(**{f'{prefix}_ar__icontains': term})
+                | Q(description_en__icontains=term) | Q(description_ar__icontains=term)
+            )
+        pks = model.objects.filter(condition).values_list('pk', flat=True)[:limit]
+        results += [(search_type, pk, 0.0) for pk in pks]
+    return results[:limit]
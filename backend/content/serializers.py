@@ -1,8 +1,74 @@
 from rest_framework import serializers
+from rest_framework import ISO_8601
+from rest_framework.settings import api_settings
 from .models import Service, ProductCategory, Product, Course, SiteSettings, ThreeDPrintingProject, ContactMessage
+from .languages import get_excluded_suffixes
+from .images import get_srcset, get_url_builder, is_current
+from .timing import get_timer
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+class TimedSerializerMixin:
+    """Count ``to_representation`` towards the request's serializer time (see ``content.timing``)."""
+    def to_representation(self, instance):
+        timer = get_timer()
+        if timer is None:
+            return super().to_representation(instance)
+        return timer.time_serializer(super().to_representation, instance)
+
+
+class LanguageProjectionMixin:
+    """
+    Drop the other language's ``*_en``/``*_ar`` fields when the serializer
+    context carries a ``lang``.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        lang = self.context.get('lang')
+        if lang:
+            suffixes = get_excluded_suffixes(lang)
+            for name in [name for name in fields if name.endswith(suffixes)]:
+                del fields[name]
+        return fields
+
+
+class ImageRenditionsMixin:
+    """
+    Expose generated renditions as a ``{format: srcset}`` map. The srcset and
+    the intrinsic size are null until ``process_images`` has processed the
+    current image, rather than describing the one it replaced.
+    """
+    # Columns each method field reads, for ValuesSerializer
+    method_field_columns = {
+        'image_width': ('image_width', 'image', 'image_renditions'),
+        'image_height': ('image_height', 'image', 'image_renditions'),
+        'image_srcset': ('image_renditions', 'image'),
+    }
+
+    def get_image_width(self, obj):
+        return self.get_image_width_value(obj.image_width, obj.image.name, obj.image_renditions)
+
+    def get_image_width_value(self, width, image, renditions):
+        return width if is_current(renditions, image) else None
+
+    def get_image_height(self, obj):
+        return self.get_image_height_value(obj.image_height, obj.image.name, obj.image_renditions)
+
+    def get_image_height_value(self, height, image, renditions):
+        return height if is_current(renditions, image) else None
+
+    def get_image_srcset(self, obj):
+        return self.get_image_srcset_value(obj.image_renditions, obj.image.name)
+
+    def get_image_srcset_value(self, renditions, image):
+        if not is_current(renditions, image):
+            return None
+        # One URL builder for every row of a list
+        if not hasattr(self, '_srcset_url_builder'):
+            self._srcset_url_builder = get_url_builder(self.context.get('request'))
+        return get_srcset(self.context.get('request'), renditions, self._srcset_url_builder)
+
+
+class ServiceSerializer(TimedSerializerMixin, LanguageProjectionMixin, serializers.ModelSerializer):
     class Meta:
         model = Service
         fields = [
@@ -11,7 +77,7 @@ class ServiceSerializer(serializers.ModelSerializer):
         ]
 
 
-class ProductCategorySerializer(serializers.ModelSerializer):
+class ProductCategorySerializer(TimedSerializerMixin, LanguageProjectionMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductCategory
         fields = [
@@ -20,21 +86,43 @@ class ProductCategorySerializer(serializers.ModelSerializer):
         ]
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(TimedSerializerMixin, LanguageProjectionMixin, ImageRenditionsMixin, serializers.ModelSerializer):
     category_name_en = serializers.CharField(source='category.name_en', read_only=True)
     category_name_ar = serializers.CharField(source='category.name_ar', read_only=True)
     category_slug = serializers.CharField(source='category.slug', read_only=True)
+    image_width = serializers.SerializerMethodField()
+    image_height = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = [
             'id', 'category', 'category_name_en', 'category_name_ar', 'category_slug',
             'name_en', 'name_ar', 'description_en', 'description_ar',
-            'image', 'is_featured', 'order', 'created_at', 'updated_at'
+            'image', 'image_width', 'image_height', 'image_srcset',
+            'is_featured', 'order', 'created_at', 'updated_at'
+        ]
+
+
+class CategoryProductSerializer(ProductSerializer):
+    """A product nested in its category, without repeating the category's fields."""
+    class Meta(ProductSerializer.Meta):
+        fields = [
+            'id', 'name_en', 'name_ar', 'description_en', 'description_ar',
+            'image', 'image_width', 'image_height', 'image_srcset',
+            'is_featured', 'order', 'created_at', 'updated_at'
         ]
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class ProductCategoryWithProductsSerializer(ProductCategorySerializer):
+    """Category with the products ``ProductCategoryViewSet`` prefetched into ``expanded_products``."""
+    products = CategoryProductSerializer(source='expanded_products', many=True, read_only=True)
+
+    class Meta(ProductCategorySerializer.Meta):
+        fields = ProductCategorySerializer.Meta.fields + ['products']
+
+
+class CourseSerializer(TimedSerializerMixin, LanguageProjectionMixin, serializers.ModelSerializer):
     level_display = serializers.CharField(source='get_level_display', read_only=True)
 
     class Meta:
@@ -46,7 +134,7 @@ class CourseSerializer(serializers.ModelSerializer):
         ]
 
 
-class SiteSettingsSerializer(serializers.ModelSerializer):
+class SiteSettingsSerializer(TimedSerializerMixin, LanguageProjectionMixin, serializers.ModelSerializer):
     class Meta:
         model = SiteSettings
         fields = [
@@ -59,19 +147,136 @@ class SiteSettingsSerializer(serializers.ModelSerializer):
         ]
 
 
-class ThreeDPrintingProjectSerializer(serializers.ModelSerializer):
+class ThreeDPrintingProjectSerializer(TimedSerializerMixin, LanguageProjectionMixin, ImageRenditionsMixin, serializers.ModelSerializer):
+    image_width = serializers.SerializerMethodField()
+    image_height = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = ThreeDPrintingProject
         fields = [
             'id', 'title_en', 'title_ar', 'description_en', 'description_ar',
-            'image', 'is_featured', 'material', 'print_time',
+            'image', 'image_width', 'image_height', 'image_srcset',
+            'is_featured', 'material', 'print_time',
             'order', 'created_at', 'updated_at'
         ]
 
 
-class ContactMessageSerializer(serializers.ModelSerializer):
+class ContactMessageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ContactMessage
         fields = ['id', 'name', 'email', 'phone', 'subject', 'message', 'created_at']
         read_only_fields = ['id', 'created_at']
 
+
+# Fields whose representation of a database value is the value itself
+IDENTITY_FIELDS = (
+    serializers.CharField, serializers.EmailField, serializers.SlugField, serializers.URLField,
+    serializers.IntegerField, serializers.BooleanField, serializers.ChoiceField,
+)
+
+
+class ValuesSerializer:
+    """
+    Serialize ``values()`` rows exactly as ``serializer`` (a model serializer
+    instance, bound to the request's context) serializes model instances,
+    without building an instance and walking every field for each row.
+
+    Plain, dotted (``category.name_en``) and ``get_<field>_display`` sources,
+    primary key relations and file fields are supported. A method field needs
+    an entry in the serializer's ``method_field_columns``, a column or a tuple
+    of columns, and a ``<method>_value`` method taking their values in order.
+    ``supported`` is False if any field is outside that, and callers should
+    use the serializer.
+    """
+    def __init__(self, serializer):
+        self.serializer = serializer
+        self.model = serializer.Meta.model
+        self.specs = []
+        self.supported = True
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            spec = self.get_spec(name, field)
+            if spec is None:
+                self.supported = False
+                break
+            self.specs.append(spec)
+        self.columns = list(dict.fromkeys(
+            column
+            for name, columns, convert, convert_none in self.specs
+            for column in (columns if isinstance(columns, tuple) else (columns,))
+        ))
+
+    def get_spec(self, name, field):
+        """Return ``(name, column, convert, convert_none)``, or None if unsupported."""
+        if isinstance(field, serializers.SerializerMethodField):
+            column = getattr(self.serializer, 'method_field_columns', {}).get(name)
+            convert = getattr(self.serializer, f'{field.method_name}_value', None)
+            if column is None or convert is None:
+                return None
+            return name, column, convert, True
+
+        if field.source == '*':
+            return None
+        attrs = field.source_attrs
+        if len(attrs) == 1 and attrs[0].startswith('get_') and attrs[0].endswith('_display'):
+            column = attrs[0][len('get_'):-len('_display')]
+            choices = dict(self.model._meta.get_field(column).flatchoices)
+            # Labels are lazy; resolve them in the active language as get_FOO_display does
+            return name, column, lambda value: str(choices.get(value, value)), False
+
+        column = '__'.join(attrs)
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            convert = field.pk_field.to_representation if field.pk_field is not None else None
+            return name, column, convert, False
+        if isinstance(field, serializers.RelatedField) or isinstance(field, serializers.BaseSerializer):
+            return None
+        if isinstance(field, serializers.FileField):
+            return name, column, self.get_file_converter(field, column), False
+        if type(field) is serializers.DateTimeField:
+            return name, column, self.get_datetime_converter(field), False
+        if type(field) in IDENTITY_FIELDS:
+            return name, column, None, False
+        return name, column, field.to_representation, False
+
+    def get_file_converter(self, field, column):
+        if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            return lambda name: name or None
+        build_url = get_url_builder(self.serializer.context.get('request'), self.model._meta.get_field(column).storage)
+        return lambda name: build_url(name) if name else None
+
+    def get_datetime_converter(self, field):
+        """
+        ``DateTimeField.to_representation`` with the output timezone looked up
+        once rather than per value, for ISO 8601 output of aware datetimes.
+        """
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if value.utcoffset() is None:
+                return field.to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return convert
+
+    def to_representation(self, row):
+        data = {}
+        for name, column, convert, convert_none in self.specs:
+            if isinstance(column, tuple):
+                data[name] = convert(*[row[c] for c in column])
+                continue
+            value = row[column]
+            if convert is not None and (convert_none or value is not None):
+                value = convert(value)
+            data[name] = value
+        return data
+
+    def serialize(self, rows):
+        timer = get_timer()
+        if timer is None:
+            return [self.to_representation(row) for row in rows]
+        return timer.time_serializer(lambda: [self.to_representation(row) for row in rows])
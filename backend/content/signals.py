@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from . import cache, changes, database, events, search, snapshots, timing
+from .models import Service, ProductCategory, Product, Course, SiteSettings, ThreeDPrintingProject
+
+
+# Models whose changes must invalidate cached API responses
+CACHED_MODELS = (Service, ProductCategory, Product, Course, SiteSettings, ThreeDPrintingProject)
+
+
+@receiver([post_save, post_delete], sender=Service)
+@receiver([post_save, post_delete], sender=ProductCategory)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=SiteSettings)
+@receiver([post_save, post_delete], sender=ThreeDPrintingProject)
+def invalidate_cached_responses(sender, **kwargs):
+    # Bump after commit so a concurrent read cannot cache pre-commit rows
+    # under the new generation. Reads leave the replicas first, for the same
+    # reason: one that hasn't replayed the commit yet still has those rows.
+    def invalidate():
+        database.pin_primary()
+        cache.invalidate_model(sender)
+        events.broker.notify()
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_save, sender=ThreeDPrintingProject)
+def record_saved_change(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        changes.record_change(instance, changes.CREATED if created else changes.UPDATED)
+
+
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=SiteSettings)
+@receiver(post_delete, sender=ThreeDPrintingProject)
+def record_deleted_change(sender, instance, **kwargs):
+    # Leaves a tombstone for clients that hold a copy
+    changes.record_change(instance, changes.DELETED)
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=ThreeDPrintingProject)
+def clear_removed_image(sender, instance, raw=False, **kwargs):
+    # process_images skips rows without an image, so nothing else clears them
+    if not raw and not instance.image:
+        instance.image_renditions = {}
+        instance.image_width = instance.image_height = None
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=ThreeDPrintingProject)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_instance(instance)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=ThreeDPrintingProject)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_instance(instance)
+
+
+@receiver(pre_save, sender=Service)
+@receiver(pre_save, sender=ProductCategory)
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=Course)
+@receiver(pre_save, sender=ThreeDPrintingProject)
+def remember_snapshot_lookups(sender, instance, raw=False, **kwargs):
+    if getattr(settings, 'SNAPSHOT_AUTO_EXPORT', False) and not raw:
+        snapshots.remember_lookups(instance)
+
+
+@receiver([post_save, post_delete], sender=Service)
+@receiver([post_save, post_delete], sender=ProductCategory)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=SiteSettings)
+@receiver([post_save, post_delete], sender=ThreeDPrintingProject)
+def export_snapshots(sender, instance, signal, raw=False, **kwargs):
+    if getattr(settings, 'SNAPSHOT_AUTO_EXPORT', False) and not raw:
+        snapshots.schedule_export(instance, deleted=signal is post_delete)
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    database.configure_connection(connection)
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    if timing.is_enabled():
+        timing.install_execute_wrapper(connection)
@@ -0,0 +1,329 @@
+"""
+Static JSON snapshots of the read-only API.
+
+Each GET response is rendered once and written under ``SNAPSHOT_ROOT`` along
+with ``.gz`` and, if the ``brotli`` package is installed, ``.br`` siblings, so
+a web server can answer without reaching Django. A response for
+``<path>?<query>`` is stored as ``<path>/index.<query>.json``, or
+``<path>/index.json`` without a query. Query parameters are sorted, so
+``/api/products/?page=2&lang=ar`` becomes
+``api/products/index.lang=ar&page=2.json``.
+
+``export_all`` renders every route registered in ``content.urls`` in all
+language variants: every list page, the featured and per-category lists,
+and every detail page. ``export_changes`` re-renders only the files that
+changed or deleted instances can appear in, and the files left at an
+instance's previous lookup, such as a renamed category's slug. With
+``SNAPSHOT_AUTO_EXPORT`` enabled, it runs after every committed content
+change, on a background thread so that the saving request doesn't wait for
+the lists to render.
+"""
+import copy
+import gzip
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.db import connections, transaction
+from django.test import RequestFactory
+from django.urls import resolve
+
+from .models import Service, ProductCategory, Product, Course, SiteSettings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+API_PREFIX = '/api/'
+# Language variants rendered for every path: bilingual, English, Arabic
+LANGUAGE_VARIANTS = [None, 'en', 'ar']
+
+# Models each route's responses embed, beyond the route's own model
+ROUTE_DEPENDENCIES = {
+    'products': (ProductCategory,),
+}
+# Models embedded in the home bundle besides SiteSettings
+HOME_MODELS = (Service, ProductCategory, Product, Course)
+HOME_PATH = f'{API_PREFIX}home/'
+SITE_SETTINGS_PATH = f'{API_PREFIX}site-settings/'
+
+logger = logging.getLogger(__name__)
+
+_pending = threading.local()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_root():
+    return Path(getattr(settings, 'SNAPSHOT_ROOT', settings.BASE_DIR / 'publish'))
+
+
+def get_routes():
+    """Route prefix -> model and detail lookup field, for every route of ``content.urls``' router."""
+    # Imported here: content.urls imports the views, which import this module
+    from .urls import router
+    return {prefix: (viewset.queryset.model, viewset.lookup_field) for prefix, viewset, basename in router.registry}
+
+
+def get_previous_lookups(instance):
+    """
+    The stored lookup values of ``instance`` for the routes where it isn't
+    the primary key, which a save may change: ``{prefix: value}``.
+    """
+    routes = {
+        prefix: lookup for prefix, (model, lookup) in get_routes().items()
+        if model is type(instance) and lookup != 'pk'
+    }
+    if instance.pk is None or not routes:
+        return {}
+    row = type(instance).objects.filter(pk=instance.pk).values(*routes.values()).first()
+    if row is None:
+        return {}
+    return {prefix: row[lookup] for prefix, lookup in routes.items()}
+
+
+def get_list_filters(prefix):
+    """Filtered list variants exported besides the unfiltered list."""
+    if prefix == 'products':
+        slugs = ProductCategory.objects.values_list('slug', flat=True)
+        return [{'is_featured': 'true'}] + [{'category__slug': slug} for slug in slugs]
+    if prefix == 'courses':
+        return [{'is_featured': 'true'}] + [{'level': level} for level, name in Course.LEVEL_CHOICES]
+    if prefix == '3d-printing':
+        return [{'is_featured': 'true'}]
+    return []
+
+
+class Exporter:
+    def __init__(self, root=None):
+        self.root = Path(root) if root else get_root()
+        self.factory = RequestFactory(
+            HTTP_HOST=getattr(settings, 'SNAPSHOT_HOST', 'localhost'),
+            secure=getattr(settings, 'SNAPSHOT_SECURE', False),
+        )
+        self.written = 0
+        self.removed = 0
+
+    def get_file_path(self, path, query=None):
+        query = urlencode(sorted((query or {}).items()))
+        filename = f'index.{query}.json' if query else 'index.json'
+        return self.root / path.lstrip('/') / filename
+
+    def render(self, path, query):
+        request = self.factory.get(path, query, HTTP_ACCEPT='application/json')
+        match = resolve(path)
+        view = match.func
+        # Under ASGI the content views are async (CONTENT_ASYNC_VIEWS)
+        if iscoroutinefunction(view):
+            view = async_to_sync(view)
+        response = view(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def write(self, file_path, content):
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        variants = [(file_path, content)]
+        variants.append((file_path.with_name(file_path.name + '.gz'), gzip.compress(content, 9, mtime=0)))
+        if brotli is not None:
+            variants.append((file_path.with_name(file_path.name + '.br'), brotli.compress(content)))
+        for target, data in variants:
+            # Write atomically so the web server never serves a partial file
+            temporary = target.with_name(f'.{target.name}.tmp')
+            temporary.write_bytes(data)
+            os.replace(temporary, target)
+        self.written += 1
+
+    def remove(self, file_path):
+        for target in [file_path, file_path.with_name(file_path.name + '.gz'),
+                       file_path.with_name(file_path.name + '.br')]:
+            if target.exists():
+                target.unlink()
+                self.removed += 1
+
+    def export_path(self, path, query=None):
+        """Render one response to disk. Returns the response, or None if it was removed."""
+        query = dict(query or {})
+        file_path = self.get_file_path(path, query)
+        response = self.render(path, query)
+        if response.status_code != 200:
+            self.remove(file_path)
+            return None
+        self.write(file_path, response.content)
+        return response
+
+    def export_detail(self, path):
+        for lang in LANGUAGE_VARIANTS:
+            self.export_path(path, {'lang': lang} if lang else None)
+
+    def export_list(self, path, filters=None):
+        """Export every page of a list, removing pages past the new last one."""
+        for lang in LANGUAGE_VARIANTS:
+            query = dict(filters or {})
+            if lang:
+                query['lang'] = lang
+            page = 1
+            while True:
+                page_query = dict(query, page=str(page)) if page > 1 else query
+                response = self.export_path(path, page_query)
+                if response is None or not response.data.get('next'):
+                    break
+                page += 1
+            # Drop stale trailing pages left by rows that were deleted
+            page += 1
+            while self.get_file_path(path, dict(query, page=str(page))).exists():
+                self.remove(self.get_file_path(path, dict(query, page=str(page))))
+                page += 1
+
+    def remove_detail(self, path):
+        for lang in LANGUAGE_VARIANTS:
+            self.remove(self.get_file_path(path, {'lang': lang} if lang else None))
+
+    def remove_category_lists(self, slug):
+        """Remove every page and language of the products list filtered on ``slug``."""
+        category_lists = self.get_file_path(f'{API_PREFIX}products/').parent
+        for file_path in category_lists.glob(f'index.category__slug={slug}[&.]*'):
+            file_path.unlink()
+            self.removed += 1
+
+    def export_route(self, prefix, details=True):
+        path = f'{API_PREFIX}{prefix}/'
+        self.export_list(path)
+        for filters in get_list_filters(prefix):
+            self.export_list(path, filters)
+        if details:
+            model, lookup = get_routes()[prefix]
+            for value in model.objects.values_list(lookup, flat=True).iterator():
+                self.export_detail(f'{path}{value}/')
+
+    def export_all(self):
+        for prefix in get_routes():
+            self.export_route(prefix)
+        self.export_detail(HOME_PATH)
+        self.export_detail(SITE_SETTINGS_PATH)
+
+    def export_changes(self, changes):
+        """
+        Re-render only the files that the changed ``(instance, deleted)``
+        pairs can appear in, rendering each affected list once. Instances
+        saved with ``SNAPSHOT_AUTO_EXPORT`` on carry the lookups they had
+        before the save (see ``remember_lookups``), whose files are removed.
+        """
+        all_routes = get_routes()
+        routes = set()
+        details = set()
+        removed = set()
+        home = site_settings = False
+        for instance, deleted in changes:
+            model = type(instance)
+            if model is SiteSettings:
+                home = site_settings = True
+                continue
+            previous = getattr(instance, '_snapshot_lookups', {})
+            for prefix, (route_model, lookup) in all_routes.items():
+                if route_model is model:
+                    routes.add(prefix)
+                    detail_path = f'{API_PREFIX}{prefix}/{getattr(instance, lookup)}/'
+                    (removed if deleted else details).add(detail_path)
+                    if prefix in previous and previous[prefix] != getattr(instance, lookup):
+                        removed.add(f'{API_PREFIX}{prefix}/{previous[prefix]}/')
+                elif model in ROUTE_DEPENDENCIES.get(prefix, ()):
+                    routes.add(prefix)
+            if model is ProductCategory and deleted:
+                self.remove_category_lists(instance.slug)
+            if model is ProductCategory and previous.get('product-categories', instance.slug) != instance.slug:
+                self.remove_category_lists(previous['product-categories'])
+            # Products embed their category, so re-render the category's products
+            if model is ProductCategory and not deleted:
+                details.update(
+                    f'{API_PREFIX}products/{pk}/'
+                    for pk in Product.objects.filter(category=instance).values_list('pk', flat=True)
+                )
+            home = home or model in HOME_MODELS
+
+        for prefix in routes:
+            self.export_route(prefix, details=False)
+        for path in details - removed:
+            self.export_detail(path)
+        for path in removed - details:
+            self.remove_detail(path)
+        if site_settings:
+            self.export_detail(SITE_SETTINGS_PATH)
+        if home:
+            self.export_detail(HOME_PATH)
+
+
+def export_all():
+    exporter = Exporter()
+    exporter.export_all()
+    return exporter
+
+
+def export_changes(changes):
+    exporter = Exporter()
+    exporter.export_changes(changes)
+    return exporter
+
+
+def remember_lookups(instance):
+    """Before a save, note the lookups ``export_changes`` must clean up if it changes them."""
+    instance._snapshot_lookups = get_previous_lookups(instance)
+
+
+def schedule_export(instance, deleted=False):
+    """
+    Queue ``instance`` for re-export once the current transaction commits.
+    Changes within one transaction (e.g. a cascading delete) are exported
+    together, on the background thread.
+    """
+    if not hasattr(_pending, 'changes'):
+        _pending.changes = []
+    # Copy now: Django clears the primary key of deleted instances
+    _pending.changes.append((copy.copy(instance), deleted))
+    transaction.on_commit(flush_pending)
+
+
+def get_executor():
+    """The process's export thread; one, so exports never interleave."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshots')
+        return _executor
+
+
+def schedule_export_all():
+    """
+    Queue a full export once the current transaction commits, for bulk
+    writes that bypass the signals and would be too many to list.
+    """
+    transaction.on_commit(lambda: get_executor().submit(export_in_background, None))
+
+
+def export_in_background(changes):
+    """Export ``changes``, or everything if it is None."""
+    try:
+        if changes is None:
+            export_all()
+        else:
+            export_changes(changes)
+    except Exception:
+        # Nobody waits on the future; the next change or export_snapshots
+        # run writes the files
+        logger.exception('Snapshot export of %s changes failed', 'all' if changes is None else len(changes))
+    finally:
+        connections.close_all()
+
+
+def flush_pending():
+    changes = getattr(_pending, 'changes', [])
+    _pending.changes = []
+    if changes:
+        get_executor().submit(export_in_background, changes)
@@ -0,0 +1,277 @@
+"""
+Synthetic bilingual content for load testing.
+
+Rows are built in memory from word pools sized to match real catalogue text,
+then written with ``bulk_create`` in batches inside a single transaction. Bulk
+inserts bypass model signals, so callers pass the written primary keys
+(``Generator.written``) to ``finalize``, which records them in the change
+feed, rebuilds the search index and invalidates the response cache.
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from . import cache, changes, database, events, search, snapshots
+from .models import Service, ProductCategory, Product, Course, SiteSettings, ThreeDPrintingProject, ContactMessage
+
+
+WORDS_EN = (
+    'automation control panel voltage pump compressor sensor valve motor drive '
+    'industrial power system controller relay contactor breaker cable module '
+    'monitoring scada plc inverter transformer pressure flow level temperature '
+    'maintenance installation commissioning efficiency reliable safety compact '
+    'digital analog network remote station water drainage treatment plant '
+    'protection distribution switchgear enclosure bracket prototype precision '
+    'training advanced basic programming diagnostics calibration performance'
+).split()
+WORDS_AR = (
+    'أتمتة تحكم لوحة جهد مضخة ضاغط حساس صمام محرك صناعي طاقة نظام وحدة '
+    'مرحل قاطع كابل مراقبة سكادا محول ضغط تدفق مستوى حرارة صيانة تركيب '
+    'تشغيل كفاءة موثوق أمان رقمي شبكة محطة مياه صرف معالجة حماية توزيع '
+    'غلاف نموذج دقة تدريب متقدم أساسي برمجة تشخيص معايرة أداء عالي الجودة'
+).split()
+FIRST_NAMES = 'Ahmed Mohamed Sara Mona Omar Youssef Nour Laila Karim Hana Tarek Dina'.split()
+MATERIALS = ['PLA', 'ABS', 'PETG', 'Nylon', 'TPU', 'ABS, PETG', 'PLA, PETG']
+DURATIONS = ['2 weeks', '3 weeks', '4 weeks', '6 weeks', '40 hours', '60 hours']
+LEVELS = [level for level, name in Course.LEVEL_CHOICES]
+STATUSES = [status for status, name in ContactMessage.STATUS_CHOICES]
+
+# Creation order: products need categories to exist
+COUNT_NAMES = ('services', 'categories', 'products', 'courses', 'projects', 'messages')
+
+PLACEHOLDER_IMAGES = {
+    Product: 'products/synthetic-placeholder.jpg',
+    ThreeDPrintingProject: '3d-printing/synthetic-placeholder.jpg',
+}
+
+
+class Generator:
+    # Distinct phrases drawn per pool; texts are stitched from these rather
+    # than sampled word by word, which would dominate the run time
+    pool_size = 2000
+
+    def __init__(self, seed=None, batch_size=5000, stdout=None):
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.stdout = stdout
+        # Model -> primary keys of the rows written, for finalize()
+        self.written = {}
+        self.now = timezone.now()
+        self.titles_en = self.phrases(WORDS_EN, 2, 5, str.title)
+        self.titles_ar = self.phrases(WORDS_AR, 2, 5)
+        self.sentences_en = self.phrases(WORDS_EN, 6, 14, lambda text: text.capitalize() + '.')
+        self.sentences_ar = self.phrases(WORDS_AR, 6, 14, lambda text: text + '.')
+
+    def phrases(self, words, low, high, transform=None):
+        phrases = []
+        for i in range(self.pool_size):
+            text = ' '.join(self.random.choices(words, k=self.random.randint(low, high)))
+            phrases.append(transform(text) if transform else text)
+        return phrases
+
+    def text(self, sentences, low, high):
+        return ' '.join(self.random.choices(sentences, k=self.random.randint(low, high)))
+
+    def title(self):
+        return self.random.choice(self.titles_en), self.random.choice(self.titles_ar)
+
+    def description(self):
+        # One to three sentences, like the hand-written seed content
+        return self.text(self.sentences_en, 1, 3), self.text(self.sentences_ar, 1, 3)
+
+    def sample(self, count, size):
+        """Indexes of ``size`` random rows out of ``count``, e.g. the featured ones."""
+        return set(self.random.sample(range(count), min(size, count)))
+
+    def timestamp(self, days=730):
+        return self.now - timedelta(seconds=self.random.randint(0, days * 24 * 3600))
+
+    def generate(self, counts):
+        """Create ``counts[name]`` rows for each name in ``COUNT_NAMES``."""
+        for name in COUNT_NAMES:
+            if counts.get(name):
+                getattr(self, name)(counts[name])
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def insert(self, model, rows, **kwargs):
+        """``bulk_create`` a row generator in batches. Returns the number written."""
+        started = time.perf_counter()
+        total = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.record(model, model.objects.bulk_create(batch, **kwargs))
+                total += len(batch)
+                batch = []
+        if batch:
+            self.record(model, model.objects.bulk_create(batch, **kwargs))
+            total += len(batch)
+        self.log(f'Created {total} {model._meta.verbose_name_plural} in {time.perf_counter() - started:.1f}s')
+        return total
+
+    def record(self, model, objects):
+        self.written.setdefault(model, []).extend(obj.pk for obj in objects)
+
+    def placeholder(self, model):
+        name = PLACEHOLDER_IMAGES[model]
+        if not default_storage.exists(name):
+            buffer = BytesIO()
+            Image.new('RGB', (1280, 960), (200, 205, 210)).save(buffer, 'JPEG', quality=70)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+        return name
+
+    def services(self, count):
+        def rows():
+            for i in range(count):
+                title_en, title_ar = self.title()
+                description_en, description_ar = self.description()
+                yield Service(
+                    title_en=title_en, title_ar=title_ar,
+                    description_en=description_en, description_ar=description_ar,
+                    icon='⚙️', order=i,
+                )
+        return self.insert(Service, rows())
+
+    def categories(self, count):
+        def rows():
+            for i in range(count):
+                name_en, name_ar = self.title()
+                yield ProductCategory(
+                    name_en=name_en, name_ar=name_ar, slug=f'synthetic-category-{i}', order=i
+                )
+        # Re-running refreshes the same synthetic categories instead of failing on slug
+        return self.insert(
+            ProductCategory, rows(),
+            update_conflicts=True, unique_fields=['slug'], update_fields=['name_en', 'name_ar', 'order'],
+        )
+
+    def products(self, count, featured=12):
+        category_ids = list(ProductCategory.objects.values_list('pk', flat=True))
+        if not category_ids:
+            raise ValueError('Products need at least one product category')
+        image = self.placeholder(Product)
+        featured_rows = self.sample(count, featured)
+
+        def rows():
+            for i in range(count):
+                name_en, name_ar = self.title()
+                description_en, description_ar = self.description()
+                yield Product(
+                    category_id=self.random.choice(category_ids),
+                    name_en=name_en, name_ar=name_ar,
+                    description_en=description_en, description_ar=description_ar,
+                    image=image, is_featured=i in featured_rows,
+                    order=self.random.randint(0, 100),
+                )
+        return self.insert(Product, rows())
+
+    def courses(self, count, featured=6):
+        featured_rows = self.sample(count, featured)
+
+        def rows():
+            for i in range(count):
+                title_en, title_ar = self.title()
+                description_en, description_ar = self.description()
+                yield Course(
+                    title_en=title_en, title_ar=title_ar,
+                    description_en=description_en, description_ar=description_ar,
+                    duration=self.random.choice(DURATIONS), level=self.random.choice(LEVELS),
+                    is_featured=i in featured_rows, icon='💻',
+                    order=self.random.randint(0, 100),
+                )
+        return self.insert(Course, rows())
+
+    def projects(self, count, featured=6):
+        image = self.placeholder(ThreeDPrintingProject)
+        featured_rows = self.sample(count, featured)
+
+        def rows():
+            for i in range(count):
+                title_en, title_ar = self.title()
+                description_en, description_ar = self.description()
+                yield ThreeDPrintingProject(
+                    title_en=title_en, title_ar=title_ar,
+                    description_en=description_en, description_ar=description_ar,
+                    image=image, is_featured=i in featured_rows,
+                    material=self.random.choice(MATERIALS),
+                    print_time=f'{self.random.randint(1, 48)} hours',
+                    order=self.random.randint(0, 100),
+                )
+        return self.insert(ThreeDPrintingProject, rows())
+
+    def messages(self, count):
+        def rows():
+            for i in range(count):
+                name = self.random.choice(FIRST_NAMES)
+                created_at = self.timestamp()
+                yield ContactMessage(
+                    name=name, email=f'{name.lower()}{i}@example.com',
+                    phone=f'01{self.random.randint(0, 999999999):09d}',
+                    subject=self.random.choice(self.titles_en),
+                    message=self.text(self.sentences_en, 1, 6),
+                    status=self.random.choice(STATUSES),
+                    created_at=created_at, updated_at=created_at,
+                )
+        # Keep the spread of received dates instead of stamping every row "now"
+        with explicit_timestamps(ContactMessage):
+            return self.insert(ContactMessage, rows())
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """Temporarily let ``auto_now``/``auto_now_add`` fields accept given values."""
+    fields = [
+        (field, field.auto_now, field.auto_now_add) for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, auto_now, auto_now_add in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def generate(counts, seed=None, batch_size=5000, stdout=None):
+    """
+    Create synthetic rows for each model in ``counts`` (keys: services,
+    categories, products, courses, projects, messages) in one transaction.
+    """
+    generator = Generator(seed=seed, batch_size=batch_size, stdout=stdout)
+    with transaction.atomic():
+        generator.generate(counts)
+        finalize(generator.written)
+    return generator
+
+
+def finalize(written):
+    """
+    Catch up on the work model signals would have done for the bulk-written
+    rows in ``written`` (model -> primary keys). Call it inside the
+    transaction that wrote them.
+    """
+    changes.record_bulk(written)
+    search.rebuild_index()
+
+    def invalidate():
+        database.pin_primary()
+        for model in (Service, ProductCategory, Product, Course, SiteSettings, ThreeDPrintingProject):
+            cache.invalidate_model(model)
+        events.broker.notify()
+    transaction.on_commit(invalidate)
+    if getattr(settings, 'SNAPSHOT_AUTO_EXPORT', False):
+        snapshots.schedule_export_all()
@@ -1,3 +1,1714 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import importlib
+import sqlite3
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Count
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.settings import api_settings
+from PIL import Image
+
+from . import cache as content_cache
+from . import benchmark, changes, compression, database, events, pagination, search, snapshots, throttling, timing, views
+from .mixins import ValuesListMixin
+from .models import (
+    ArchivedContactMessage, ChangeCompaction, ContactMessage, ContentChange, Course, OutboxEmail, Product,
+    ProductCategory, Service, SiteSettings,
+)
+from .serializers import ValuesSerializer
+
+
+class ContactOutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SiteSettings.objects.create(email='admin@example.com', address_en='-', address_ar='-', phone1='1')
+        self.payload = {
+            'name': 'Sara',
+            'email': 'sara@example.com',
+            'subject': 'Quote',
+            'message': 'Please send a quote.',
+        }
+
+    def test_post_queues_emails_without_sending(self):
+        response = self.client.post('/api/contact/', self.payload)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        recipients = set(OutboxEmail.objects.values_list('recipient', flat=True))
+        self.assertEqual(recipients, {'admin@example.com', 'sara@example.com'})
+
+    def test_send_outbox_delivers_and_records_status(self):
+        self.client.post('/api/contact/', self.payload)
+
+        call_command('send_outbox', stdout=mock.MagicMock())
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+        self.assertFalse(OutboxEmail.objects.filter(sent_at__isnull=True).exists())
+
+    def test_failed_send_is_retried_with_backoff(self):
+        self.client.post('/api/contact/', self.payload)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            call_command('send_outbox', '--max-attempts=2', stdout=mock.MagicMock())
+
+        email = OutboxEmail.objects.first()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn('down', email.last_error)
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            call_command('send_outbox', '--max-attempts=2', stdout=mock.MagicMock())
+
+        self.assertEqual(OutboxEmail.objects.filter(status='failed').count(), 2)
+        self.assertEqual(ContactMessage.objects.count(), 1)
+
+    def test_unreachable_mail_server_leaves_emails_due(self):
+        self.client.post('/api/contact/', self.payload)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=OSError('refused')), \
+                self.assertLogs('content.emails', 'WARNING'):
+            call_command('send_outbox', stdout=mock.MagicMock())
+
+        self.assertEqual(len(mail.outbox), 0)
+        for email in OutboxEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), ('pending', 0))
+            self.assertLessEqual(email.next_attempt_at, timezone.now())
+            self.assertIn('refused', email.last_error)
+
+        call_command('send_outbox', stdout=mock.MagicMock())
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_long_subject_fits_the_outbox(self):
+        response = self.client.post('/api/contact/', dict(self.payload, subject='x' * 300))
+
+        self.assertEqual(response.status_code, 201)
+        max_length = OutboxEmail._meta.get_field('subject').max_length
+        subjects = OutboxEmail.objects.values_list('subject', flat=True)
+        self.assertTrue(all(len(subject) <= max_length for subject in subjects))
+
+
+class ContactProtectionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SiteSettings.objects.create(email='admin@example.com', address_en='-', address_ar='-', phone1='1')
+
+    def post(self, index, address='10.0.0.1'):
+        payload = {'name': 'Sara', 'email': 'sara@example.com', 'subject': 'Quote', 'message': f'Message {index}'}
+        return self.client.post('/api/contact/', payload, REMOTE_ADDR=address)
+
+    @override_settings(CONTACT_THROTTLE_BUCKETS={'ip': {'capacity': 2, 'rate': 1}})
+    def test_burst_from_one_address_is_limited(self):
+        responses = [self.post(index) for index in range(3)]
+
+        self.assertEqual([response.status_code for response in responses], [201, 201, 429])
+        self.assertGreater(int(responses[2]['Retry-After']), 0)
+        self.assertEqual(self.post(3, address='10.0.0.2').status_code, 201)
+        self.assertEqual(ContactMessage.objects.count(), 3)
+
+    @override_settings(CONTACT_THROTTLE_BUCKETS={'ip': {'capacity': 5, 'rate': 1}, 'global': {'capacity': 2, 'rate': 1}})
+    def test_global_bucket_limits_all_addresses(self):
+        codes = [self.post(index, address=f'10.0.0.{index}').status_code for index in range(3)]
+
+        self.assertEqual(codes, [201, 201, 429])
+        self.assertEqual(throttling.get_stats()['rejected:global'], 1)
+
+    @override_settings(CONTACT_THROTTLE_BUCKETS={'ip': {'capacity': 2, 'rate': 1}, 'global': {'capacity': 1, 'rate': 1}})
+    def test_global_refusal_refunds_the_address_token(self):
+        codes = [self.post(index).status_code for index in range(2)]
+
+        self.assertEqual(codes, [201, 429])
+        tokens, _ = cache.get(throttling._bucket_key('ip', '10.0.0.1'))
+        self.assertAlmostEqual(tokens, 1, delta=0.01)
+
+    def test_duplicate_is_absorbed(self):
+        first = self.post(0)
+        with self.assertNumQueries(0):
+            second = self.post(0)
+
+        self.assertEqual((first.status_code, second.status_code), (201, 200))
+        self.assertEqual(second.json()['data'], first.json()['data'])
+        self.assertEqual(ContactMessage.objects.count(), 1)
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+        self.assertEqual(throttling.get_stats()['deduplicated'], 1)
+
+    def test_failed_submission_can_be_retried(self):
+        with mock.patch('content.views.queue_contact_emails', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.post(0)
+
+        self.assertEqual(self.post(0).status_code, 201)
+        self.assertEqual(ContactMessage.objects.count(), 1)
+
+    def test_async_duplicate_is_absorbed(self):
+        view = views.ContactMessageView.as_view(async_mode=True)
+        payload = {'name': 'Async', 'email': 'async@example.com', 'subject': 'Quote', 'message': 'Hello'}
+        responses = [
+            async_to_sync(view)(RequestFactory().post('/api/contact/', payload, content_type='application/json'))
+            for _ in range(2)
+        ]
+
+        self.assertEqual([response.status_code for response in responses], [201, 200])
+        self.assertEqual(ContactMessage.objects.count(), 1)
+
+    def test_contact_stats_command(self):
+        self.post(0)
+        self.post(0)
+        out = mock.MagicMock()
+
+        call_command('contact_stats', '--reset', stdout=out)
+
+        lines = ''.join(call.args[0] for call in out.write.call_args_list)
+        self.assertIn('Accepted:        1', lines)
+        self.assertIn('Deduplicated:    1', lines)
+        self.assertEqual(throttling.get_stats()['accepted'], 0)
+
+
+class ContactArchiveTests(TestCase):
+    def setUp(self):
+        self.old = timezone.now() - timedelta(days=400)
+        for index, status in enumerate(['new', 'read', 'replied', 'archived', 'replied']):
+            ContactMessage.objects.create(
+                name=f'Sender {index}', email=f's{index}@example.com', subject='Quote', message='-', status=status
+            )
+        ContactMessage.objects.update(created_at=self.old)
+        # Recent handled messages and ones with unsent emails stay in the hot table
+        ContactMessage.objects.create(name='Recent', email='r@example.com', subject='-', message='-', status='replied')
+        OutboxEmail.objects.create(
+            contact_message=ContactMessage.objects.get(name='Sender 4'), recipient='s4@example.com', subject='-', body='-'
+        )
+
+    def test_archive_moves_old_handled_messages_in_chunks(self):
+        call_command('archive_contacts', '--chunk-size=1', stdout=mock.MagicMock())
+
+        self.assertEqual(
+            set(ContactMessage.objects.values_list('name', flat=True)),
+            {'Sender 0', 'Sender 1', 'Sender 4', 'Recent'},
+        )
+        archived = ArchivedContactMessage.objects.order_by('original_id')
+        self.assertEqual([message.name for message in archived], ['Sender 2', 'Sender 3'])
+        self.assertEqual(archived[0].created_at, self.old)
+        self.assertEqual(archived[1].status, 'archived')
+
+    def test_archive_is_idempotent_and_dry_run_writes_nothing(self):
+        out = mock.MagicMock()
+        call_command('archive_contacts', '--dry-run', stdout=out)
+        self.assertEqual(ArchivedContactMessage.objects.count(), 0)
+
+        call_command('archive_contacts', stdout=out)
+        call_command('archive_contacts', stdout=out)
+        self.assertEqual(ArchivedContactMessage.objects.count(), 2)
+
+    def test_archive_admin_is_read_only_and_searchable(self):
+        call_command('archive_contacts', stdout=mock.MagicMock())
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+
+        response = self.client.get('/admin/content/archivedcontactmessage/', {'q': 's3@example'})
+        self.assertContains(response, 'Sender 3')
+        self.assertNotContains(response, 'Sender 2')
+        message = ArchivedContactMessage.objects.get(name='Sender 3')
+        response = self.client.post(f'/admin/content/archivedcontactmessage/{message.pk}/change/', {'name': 'x'})
+        self.assertEqual(response.status_code, 403)
+
+
+class AdminChangeListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name_en='Pumps', name_ar='مضخات', slug='pumps')
+        for i in range(30):
+            Product.objects.create(
+                category=category, name_en=f'Product {i:02}', name_ar=f'منتج {i}',
+                description_en='Centrifugal pump' if i % 3 == 0 else 'Control panel', description_ar='-',
+                order=i % 4,
+            )
+        for name, email in [('Sara', 'sara@example.com'), ('Omar', 'omar@example.com'), ('Nour', 'nour@sara.com')]:
+            ContactMessage.objects.create(name=name, email=email, subject='Quote', message='-')
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get_names(self, response):
+        return [str(product) for product in response.context['cl'].result_list]
+
+    def test_changelist_counts_once_and_joins_categories(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/content/product/')
+
+        self.assertEqual(response.status_code, 200)
+        counts = [query['sql'] for query in queries.captured_queries if 'COUNT(' in query['sql']]
+        self.assertEqual(len(counts), 1)
+        self.assertFalse(any('FROM "content_productcategory" WHERE' in query['sql']
+                             for query in queries.captured_queries))
+
+    def test_count_stops_at_the_limit_without_an_estimate(self):
+        with mock.patch('content.changelist.EstimatedCountPaginator.exact_count_limit', 10), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/content/product/')
+
+        counts = [query['sql'] for query in queries.captured_queries if 'COUNT(' in query['sql']]
+        self.assertEqual(len(counts), 1)
+        self.assertIn('LIMIT 11', counts[0])
+        self.assertTrue(response.context['cl'].paginator.capped)
+        self.assertContains(response, 'More than 10')
+
+    def test_cursor_continues_past_the_numbered_pages(self):
+        expected = [str(product) for product in Product.objects.order_by('order', 'name_en', '-pk')]
+        with mock.patch('content.admin.ProductAdmin.list_per_page', 5), \
+                mock.patch('content.changelist.EstimatedCountPaginator.exact_count_limit', 10):
+            response = self.client.get('/admin/content/product/', {'p': 2})
+            names = self.get_names(response)
+            self.assertEqual(response.context['cl'].paginator.num_pages, 2)
+            while response.context['cl'].next_page_url:
+                response = self.client.get('/admin/content/product/' + response.context['cl'].next_page_url)
+                self.assertEqual(response.status_code, 200)
+                names += self.get_names(response)
+
+        self.assertEqual(names, expected[5:])
+        response = self.client.get('/admin/content/product/', {'cursor': 'not-a-cursor'})
+        self.assertRedirects(response, '/admin/content/product/?e=1')
+
+    def test_product_search_uses_full_text_index(self):
+        response = self.client.get('/admin/content/product/', {'q': 'centrifugal'})
+
+        self.assertEqual(len(response.context['cl'].result_list), 10)
+
+    def test_contact_search_matches_prefixes(self):
+        for term, expected in [('SAR', ['Sara']), ('nour@s', ['Nour']), ('ample', [])]:
+            with self.subTest(term=term):
+                response = self.client.get('/admin/content/contactmessage/', {'q': term})
+                self.assertEqual([message.name for message in response.context['cl'].result_list], expected)
+
+    def test_contact_search_uses_expression_indexes(self):
+        admin_site = admin.site._registry[ContactMessage]
+        queryset, _ = admin_site.get_search_results(None, ContactMessage.objects.all(), 'sara')
+
+        plan = queryset.order_by().explain()
+        for index in ['contact_name_lower_idx', 'contact_email_lower_idx', 'contact_subject_lower_idx']:
+            self.assertIn(index, plan)
+
+
+class SeedDataTests(TestCase):
+    def test_bulk_seed_is_idempotent(self):
+        call_command('seed_data', '--bulk', stdout=mock.MagicMock())
+        counts = (ProductCategory.objects.count(), Product.objects.count(), Course.objects.count())
+        Course.objects.filter(title_en='PLC Basics').update(duration='1 day')
+
+        call_command('seed_data', '--bulk', stdout=mock.MagicMock())
+
+        self.assertEqual((ProductCategory.objects.count(), Product.objects.count(), Course.objects.count()), counts)
+        self.assertEqual(Course.objects.get(title_en='PLC Basics').duration, '4 weeks')
+
+    def test_synthetic_rows_are_created_and_indexed(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            call_command(
+                'seed_data', '--categories=3', '--products=40', '--messages=30', '--seed=1', '--batch-size=16',
+                stdout=mock.MagicMock(),
+            )
+
+        self.assertEqual(ProductCategory.objects.filter(slug__startswith='synthetic-category-').count(), 3)
+        self.assertEqual(Product.objects.count(), 43)
+        self.assertEqual(ContactMessage.objects.count(), 30)
+        self.assertGreater(ContactMessage.objects.dates('created_at', 'day').count(), 1)
+        product = Product.objects.order_by('-pk').first()
+        self.assertIn(('product', product.pk), [result[:2] for result in search.search(product.name_en, limit=100)])
+
+    def test_bulk_writes_are_recorded_in_the_change_feed(self):
+        cache.clear()
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            executor = mock.Mock()
+            with override_settings(SNAPSHOT_AUTO_EXPORT=True), \
+                    mock.patch.object(snapshots, 'get_executor', return_value=executor), \
+                    mock.patch.object(events.broker, 'notify') as notify, \
+                    self.captureOnCommitCallbacks(execute=True):
+                call_command('seed_data', '--products=50', '--seed=1', stdout=mock.MagicMock())
+            seq = changes.get_latest_seq()
+            # Upserting the seed rows again updates them, and their category's products
+            call_command('seed_data', '--bulk', stdout=mock.MagicMock())
+
+        notify.assert_called()
+        executor.submit.assert_any_call(snapshots.export_in_background, None)
+        self.assertEqual(content_cache.get_stats([Product])['invalidations'], {'content.product': 1})
+        product_ids = set(Product.objects.values_list('pk', flat=True))
+        self.assertEqual(len(product_ids), 53)
+        feed = ContentChange.objects.filter(change_type='product')
+        self.assertEqual(sorted(feed.values_list('object_id', flat=True)), sorted(product_ids))
+        updated = set(feed.filter(seq__gt=seq).values_list('object_id', flat=True))
+        self.assertEqual(updated, set(Product.objects.filter(category__slug__in=[
+            'automation', 'electrical-components', 'low-voltage-panels', 'control-panels', 'equipment-machinery',
+        ]).values_list('pk', flat=True)))
+        self.assertEqual(ContentChange.objects.filter(change_type='course').count(), Course.objects.count())
+
+
+class BenchmarkTests(TestCase):
+    def test_measures_every_route(self):
+        call_command('seed_data', stdout=mock.MagicMock())
+        cases = benchmark.get_cases()
+        benchmark.check_coverage(cases)
+
+        results = benchmark.measure_all(requests=2, cases=cases)
+
+        self.assertEqual(set(results), benchmark.get_route_names())
+        self.assertEqual(results['home']['warm']['queries'], 0)
+        self.assertGreater(results['home']['cold']['queries'], 0)
+        self.assertGreater(results['product-list']['cold']['bytes'], 0)
+
+    def test_command_posts_every_contact_message(self):
+        # Runs in this test's database instead of creating one
+        command = 'content.management.commands.benchmark'
+        with mock.patch(f'{command}.setup_test_environment'), mock.patch(f'{command}.teardown_test_environment'), \
+                mock.patch.object(connection.creation, 'create_test_db'), \
+                mock.patch.object(connection.creation, 'destroy_test_db'):
+            call_command('benchmark', '--sizes=20', '--requests=6', stdout=mock.MagicMock())
+
+        # Two modes of six posts, plus the warm mode's warm-up post
+        self.assertEqual(ContactMessage.objects.filter(email=benchmark.CONTACT_PAYLOAD['email']).count(), 13)
+
+    def test_compare_reports_regressions(self):
+        before = {'requests': 10, 'p50_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 30.0, 'queries': 3, 'bytes': 100}
+        baseline = {'results': {'1000': {'home': {'cold': before}}}}
+
+        noise = dict(before, p50_ms=10.8, p95_ms=40.0)
+        self.assertEqual(benchmark.compare({'results': {'1000': {'home': {'cold': noise}}}}, baseline), [])
+
+        slower = dict(before, p50_ms=14.0, queries=4)
+        regressions = benchmark.compare({'results': {'1000': {'home': {'cold': slower}}}}, baseline)
+        self.assertEqual(len(regressions), 2)
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        call_command('seed_data', stdout=mock.MagicMock())
+
+    def test_header_is_only_sent_to_allowed_clients(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/products/'))
+
+        cache.clear()
+        with override_settings(SERVER_TIMING_ALLOWED_IPS=['127.0.0.1']):
+            response = self.client.get('/api/products/')
+
+        metrics = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(metrics), {'db', 'serialize', 'render', 'total'})
+        self.assertIn('desc="3 queries"', metrics['db'])
+
+    def test_requests_feed_route_aggregate(self):
+        timing.reset_stats()
+        self.client.get('/api/products/')
+        self.client.get('/api/products/')
+        self.client.get('/api/courses/')
+        timing.flush()
+
+        stats = timing.get_route_stats()
+
+        self.assertEqual(stats['GET product-list']['requests'], 2)
+        self.assertEqual(stats['GET course-list']['requests'], 1)
+        self.assertGreater(stats['GET product-list']['serialize_ms'], 0)
+
+
+class AsyncViewTests(TestCase):
+    """The async handlers must answer exactly like the sync views they mirror."""
+    def setUp(self):
+        call_command('seed_data', stdout=mock.MagicMock())
+        self.factory = RequestFactory()
+
+    def get_response(self, view_class, request, actions=None, async_mode=False, **kwargs):
+        cache.clear()
+        args = (actions,) if actions else ()
+        view = view_class.as_view(*args, async_mode=async_mode)
+        self.assertEqual(iscoroutinefunction(view), async_mode)
+        response = async_to_sync(view)(request, **kwargs) if async_mode else view(request, **kwargs)
+        response.render()
+        return response
+
+    def test_async_reads_match_sync_reads(self):
+        product = Product.objects.order_by('pk').first()
+        category = ProductCategory.objects.order_by('pk').first()
+        cases = [
+            (views.ServiceViewSet, '/api/services/', {'get': 'list'}, {}),
+            (views.ProductCategoryViewSet, f'/api/product-categories/{category.slug}/', {'get': 'retrieve'},
+             {'slug': category.slug}),
+            (views.ProductCategoryViewSet, '/api/product-categories/?expand=products&products_limit=2',
+             {'get': 'list'}, {}),
+            (views.ProductViewSet, '/api/products/?lang=ar', {'get': 'list'}, {}),
+            (views.ProductViewSet, '/api/products/?cursor=', {'get': 'list'}, {}),
+            (views.ProductViewSet, '/api/products/?is_featured=true&ordering=-created_at', {'get': 'list'}, {}),
+            (views.ProductViewSet, f'/api/products/{product.pk}/', {'get': 'retrieve'}, {'pk': product.pk}),
+            (views.ProductViewSet, '/api/products/999999/', {'get': 'retrieve'}, {'pk': 999999}),
+            (views.CourseViewSet, '/api/courses/?level=beginner', {'get': 'list'}, {}),
+            (views.HomeView, '/api/home/?lang=en', None, {}),
+            (views.SiteSettingsView, '/api/site-settings/', None, {}),
+            (views.SearchView, '/api/search/?q=control', None, {}),
+            (views.ChangeFeedView, '/api/changes/?since=0&limit=5&lang=ar', None, {}),
+        ]
+        for view_class, path, actions, kwargs in cases:
+            with self.subTest(path=path):
+                expected = self.get_response(view_class, self.factory.get(path), actions, **kwargs)
+                response = self.get_response(view_class, self.factory.get(path), actions, async_mode=True, **kwargs)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content, expected.content)
+                self.assertEqual(response.get('ETag'), expected.get('ETag'))
+
+    def test_async_cache_hit_and_conditional_request(self):
+        view = views.ProductViewSet.as_view({'get': 'list'}, async_mode=True)
+        cache.clear()
+        first = async_to_sync(view)(self.factory.get('/api/products/'))
+        second = async_to_sync(view)(self.factory.get('/api/products/'))
+        not_modified = async_to_sync(view)(self.factory.get('/api/products/', HTTP_IF_NONE_MATCH=first['ETag']))
+
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_async_contact_post_queues_emails(self):
+        request = self.factory.post(
+            '/api/contact/', {'name': 'Async', 'email': 'async@example.com', 'subject': 'Quote', 'message': 'Hello'},
+            content_type='application/json',
+        )
+        response = self.get_response(views.ContactMessageView, request, async_mode=True)
+
+        self.assertEqual(response.status_code, 201)
+        contact_message = ContactMessage.objects.get(email='async@example.com')
+        self.assertTrue(OutboxEmail.objects.filter(contact_message=contact_message).exists())
+
+    def test_concurrency_benchmark_serves_both_handlers(self):
+        for server in benchmark.SERVERS:
+            with self.subTest(server=server):
+                result = benchmark.measure_concurrency(server, paths=['/api/'], connections=5, requests=20)
+                self.assertEqual(result['errors'], 0)
+                self.assertGreater(result['throughput_rps'], 0)
+                self.assertEqual(result['writers'], 0)
+
+
+class ExpandProductsTests(TestCase):
+    url = '/api/product-categories/?expand=products'
+
+    def setUp(self):
+        cache.clear()
+        call_command('seed_data', stdout=mock.MagicMock())
+
+    def add_products(self, category, count):
+        Product.objects.bulk_create([
+            Product(category=category, name_en=f'Extra {i}', name_ar='-', description_en='-', description_ar='-')
+            for i in range(count)
+        ])
+        cache.clear()
+
+    def test_products_are_embedded_with_a_fixed_number_of_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.add_products(ProductCategory.objects.first(), 30)
+
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(self.url)
+
+        for category in response.json()['results']:
+            products = Product.objects.filter(category_id=category['id']).order_by('order', 'name_en')[:api_settings.PAGE_SIZE]
+            self.assertEqual([product['id'] for product in category['products']], [p.pk for p in products])
+            for product in category['products']:
+                self.assertFalse(any(name.startswith('category') for name in product))
+
+    def test_products_limit(self):
+        self.add_products(ProductCategory.objects.first(), 5)
+
+        response = self.client.get(f'{self.url}&products_limit=2&lang=en')
+
+        for category in response.json()['results']:
+            expected = Product.objects.filter(category_id=category['id']).order_by('order', 'name_en')[:2]
+            self.assertEqual([product['id'] for product in category['products']], [p.pk for p in expected])
+            for product in category['products']:
+                self.assertIn('name_en', product)
+                self.assertNotIn('name_ar', product)
+
+    def test_products_are_capped_per_category(self):
+        category = ProductCategory.objects.first()
+        self.add_products(category, api_settings.PAGE_SIZE + 5)
+
+        for query in ('', '&products_limit=1000'):
+            with self.subTest(query=query):
+                results = {result['id']: result for result in self.client.get(self.url + query).json()['results']}
+                self.assertEqual(len(results[category.pk]['products']), api_settings.PAGE_SIZE)
+
+    def test_malformed_products_limit(self):
+        for value in ('two', '0', '-1', ''):
+            with self.subTest(value=value):
+                response = self.client.get(f'{self.url}&products_limit={value}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('products_limit', response.json())
+
+    def test_product_changes_reach_expanded_responses(self):
+        first = self.client.get(self.url)
+        category = ProductCategory.objects.annotate(count=Count('products')).filter(count__gt=0).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(category=category).delete()
+
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, 200)
+        results = {result['id']: result for result in second.json()['results']}
+        self.assertEqual(results[category.pk]['products'], [])
+
+    def test_plain_list_is_unchanged(self):
+        response = self.client.get('/api/product-categories/')
+
+        self.assertNotIn('products', response.json()['results'][0])
+
+
+class CompressionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        call_command('seed_data', stdout=mock.MagicMock())
+
+    def test_body_is_compressed_once_per_representation(self):
+        plain = self.client.get('/api/products/')
+
+        with mock.patch.object(compression, 'compress', wraps=compression.compress) as compress:
+            first = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+            second = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        for response in (first, second):
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertEqual(response['ETag'], f'W/{plain["ETag"]}')
+            self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(second['Content-Type'], plain['Content-Type'])
+
+    def test_stored_body_is_sent_to_clients_without_compression(self):
+        first = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip')
+        plain = self.client.get('/api/products/')
+
+        self.assertEqual(plain['X-Cache'], 'HIT')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(plain.content, gzip.decompress(first.content))
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 9)
+    def test_small_bodies_are_not_compressed(self):
+        for _ in range(2):
+            response = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip')
+            self.assertFalse(response.has_header('Content-Encoding'))
+
+    @skipUnless(compression.brotli is not None, 'brotli is not installed')
+    def test_brotli_is_preferred(self):
+        plain = self.client.get('/api/products/')
+        response = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['ETag'], f'W/{plain["ETag"]}')
+        self.assertEqual(compression.brotli.decompress(response.content), plain.content)
+        self.assertEqual(compression.brotli.decompress(compression.compress(plain.content, 'br')), plain.content)
+
+    def test_encoding_negotiation(self):
+        factory = RequestFactory()
+        best = 'br' if compression.brotli is not None else 'gzip'
+        cases = [
+            ('', 'identity'),
+            ('gzip;q=0', 'identity'),
+            ('*', best),
+            ('identity, GZIP;q=0.5', 'gzip'),
+            ('br;q=1.0, gzip;q=0.8', best),
+            ('br;q=0.5, gzip;q=0.8', 'gzip'),
+        ]
+        for header, encoding in cases:
+            with self.subTest(header=header):
+                request = factory.get('/', HTTP_ACCEPT_ENCODING=header)
+                self.assertEqual(compression.get_encoding(request), encoding)
+
+
+class ValuesListTests(TestCase):
+    """The values() list path must render the same bytes as the serializers."""
+    urls = [
+        '/api/services/',
+        '/api/services/?lang=ar',
+        '/api/product-categories/?lang=en',
+        '/api/products/',
+        '/api/products/?lang=ar',
+        '/api/products/?count=true',
+        '/api/products/?category__slug=automation&ordering=-created_at',
+        '/api/products/?cursor=&ordering=-order',
+        '/api/courses/',
+        '/api/courses/?lang=ar&level=beginner',
+        '/api/3d-printing/?is_featured=true',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=mock.MagicMock())
+        category = ProductCategory.objects.get(slug='automation')
+        renditions = {'source': 'products/pump.jpg', 'formats': {
+            'webp': {'640': 'renditions/pump-640.webp', '320': 'renditions/pump-320.webp'},
+        }}
+        Product.objects.bulk_create([
+            Product(
+                category=category, name_en=f'Pump {i}', name_ar=f'مضخة {i}',
+                description_en='Line\u2028separated "quoted" text', description_ar='وصف',
+                image='products/pump.jpg' if i % 2 else '', image_width=1280 if i % 2 else None,
+                image_height=960 if i % 2 else None, image_renditions=renditions if i % 4 == 1 else {},
+                order=i % 5,
+            )
+            for i in range(45)
+        ])
+
+    def get_pages(self, url):
+        """Every page of ``url``, following ``next`` links."""
+        pages = []
+        while url:
+            cache.clear()
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.content)
+            url = response.json().get('next')
+        return pages
+
+    def test_values_path_matches_serializers(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                expected = None
+                with mock.patch.object(ValuesListMixin, 'get_values_serializer', return_value=None), \
+                        mock.patch('content.renderers.orjson', None):
+                    expected = self.get_pages(url)
+                pages = self.get_pages(url)
+                self.assertGreater(len(pages), 0)
+                self.assertEqual(pages, expected)
+
+    def test_list_serializers_are_supported(self):
+        for viewset in (views.ServiceViewSet, views.ProductCategoryViewSet, views.ProductViewSet,
+                        views.CourseViewSet, views.ThreeDPrintingProjectViewSet):
+            with self.subTest(viewset=viewset.__name__):
+                serializer = viewset.serializer_class(context={'request': None, 'lang': 'ar'})
+                self.assertTrue(ValuesSerializer(serializer).supported)
+
+
+class QueryPlanTests(TestCase):
+    """
+    Every list path must be served by an index: a query plan that needs a
+    temporary B-tree to sort the rows means a filter/ordering combination has
+    no supporting index.
+    """
+    urls = [
+        '/api/services/',
+        '/api/product-categories/',
+        '/api/product-categories/?expand=products',
+        '/api/products/',
+        '/api/products/?is_featured=true',
+        '/api/products/?category__slug=automation',
+        '/api/products/?category__slug=automation&is_featured=true',
+        '/api/products/?ordering=-created_at',
+        '/api/products/?ordering=-order',
+        '/api/products/?cursor=',
+        '/api/courses/',
+        '/api/courses/?level=beginner',
+        '/api/courses/?is_featured=true',
+        '/api/courses/?level=beginner&is_featured=true',
+        '/api/courses/?ordering=created_at',
+        '/api/3d-printing/',
+        '/api/3d-printing/?is_featured=true',
+        '/api/3d-printing/?ordering=-created_at',
+        '/api/home/',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=mock.MagicMock())
+        categories = list(ProductCategory.objects.all())
+        Product.objects.bulk_create([
+            Product(
+                category=categories[i % len(categories)],
+                name_en=f'Product {i}', name_ar=f'منتج {i}',
+                description_en='-', description_ar='-',
+                order=i % 10, is_featured=i % 7 == 0,
+            )
+            for i in range(500)
+        ])
+
+    def get_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedPlan(self, sql, plan):
+        if 'SCAN qualify' in plan:
+            # A sliced prefetch: the window function's rows must come from an
+            # index, then only the slices are sorted
+            plan = plan[:plan.index('SCAN qualify')]
+        self.assertFalse(
+            any('USE TEMP B-TREE FOR ORDER BY' in step for step in plan),
+            f'Query sorts without an index:\n{sql}\n' + '\n'.join(plan),
+        )
+
+    def test_api_endpoints_use_indexes(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                for query in queries.captured_queries:
+                    if query['sql'].startswith('SELECT'):
+                        self.assertIndexedPlan(query['sql'], self.get_plan(query['sql']))
+
+    def test_contact_message_admin_ordering_uses_indexes(self):
+        for queryset in [
+            ContactMessage.objects.order_by('-created_at'),
+            ContactMessage.objects.filter(status='new').order_by('-created_at'),
+        ]:
+            with self.subTest(query=str(queryset.query)):
+                plan = queryset.explain().splitlines()
+                self.assertIndexedPlan(str(queryset.query), plan)
+
+
+class DatabaseProfileTests(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -2000, 'busy_timeout': 1234})
+    def test_configure_connection_applies_pragmas(self):
+        connection.ensure_connection()
+        database.configure_connection(connection)
+
+        self.assertEqual(database.get_sqlite_settings(connection), {'cache_size': -2000, 'busy_timeout': 1234})
+
+
+class ReplicaRoutingTests(TestCase):
+    """A second SQLite file stands in for a replica."""
+    alias = 'replica1'
+
+    def setUp(self):
+        cache.clear()
+        database._unavailable.clear()
+        self.replica = None
+        self.service = Service.objects.create(
+            title_en='Pumps', title_ar='مضخات', description_en='-', description_ar='-',
+        )
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = f'{self.tempdir.name}/replica.sqlite3'
+        self.copy_tables(self.path, [Service._meta.db_table])
+        # The primary moves on without signals, as if the replica lagged behind
+        Service.objects.filter(pk=self.service.pk).update(title_en='Pumps v2')
+
+    def tearDown(self):
+        if self.replica is not None:
+            self.replica.close()
+            del connections[self.alias]
+        self.tempdir.cleanup()
+
+    def copy_tables(self, path, tables):
+        # sqlite3's backup() waits for this test's open transaction to finish
+        target = sqlite3.connect(path)
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute('SELECT sql FROM sqlite_master WHERE name = %s', [table])
+                target.execute(cursor.fetchone()[0])
+                cursor.execute(f'SELECT * FROM {table}')
+                for row in cursor.fetchall():
+                    target.execute(f'INSERT INTO {table} VALUES ({", ".join("?" * len(row))})', row)
+        target.commit()
+        target.close()
+
+    def add_replica(self, path):
+        # Registered on the handler only, like a connection the test runner didn't set up
+        settings_dict = connections.configure_settings({
+            'default': connections.settings['default'],
+            self.alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': f'file:{path}?mode=ro'},
+        })[self.alias]
+        self.replica = connections[self.alias] = type(connections['default'])(settings_dict, self.alias)
+
+    def get_title(self, async_mode=False):
+        request = RequestFactory().get(f'/api/services/{self.service.pk}/')
+        view = views.ServiceViewSet.as_view({'get': 'retrieve'}, async_mode=async_mode)
+        response = async_to_sync(view)(request, pk=self.service.pk) if async_mode else view(request, pk=self.service.pk)
+        return response.data['title_en']
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_read_views_use_replica(self):
+        self.add_replica(self.path)
+
+        self.assertEqual(self.get_title(), 'Pumps')
+        cache.clear()
+        self.assertEqual(self.get_title(async_mode=True), 'Pumps')
+        self.assertEqual(Service.objects.get(pk=self.service.pk).title_en, 'Pumps v2')
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_contact_form_writes_to_primary(self):
+        self.add_replica(self.path)
+        SiteSettings.objects.create(email='admin@example.com', address_en='-', address_ar='-', phone1='1')
+
+        response = self.client.post('/api/contact/', {
+            'name': 'Sara', 'email': 'sara@example.com', 'subject': 'Quote', 'message': 'Hello',
+        })
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(ContactMessage.objects.filter(email='sara@example.com').exists())
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_change_pins_reads_to_primary(self):
+        self.add_replica(self.path)
+
+        self.service.title_en = 'Pumps v3'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.save()
+
+        self.assertTrue(database.is_pinned())
+        self.assertEqual(self.get_title(), 'Pumps v3')
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_admin_write_pins_the_client(self):
+        self.add_replica(self.path)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        url = f'/api/services/{self.service.pk}/'
+
+        self.assertEqual(self.client.get(url).json()['title_en'], 'Pumps')
+        response = self.client.post(f'/admin/content/service/{self.service.pk}/change/', {
+            'title_en': 'Pumps v3', 'title_ar': 'مضخات', 'description_en': '-', 'description_ar': '-',
+            'icon': 'Wrench', 'order': 0,
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.cookies[database.PIN_COOKIE]['max-age'], 10)
+        # The shared pin is only set on commit, which this test never reaches
+        self.assertFalse(database.is_pinned())
+        cache.clear()
+        self.assertEqual(self.client.get(url).json()['title_en'], 'Pumps v3')
+        self.client.cookies.pop(database.PIN_COOKIE)
+        cache.clear()
+        self.assertEqual(self.client.get(url).json()['title_en'], 'Pumps')
+
+    def test_replicas_need_a_shared_cache(self):
+        with override_settings(DATABASE_REPLICAS=['replica1']):
+            self.assertEqual([error.id for error in database.check_shared_cache(None)], ['content.E001'])
+        self.assertEqual(database.check_shared_cache(None), [])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.tempdir.name}}
+        with override_settings(DATABASE_REPLICAS=['replica1'], CACHES=shared):
+            self.assertEqual(database.check_shared_cache(None), [])
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_change_feed_reads_primary(self):
+        self.service.save()
+        self.copy_tables(self.path, [ContentChange._meta.db_table, ChangeCompaction._meta.db_table])
+        self.add_replica(self.path)
+        # A change the replica hasn't replayed yet
+        self.service.save()
+        latest = changes.get_latest_seq()
+
+        response = self.client.get('/api/changes/', {'since': latest})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'changes': [], 'next': latest, 'has_more': False})
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_unavailable_replica_falls_back_to_primary(self):
+        self.add_replica(f'{self.tempdir.name}/missing.sqlite3')
+
+        self.assertEqual(self.get_title(), 'Pumps v2')
+        self.assertIn(self.alias, database._unavailable)
+
+
+class ChangeFeedTests(TestCase):
+    url = '/api/changes/'
+
+    def setUp(self):
+        call_command('seed_data', stdout=mock.MagicMock())
+        self.cursor = self.client.get(self.url).json()['next']
+
+    def get_changes(self, since, **params):
+        response = self.client.get(self.url, {'since': since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_nothing_changed_is_a_small_response(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'since': self.cursor})
+
+        self.assertEqual(response.json(), {'changes': [], 'next': self.cursor, 'has_more': False})
+        self.assertLess(len(response.content), 64)
+
+    def test_changes_in_sequence_order_with_tombstones(self):
+        service = Service.objects.first()
+        service.title_en = 'Renamed'
+        service.save()
+        category = ProductCategory.objects.create(name_en='New', name_ar='-', slug='new')
+        product = Product.objects.filter(category__isnull=False).first()
+        product_id = product.pk
+        product.delete()
+
+        data = self.get_changes(self.cursor)
+
+        self.assertEqual(
+            [(change['type'], change['id'], change['action']) for change in data['changes']],
+            [('service', service.pk, 'updated'), ('product-category', category.pk, 'created'),
+             ('product', product_id, 'deleted')],
+        )
+        self.assertEqual(data['changes'][0]['data']['title_en'], 'Renamed')
+        self.assertNotIn('data', data['changes'][2])
+        self.assertEqual(data['next'], data['changes'][-1]['seq'])
+        self.assertEqual(self.get_changes(data['next'])['changes'], [])
+
+    def test_category_save_updates_its_products(self):
+        category = ProductCategory.objects.annotate(count=Count('products')).filter(count__gt=0).first()
+        # An earlier entry, which the category's save replaces
+        Product.objects.create(category=category, name_en='Valve', name_ar='-', description_en='-', description_ar='-')
+        product_ids = list(category.products.order_by('pk').values_list('pk', flat=True))
+        category.name_en = 'Renamed'
+        category.save()
+
+        data = self.get_changes(self.cursor)
+
+        self.assertEqual(
+            [(change['type'], change['id']) for change in data['changes']],
+            [('product-category', category.pk)] + [('product', pk) for pk in product_ids],
+        )
+        for change in data['changes'][1:]:
+            self.assertEqual(change['data']['category_name_en'], 'Renamed')
+        self.assertEqual(ContentChange.objects.filter(change_type='product', object_id__in=product_ids).count(), len(product_ids))
+
+    def test_only_the_latest_change_per_object_is_kept(self):
+        service = Service.objects.first()
+        for title in ['One', 'Two', 'Three']:
+            service.title_en = title
+            service.save()
+
+        self.assertEqual(ContentChange.objects.filter(change_type='service', object_id=service.pk).count(), 1)
+        data = self.get_changes(self.cursor)
+        self.assertEqual([change['data']['title_en'] for change in data['changes']], ['Three'])
+        self.assertGreater(data['next'], self.cursor)
+
+    def test_pages_follow_the_cursor(self):
+        services = list(Service.objects.order_by('pk'))
+        for service in services:
+            service.save()
+
+        first = self.get_changes(self.cursor, limit=2)
+        second = self.get_changes(first['next'], limit=100)
+
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        ids = [change['id'] for change in first['changes'] + second['changes']]
+        self.assertEqual(ids, [service.pk for service in services])
+
+    def test_compaction_removes_old_tombstones_and_expires_older_cursors(self):
+        course = Course.objects.first()
+        course.delete()
+        Service.objects.first().save()
+        ContentChange.objects.filter(action='deleted').update(changed_at=timezone.now() - timedelta(days=60))
+
+        call_command('compact_changes', '--dry-run', stdout=mock.MagicMock())
+        self.assertTrue(ContentChange.objects.filter(action='deleted').exists())
+        call_command('compact_changes', stdout=mock.MagicMock())
+
+        self.assertFalse(ContentChange.objects.filter(action='deleted').exists())
+        self.assertEqual(ChangeCompaction.objects.get().removed, 1)
+        self.assertEqual(self.client.get(self.url, {'since': self.cursor}).status_code, 410)
+        latest = self.client.get(self.url).json()['next']
+        self.assertEqual(self.get_changes(latest)['changes'], [])
+        self.assertEqual(changes.compact_changes(timedelta(days=30)), 0)
+
+    def test_newest_tombstone_is_kept(self):
+        Course.objects.first().delete()
+        ContentChange.objects.update(changed_at=timezone.now() - timedelta(days=60))
+        latest = changes.get_latest_seq()
+
+        self.assertEqual(changes.compact_changes(), 0)
+        self.assertEqual(changes.get_latest_seq(), latest)
+
+    def test_invalid_and_future_cursors(self):
+        self.assertEqual(self.client.get(self.url, {'since': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'since': self.cursor + 10}).status_code, 410)
+
+
+class ChangeEventsTests(TestCase):
+    def setUp(self):
+        call_command('seed_data', stdout=mock.MagicMock())
+        patcher = mock.patch.object(events, 'broker', events.ChangeBroker())
+        self.broker = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def rename_service(self, title):
+        service = Service.objects.order_by('pk').first()
+        service.title_en = title
+        service.save()
+        return service
+
+    @override_settings(CHANGE_EVENTS_POLL_INTERVAL=0.01)
+    def test_stream_sends_changes_and_unsubscribes(self):
+        async def listen():
+            stream = events.stream()
+            first = await anext(stream)
+            service = await sync_to_async(self.rename_service)('Live')
+            message = await asyncio.wait_for(anext(stream), 5)
+            await stream.aclose()
+            return first, service, message
+
+        first, service, message = async_to_sync(listen)()
+
+        self.assertEqual(first, f'retry: {events.RETRY}\n\n')
+        seq = changes.get_latest_seq()
+        self.assertEqual(message, (
+            f'id: {seq}\nevent: change\n'
+            f'data: {{"model":"service","id":{service.pk},"version":{seq},"action":"updated"}}\n\n'
+        ))
+        self.assertEqual(self.broker.subscribers, set())
+
+    def test_one_poll_fans_out_to_every_client(self):
+        async def subscribe(count):
+            return [await self.broker.subscribe() for _ in range(count)]
+
+        subscriptions = async_to_sync(subscribe)(1000)
+        self.rename_service('Fan-out')
+        Course.objects.order_by('pk').first().delete()
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(self.broker.poll)()
+
+        self.assertEqual(len(queries), 1)
+        for subscription in subscriptions:
+            self.assertEqual(
+                [subscription.queue.get_nowait()['action'] for _ in range(subscription.queue.qsize())],
+                ['updated', 'deleted'],
+            )
+
+    @override_settings(CHANGE_EVENTS_QUEUE_SIZE=2)
+    def test_slow_client_is_reset(self):
+        async def overflow():
+            subscription = await self.broker.subscribe()
+            for version in range(3):
+                self.broker.publish({'model': 'service', 'id': 1, 'version': version, 'action': 'updated'})
+            return subscription
+
+        subscription = async_to_sync(overflow)()
+
+        self.assertIs(subscription.queue.get_nowait(), events.RESET)
+        self.assertTrue(subscription.queue.empty())
+        self.assertNotIn(subscription, self.broker.subscribers)
+
+    def test_reconnect_replays_missed_changes(self):
+        cursor = changes.get_latest_seq()
+        self.rename_service('One')
+        self.rename_service('Two')
+
+        async def reconnect(last_event_id):
+            stream = events.stream(last_event_id)
+            messages = [await anext(stream) for _ in range(2)]
+            await stream.aclose()
+            return messages[1]
+
+        self.assertIn('"version":%d' % changes.get_latest_seq(), async_to_sync(reconnect)(cursor))
+        with override_settings(CHANGE_EVENTS_REPLAY_LIMIT=0):
+            self.assertEqual(async_to_sync(reconnect)(cursor), events.format_reset())
+        self.assertEqual(async_to_sync(reconnect)(changes.get_latest_seq() + 5), events.format_reset())
+
+    def test_view_streams_only_under_asgi(self):
+        view = views.ChangeEventsView.as_view()
+
+        response = async_to_sync(view)(AsyncRequestFactory().get('/api/changes/events/', {'since': '3'}))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertTrue(response.is_async)
+
+        response = async_to_sync(view)(RequestFactory().get('/api/changes/events/'))
+        self.assertEqual(response.status_code, 501)
+
+    def test_asgi_handler_spots_event_streams(self):
+        handler = events.EventStreamASGIHandler()
+
+        self.assertTrue(handler.is_stream({'path': '/api/changes/events/'}))
+        self.assertTrue(handler.is_stream({'path': '/site/api/changes/events/', 'root_path': '/site'}))
+        self.assertFalse(handler.is_stream({'path': '/api/changes/'}))
+
+
+class ConditionalRequestTests(TestCase):
+    url = '/api/services/'
+
+    def setUp(self):
+        cache.clear()
+        call_command('seed_data', stdout=mock.MagicMock())
+        self.first = self.client.get(self.url)
+
+    def test_if_none_match_returns_not_modified(self):
+        for _ in range(2):
+            # A miss, then a hit
+            cache.clear()
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.first['ETag'])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], self.first['ETag'])
+            self.assertEqual(response.content, b'')
+
+    def test_if_modified_since_returns_not_modified(self):
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=self.first['Last-Modified'])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Last-Modified'], self.first['Last-Modified'])
+
+    def test_update_changes_the_validators(self):
+        service = Service.objects.order_by('pk').last()
+        with self.captureOnCommitCallbacks(execute=True):
+            service.title_en = 'Renamed'
+            service.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], self.first['ETag'])
+        self.assertIn('Renamed', [service['title_en'] for service in response.json()['results']])
+
+    def test_delete_changes_the_etag(self):
+        # Not the latest row, so only the count in the ETag changes
+        service = Service.objects.order_by('updated_at').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            service.delete()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(service.pk, [result['id'] for result in response.json()['results']])
+
+    def test_detail_of_a_missing_row_is_not_found(self):
+        response = self.client.get(f'{self.url}999999/', HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class HomeViewTests(TestCase):
+    url = '/api/home/'
+
+    def setUp(self):
+        cache.clear()
+        call_command('seed_data', stdout=mock.MagicMock())
+
+    def test_category_rename_changes_the_validators(self):
+        first = self.client.get(self.url)
+        product = first.json()['featured_products'][0]
+        category = ProductCategory.objects.get(slug=product['category_slug'])
+        with self.captureOnCommitCallbacks(execute=True):
+            category.name_en = 'Renamed category'
+            category.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['featured_products'][0]['category_name_en'], 'Renamed category')
+
+    def test_sections_are_capped(self):
+        Product.objects.bulk_create([
+            Product(
+                category=ProductCategory.objects.first(), name_en=f'Featured {i}', name_ar='-',
+                description_en='-', description_ar='-', is_featured=True,
+            )
+            for i in range(30)
+        ])
+        cache.clear()
+
+        data = self.client.get(self.url).json()
+
+        expected = Product.objects.filter(is_featured=True).order_by('order', 'name_en')[:views.HomeView.section_limit]
+        self.assertEqual([product['id'] for product in data['featured_products']], [p.pk for p in expected])
+
+
+class KeysetPaginationTests(TestCase):
+    url = '/api/products/'
+
+    def setUp(self):
+        category = ProductCategory.objects.create(name_en='Pumps', name_ar='-', slug='pumps')
+        # Duplicate order and name values, so only the id tells rows apart
+        Product.objects.bulk_create([
+            Product(
+                category=category, name_en=f'Pump {index % 3}', name_ar='-',
+                description_en='-', description_ar='-', order=index % 2,
+            )
+            for index in range(45)
+        ])
+        cache.clear()
+
+    def get_page(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def walk(self, **params):
+        pages = [self.get_page(self.url, cursor='', **params)]
+        while pages[-1]['next']:
+            pages.append(self.get_page(pages[-1]['next']))
+        return pages
+
+    def test_forward_and_reverse_paging_with_duplicate_values(self):
+        pages = self.walk()
+
+        expected = list(Product.objects.order_by('order', 'name_en', 'id').values_list('id', flat=True))
+        self.assertEqual([product['id'] for page in pages for product in page['results']], expected)
+        self.assertEqual([len(page['results']) for page in pages], [20, 20, 5])
+        self.assertIsNone(pages[0]['previous'])
+
+        # Back from the last page
+        previous = self.get_page(pages[-1]['previous'])
+        self.assertEqual(previous['results'], pages[1]['results'])
+        first = self.get_page(previous['previous'])
+        self.assertEqual(first['results'], pages[0]['results'])
+
+    def test_descending_ordering(self):
+        pages = self.walk(ordering='-created_at')
+
+        expected = list(Product.objects.order_by('-created_at', 'id').values_list('id', flat=True))
+        self.assertEqual([product['id'] for page in pages for product in page['results']], expected)
+
+    def test_invalid_cursors_are_bad_requests(self):
+        tampered = [
+            'not-a-cursor',
+            pagination.encode_cursor([1, 2]),
+            pagination.encode_cursor(['x', 'Pump 0', 'y']),
+            pagination.encode_cursor([{'a': 1}, 'Pump 0', 1]),
+        ]
+        for cursor in tampered:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.json())
+
+    def test_count_is_opt_in(self):
+        self.assertNotIn('count', self.get_page(self.url, cursor=''))
+        self.assertEqual(self.get_page(self.url, cursor='', count='true')['count'], 45)
+
+
+class SearchTests(TestCase):
+    url = '/api/search/'
+
+    def setUp(self):
+        cache.clear()
+        self.category = ProductCategory.objects.create(name_en='Pumps', name_ar='مضخات', slug='pumps')
+
+    def create_product(self, name_en, name_ar='-', description_en='-', description_ar='-'):
+        return Product.objects.create(
+            category=self.category, name_en=name_en, name_ar=name_ar,
+            description_en=description_en, description_ar=description_ar,
+        )
+
+    def get_ids(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [result['data']['id'] for result in response.json()['results']]
+
+    def test_normalize_arabic(self):
+        cases = [
+            ('أحمد إبراهيم آمال ٱلعلم', 'احمد ابراهيم امال العلم'),
+            ('مستشفى شاطئ مؤتمر', 'مستشفي شاطي موتمر'),
+            ('مدرسة', 'مدرسه'),
+            ('مَدْرَسَةٌ', 'مدرسه'),
+            ('مـــدرسة', 'مدرسه'),
+            ('Pump 3', 'Pump 3'),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(search.normalize_arabic(text), expected)
+
+    def test_arabic_variants_match(self):
+        product = self.create_product('Pump', name_ar='مِضَخَّة أفقية')
+
+        for query in ['مضخه', 'مضخة', 'افقيه', 'أُفقية']:
+            with self.subTest(query=query):
+                self.assertEqual(self.get_ids(query), [product.pk])
+
+    def test_index_follows_save_and_delete(self):
+        product = self.create_product('Zorblax pump')
+        self.assertEqual(self.get_ids('zorblax'), [product.pk])
+
+        product.name_en = 'Quixel pump'
+        product.save()
+        self.assertEqual(self.get_ids('zorblax'), [])
+        self.assertEqual(self.get_ids('quixel'), [product.pk])
+
+        product.delete()
+        self.assertEqual(self.get_ids('quixel'), [])
+
+    def test_title_matches_rank_first_and_prefixes_match(self):
+        in_body = self.create_product('Valve', description_en='Works with any gearbox')
+        in_title = self.create_product('Gearbox', description_en='Reduction unit')
+
+        self.assertEqual(self.get_ids('gearbox'), [in_title.pk, in_body.pk])
+        self.assertEqual(self.get_ids('gearb'), [in_title.pk, in_body.pk])
+        self.assertEqual(self.get_ids('gearbox', type='service'), [])
+
+    def test_empty_query(self):
+        self.create_product('Pump')
+
+        for query in ['', '   ', '!!']:
+            with self.subTest(query=query):
+                response = self.client.get(self.url, {'q': query})
+                self.assertEqual(response.json(), {'count': 0, 'results': []})
+
+    def test_migration_indexes_existing_rows_from_historical_models(self):
+        product = self.create_product('Gearbox', name_ar='مضخة')
+        search.drop_index(connection)
+        migration = importlib.import_module('content.migrations.0005_search_index')
+        state = MigrationExecutor(connection).loader.project_state(('content', '0005_search_index'))
+
+        # The SQLite schema editor can't open inside the test transaction;
+        # the migration only uses its connection
+        migration.create_search_index(state.apps, mock.Mock(connection=connection))
+
+        self.assertEqual(self.get_ids('gearbox'), [product.pk])
+        self.assertEqual(self.get_ids('مضخه'), [product.pk])
+
+
+@override_settings(IMAGE_RENDITION_WIDTHS=[32, 64], IMAGE_RENDITION_FORMATS=['webp', 'jpeg'])
+class ImageRenditionsTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        media = override_settings(MEDIA_ROOT=self.media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        cache.clear()
+        category = ProductCategory.objects.create(name_en='Pumps', name_ar='مضخات', slug='pumps')
+        self.product = Product.objects.create(
+            category=category, name_en='Pump', name_ar='مضخة', description_en='Pump', description_ar='مضخة',
+            image=self.get_upload('pump.png', (100, 50)),
+        )
+
+    def get_upload(self, name, size):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'blue').save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def get_images(self):
+        """The product's image fields from the detail and the list responses."""
+        fields = ('image_width', 'image_height', 'image_srcset')
+        cache.clear()
+        detail = self.client.get(f'/api/products/{self.product.pk}/').json()
+        cache.clear()
+        listed = self.client.get('/api/products/').json()['results'][0]
+        self.assertEqual({name: listed[name] for name in fields}, {name: detail[name] for name in fields})
+        return {name: detail[name] for name in fields}
+
+    def test_srcset_after_processing(self):
+        self.assertEqual(self.get_images(), {'image_width': None, 'image_height': None, 'image_srcset': None})
+
+        call_command('process_images', stdout=mock.MagicMock())
+
+        images = self.get_images()
+        self.assertEqual((images['image_width'], images['image_height']), (100, 50))
+        self.assertEqual(set(images['image_srcset']), {'webp', 'jpeg'})
+        self.assertEqual(
+            images['image_srcset']['webp'],
+            'http://testserver/media/products/renditions/pump-32w.webp 32w, '
+            'http://testserver/media/products/renditions/pump-64w.webp 64w',
+        )
+
+    def test_replaced_image_is_not_described_by_old_renditions(self):
+        call_command('process_images', stdout=mock.MagicMock())
+        self.product.refresh_from_db()
+        self.product.image = self.get_upload('valve.png', (40, 80))
+        self.product.save()
+
+        self.assertEqual(self.get_images(), {'image_width': None, 'image_height': None, 'image_srcset': None})
+
+        call_command('process_images', stdout=mock.MagicMock())
+        images = self.get_images()
+        self.assertEqual((images['image_width'], images['image_height']), (40, 80))
+        self.assertIn('valve-40w.webp 40w', images['image_srcset']['webp'])
+
+    def test_processing_reaches_the_change_feed(self):
+        cursor = changes.get_latest_seq()
+
+        with mock.patch.object(events.broker, 'notify') as notify:
+            call_command('process_images', stdout=mock.MagicMock())
+
+        notify.assert_called_once_with()
+        data = self.client.get('/api/changes/', {'since': cursor}).json()
+        self.assertEqual([(change['type'], change['id']) for change in data['changes']], [('product', self.product.pk)])
+        self.assertEqual(data['changes'][0]['data']['image_width'], 100)
+
+    def test_removing_the_image_clears_renditions(self):
+        call_command('process_images', stdout=mock.MagicMock())
+        self.product.refresh_from_db()
+        self.product.image = None
+        self.product.save()
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_renditions, {})
+        self.assertEqual((self.product.image_width, self.product.image_height), (None, None))
+        self.assertEqual(self.get_images(), {'image_width': None, 'image_height': None, 'image_srcset': None})
+
+
+@override_settings(SNAPSHOT_HOST='testserver')
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=mock.MagicMock())
+
+    def setUp(self):
+        cache.clear()
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.exporter = snapshots.Exporter(root=self.root.name)
+
+    def read(self, path, query=None):
+        return self.exporter.get_file_path(path, query).read_bytes()
+
+    def exists(self, path, query=None):
+        return self.exporter.get_file_path(path, query).exists()
+
+    def export_on_commit(self, write):
+        """Run ``write`` with SNAPSHOT_AUTO_EXPORT, running the background export inline."""
+        executor = mock.Mock(submit=lambda function, changes: snapshots.Exporter(root=self.root.name).export_changes(changes))
+        with override_settings(SNAPSHOT_AUTO_EXPORT=True), \
+                mock.patch.object(snapshots, 'get_executor', return_value=executor), \
+                self.captureOnCommitCallbacks(execute=True):
+            write()
+        cache.clear()
+
+    def test_routes_follow_the_router(self):
+        self.assertEqual(snapshots.get_routes()['product-categories'], (ProductCategory, 'slug'))
+        self.assertEqual(snapshots.get_routes()['products'], (Product, 'pk'))
+        self.assertEqual(set(snapshots.get_routes()), {'services', 'product-categories', 'products', 'courses', '3d-printing'})
+
+    def test_export_all_matches_the_api(self):
+        self.exporter.export_all()
+
+        product = Product.objects.first()
+        for path, query in [
+            ('/api/products/', None),
+            ('/api/products/', {'lang': 'ar'}),
+            (f'/api/products/{product.pk}/', {'lang': 'en'}),
+            ('/api/product-categories/automation/', None),
+            ('/api/home/', None),
+            ('/api/site-settings/', None),
+        ]:
+            with self.subTest(path=path, query=query):
+                cache.clear()
+                content = self.read(path, query)
+                self.assertEqual(content, self.client.get(path, query).content)
+                file_path = self.exporter.get_file_path(path, query)
+                self.assertEqual(gzip.decompress(file_path.with_name(file_path.name + '.gz').read_bytes()), content)
+        self.assertTrue(self.exists('/api/products/', {'category__slug': 'automation', 'lang': 'ar'}))
+
+    def test_save_exports_after_commit_on_the_background_thread(self):
+        self.exporter.export_all()
+        service = Service.objects.first()
+        service.title_en = 'Renamed service'
+        executor = mock.Mock()
+        with override_settings(SNAPSHOT_AUTO_EXPORT=True), \
+                mock.patch.object(snapshots, 'get_executor', return_value=executor):
+            with self.captureOnCommitCallbacks() as callbacks:
+                service.save()
+                executor.submit.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        executor.submit.assert_called_once()
+        function, changes = executor.submit.call_args.args
+        self.assertIs(function, snapshots.export_in_background)
+        self.assertEqual([(instance.pk, deleted) for instance, deleted in changes], [(service.pk, False)])
+        self.assertNotIn(b'Renamed service', self.read(f'/api/services/{service.pk}/'))
+
+    def test_renamed_category_removes_the_old_slug(self):
+        self.exporter.export_all()
+        category = ProductCategory.objects.get(slug='automation')
+        category.slug = 'industrial-automation'
+        self.export_on_commit(category.save)
+
+        self.assertFalse(self.exists('/api/product-categories/automation/'))
+        self.assertFalse(self.exists('/api/product-categories/automation/', {'lang': 'ar'}))
+        self.assertFalse(self.exists('/api/products/', {'category__slug': 'automation'}))
+        self.assertEqual(
+            self.read('/api/product-categories/industrial-automation/'),
+            self.client.get('/api/product-categories/industrial-automation/').content,
+        )
+        self.assertTrue(self.exists('/api/products/', {'category__slug': 'industrial-automation', 'lang': 'en'}))
+        product = category.products.first()
+        self.assertIn(b'industrial-automation', self.read(f'/api/products/{product.pk}/'))
+
+    def test_deleted_product_is_removed(self):
+        self.exporter.export_all()
+        product = Product.objects.first()
+        path = f'/api/products/{product.pk}/'
+        self.export_on_commit(product.delete)
+
+        self.assertFalse(self.exists(path))
+        self.assertFalse(self.exists(path, {'lang': 'ar'}))
+        self.assertEqual(self.read('/api/products/'), self.client.get('/api/products/').content)
+
+
+class ResponseCacheTests(TestCase):
+    url = '/api/services/'
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=mock.MagicMock())
+
+    def setUp(self):
+        cache.clear()
+
+    def test_hit_runs_no_queries(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(second.content, first.content)
+
+    def test_save_invalidates_after_commit(self):
+        self.client.get(self.url)
+        service = Service.objects.first()
+        service.title_en = 'Renamed'
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            service.save()
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+        for callback in callbacks:
+            callback()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn(b'Renamed', response.content)
+
+    def test_delete_invalidates_after_commit(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Service.objects.first().delete()
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+        for callback in callbacks:
+            callback()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.json()['results']), Service.objects.count())
+
+    def test_entries_are_kept_per_language_and_query(self):
+        for query in ({}, {'lang': 'en'}, {'lang': 'ar'}, {'ordering': '-order'}):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(self.url, query)['X-Cache'], 'MISS')
+                self.assertEqual(self.client.get(self.url, query)['X-Cache'], 'HIT')
+        self.assertNotIn('title_ar', self.client.get(self.url, {'lang': 'en'}).json()['results'][0])
+        self.assertIn('title_ar', self.client.get(self.url).json()['results'][0])
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'other.example'])
+    def test_entries_are_kept_per_host_and_scheme(self):
+        Product.objects.filter(pk=Product.objects.first().pk).update(image='products/pump.jpg')
+        url = '/api/products/'
+        first = self.client.get(url)
+        other = self.client.get(url, HTTP_HOST='other.example', secure=True)
+
+        self.assertEqual(other['X-Cache'], 'MISS')
+        self.assertNotEqual(other['ETag'], first['ETag'])
+        self.assertIn(b'https://other.example/media/products/pump.jpg', other.content)
+        self.assertNotIn(b'http://testserver/', other.content)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+    def test_cache_stats_counts_hits_and_misses(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.client.get(self.url)
+
+        stdout = StringIO()
+        call_command('cache_stats', '--reset', stdout=stdout)
+
+        output = stdout.getvalue()
+        self.assertIn('Hits:      2', output)
+        self.assertIn('Misses:    1', output)
+        self.assertIn('Hit ratio: 66.7%', output)
+        self.assertEqual(content_cache.get_stats()['hits'], 0)
+
+    def test_per_process_cache_is_reported_on_deploy(self):
+        self.assertEqual([warning.id for warning in content_cache.check_shared_cache(None)], ['content.W002'])
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}):
+            self.assertEqual(content_cache.check_shared_cache(None), [])
+
+
+class SiteSettingsTests(TestCase):
+    url = '/api/site-settings/'
+
+    def setUp(self):
+        cache.clear()
+
+    def assertNoWrites(self, paths):
+        for path in paths:
+            with self.subTest(path=path), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(path).status_code, 200)
+            writes = [query['sql'] for query in queries.captured_queries
+                      if query['sql'].lstrip().startswith(('INSERT', 'UPDATE'))]
+            self.assertEqual(writes, [])
+
+    def test_get_without_a_row_does_not_write(self):
+        self.assertNoWrites([self.url, '/api/home/'])
+
+        self.assertFalse(SiteSettings.objects.exists())
+        self.assertEqual(self.client.get(self.url).json()['company_name_en'], 'Hydra Tech')
+
+    def test_get_with_a_row_does_not_write(self):
+        SiteSettings.objects.create(email='admin@example.com', address_en='-', address_ar='-', phone1='1')
+
+        self.assertNoWrites([self.url, '/api/home/'])
+
+    def test_cached_copy_is_refreshed_after_save(self):
+        site_settings = SiteSettings.load()
+        self.assertIs(SiteSettings.cached(), SiteSettings.cached())
+
+        site_settings.phone1 = '0123'
+        with self.captureOnCommitCallbacks(execute=True):
+            site_settings.save()
+
+        self.assertEqual(SiteSettings.cached().phone1, '0123')
+        with self.assertNumQueries(0):
+            SiteSettings.cached()
+
+
+class LanguageProjectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', stdout=mock.MagicMock())
+
+    def setUp(self):
+        cache.clear()
+
+    def get_paths(self):
+        paths = ['/api/home/', '/api/site-settings/']
+        for prefix, (model, lookup) in snapshots.get_routes().items():
+            paths.append(f'/api/{prefix}/')
+            paths.append(f'/api/{prefix}/{getattr(model.objects.first(), lookup)}/')
+        return paths
+
+    def get_keys(self, data):
+        if isinstance(data, dict):
+            return set(data).union(*[self.get_keys(value) for value in data.values()])
+        if isinstance(data, list):
+            return set().union(*[self.get_keys(value) for value in data])
+        return set()
+
+    def test_other_language_is_neither_read_nor_returned(self):
+        for path in self.get_paths():
+            with self.subTest(path=path):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(path, {'lang': 'en'})
+
+                self.assertEqual(response.status_code, 200)
+                keys = self.get_keys(response.json())
+                self.assertTrue(any(key.endswith('_en') for key in keys))
+                self.assertEqual([key for key in keys if key.endswith('_ar')], [])
+                # The site settings row is loaded whole into the process-local
+                # copy that serves every language
+                selected = [query['sql'] for query in queries.captured_queries
+                            if '_ar"' in query['sql'] and 'FROM "content_sitesettings"' not in query['sql']]
+                self.assertEqual(selected, [])
+
+    def test_unknown_language_returns_both(self):
+        for path in self.get_paths():
+            with self.subTest(path=path):
+                response = self.client.get(path, {'lang': 'xx'})
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), self.client.get(path).json())
+                self.assertTrue(any(key.endswith('_ar') for key in self.get_keys(response.json())))
@@ -0,0 +1,191 @@
+"""
+Write-path protection for the contact form.
+
+``ContactRateThrottle`` applies two token buckets to every submission: one per
+client address and one shared by all clients, so a burst from many addresses
+still can't exceed what the database writer and the mail quota can absorb.
+Buckets live in the content cache as ``(tokens, updated)`` pairs. Updates are
+serialised within a process; on a shared cache, workers can race and let a
+few extra requests through, which is fine for a spam guard.
+
+Identical submissions (same name, email, subject and message) within
+``CONTACT_DEDUP_WINDOW`` seconds are answered from the cache without saving a
+row or queueing emails. Accepted, deduplicated and rejected submissions are
+counted next to the response cache counters; see the ``contact_stats``
+command.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from .cache import KEY_PREFIX, acall, aincr, get_cache, incr, stat_key
+
+
+# Capacity is the burst size; rate is the refill in tokens per minute
+DEFAULT_BUCKETS = {
+    'ip': {'capacity': 5, 'rate': 2},
+    'global': {'capacity': 60, 'rate': 30},
+}
+STATS = ('accepted', 'deduplicated', 'rejected:ip', 'rejected:global')
+DEDUP_FIELDS = ('name', 'email', 'subject', 'message')
+# Stored for a submission that is being saved by another request
+PENDING = 'pending'
+
+_lock = threading.Lock()
+
+
+def get_buckets():
+    return getattr(settings, 'CONTACT_THROTTLE_BUCKETS', DEFAULT_BUCKETS)
+
+
+def get_dedup_window():
+    return getattr(settings, 'CONTACT_DEDUP_WINDOW', 10 * 60)
+
+
+def _bucket_key(scope, ident):
+    digest = hashlib.md5(str(ident).encode('utf-8'), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:throttle:{scope}:{digest}'
+
+
+def take(scope, ident):
+    """
+    Take a token from the ``scope`` bucket of ``ident``. Return ``(allowed,
+    wait)``, where ``wait`` is the number of seconds until a token is free.
+    """
+    bucket = get_buckets().get(scope)
+    if bucket is None:
+        return True, 0
+    capacity, rate = bucket['capacity'], bucket['rate'] / 60
+    cache = get_cache()
+    key = _bucket_key(scope, ident)
+    with _lock:
+        now = time.time()
+        tokens, updated = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens < 1:
+            return False, (1 - tokens) / rate
+        # A bucket left alone until it is full again is the same as no bucket
+        cache.set(key, (tokens - 1, now), math.ceil(capacity / rate) + 1)
+    return True, 0
+
+
+def refund(scope, ident):
+    """Put back a token taken by ``take`` for a request that was refused anyway."""
+    bucket = get_buckets().get(scope)
+    if bucket is None:
+        return
+    capacity, rate = bucket['capacity'], bucket['rate'] / 60
+    cache = get_cache()
+    key = _bucket_key(scope, ident)
+    with _lock:
+        entry = cache.get(key)
+        # An expired bucket is already full
+        if entry is not None:
+            tokens, updated = entry
+            cache.set(key, (min(capacity, tokens + 1), updated), math.ceil(capacity / rate) + 1)
+
+
+class ContactRateThrottle(BaseThrottle):
+    """
+    Per-address and global token buckets. A single class, because DRF asks
+    every throttle even after one has refused the request, and a refused
+    request must not spend a token from either bucket.
+    """
+    def __init__(self):
+        self.wait_time = None
+
+    def allow_request(self, request, view):
+        taken = []
+        for scope, ident in (('ip', self.get_ident(request)), ('global', 'all')):
+            allowed, self.wait_time = take(scope, ident)
+            if not allowed:
+                for bucket in taken:
+                    refund(*bucket)
+                incr(get_cache(), stat_key(f'contact:rejected:{scope}'))
+                return False
+            taken.append((scope, ident))
+        return True
+
+    def wait(self):
+        return self.wait_time
+
+
+def get_fingerprint(data):
+    """Hash of the fields that make two submissions the same message."""
+    parts = [str(data.get(field) or '').strip() for field in DEDUP_FIELDS]
+    parts[1] = parts[1].lower()
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _submission_key(fingerprint):
+    return f'{KEY_PREFIX}:contact:{fingerprint}'
+
+
+def claim_submission(fingerprint):
+    """
+    Reserve ``fingerprint`` for this request. Return None if it is new,
+    otherwise the response data of the earlier submission, or ``PENDING``
+    while that one is still being saved.
+    """
+    window = get_dedup_window()
+    if not window:
+        return None
+    cache = get_cache()
+    key = _submission_key(fingerprint)
+    if cache.add(key, PENDING, window):
+        return None
+    incr(cache, stat_key('contact:deduplicated'))
+    return cache.get(key, PENDING)
+
+
+async def aclaim_submission(fingerprint):
+    window = get_dedup_window()
+    if not window:
+        return None
+    cache = get_cache()
+    key = _submission_key(fingerprint)
+    if await acall(cache, 'add', key, PENDING, window):
+        return None
+    await aincr(cache, stat_key('contact:deduplicated'))
+    return await acall(cache, 'get', key, PENDING)
+
+
+def remember_submission(fingerprint, data):
+    """Store the response data of a saved submission for its duplicates."""
+    cache = get_cache()
+    window = get_dedup_window()
+    if window:
+        cache.set(_submission_key(fingerprint), data, window)
+    incr(cache, stat_key('contact:accepted'))
+
+
+async def aremember_submission(fingerprint, data):
+    cache = get_cache()
+    window = get_dedup_window()
+    if window:
+        await acall(cache, 'set', _submission_key(fingerprint), data, window)
+    await aincr(cache, stat_key('contact:accepted'))
+
+
+def release_submission(fingerprint):
+    """Forget a claim whose submission failed, so that a retry is accepted."""
+    get_cache().delete(_submission_key(fingerprint))
+
+
+async def arelease_submission(fingerprint):
+    await acall(get_cache(), 'delete', _submission_key(fingerprint))
+
+
+def get_stats():
+    """Return accepted, deduplicated and rejected submission counts."""
+    keys = {name: stat_key(f'contact:{name}') for name in STATS}
+    values = get_cache().get_many(list(keys.values()))
+    return {name: values.get(key, 0) for name, key in keys.items()}
+
+
+def reset_stats():
+    get_cache().delete_many([stat_key(f'contact:{name}') for name in STATS])
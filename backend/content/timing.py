@@ -0,0 +1,248 @@
+"""
+Per-request timing for the ``Server-Timing`` header and per-route aggregates.
+
+``ServerTimingMiddleware`` (see ``content.middleware``) activates a ``Timer``
+for each request. The timer counts queries and SQL time through a database
+execute wrapper installed on every connection, which also sees the queries
+async views run in worker threads, and serializer time through
+``TimedSerializerMixin``. Render
+time is measured around ``response.render()``. Serializer time excludes
+queries run while serializing (e.g. a lazy relation); those count as SQL.
+
+Finished timers are added to process-local totals, which are flushed every
+``FLUSH_INTERVAL`` seconds into per-minute counters in the content cache. The
+counters expire after ``SERVER_TIMING_WINDOW`` minutes, so ``get_route_stats``
+always describes a rolling window across all workers.
+"""
+import contextvars
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+
+from .cache import KEY_PREFIX, get_cache
+
+
+FLUSH_INTERVAL = 10
+# Totals kept per route, in this order; times are in microseconds
+METRICS = ('requests', 'total', 'sql', 'queries', 'serialize', 'render')
+
+_current = contextvars.ContextVar('content_timer', default=None)
+
+_lock = threading.Lock()
+_pending = {}
+_last_flush = time.monotonic()
+
+
+class Timer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.queries = 0
+        self.sql = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.render_started = None
+        self.serializing = False
+
+    def execute(self, execute, sql, params, many, context):
+        """Database execute wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    def time_serializer(self, function, *args):
+        # Nested serializers are already inside the outermost measurement
+        if self.serializing:
+            return function(*args)
+        self.serializing = True
+        started = time.perf_counter()
+        sql = self.sql
+        try:
+            return function(*args)
+        finally:
+            self.serializing = False
+            self.serialize += time.perf_counter() - started - (self.sql - sql)
+
+    def start_render(self):
+        self.render_started = time.perf_counter()
+
+    def finish_render(self, response):
+        if self.render_started is not None:
+            self.render += time.perf_counter() - self.render_started
+            self.render_started = None
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def get_header(self):
+        return ', '.join([
+            f'db;dur={self.sql * 1000:.2f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize * 1000:.2f}',
+            f'render;dur={self.render * 1000:.2f}',
+            f'total;dur={self.total * 1000:.2f}',
+        ])
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    timer = _current.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer.execute(execute, sql, params, many, context)
+
+
+def install_execute_wrapper(connection):
+    # A connection that reconnects keeps the wrappers it already has
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def get_timer():
+    """The active request's timer, or None when timing is off."""
+    return _current.get()
+
+
+def activate(timer):
+    return _current.set(timer)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def is_enabled():
+    return getattr(settings, 'SERVER_TIMING_ENABLED', False)
+
+
+def get_window():
+    """Minutes covered by the per-route aggregate."""
+    return getattr(settings, 'SERVER_TIMING_WINDOW', 15)
+
+
+def can_view(request):
+    """Only staff and allow-listed addresses get the ``Server-Timing`` header."""
+    if request.META.get('REMOTE_ADDR') in getattr(settings, 'SERVER_TIMING_ALLOWED_IPS', []):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_active and user.is_staff)
+
+
+async def acan_view(request):
+    if request.META.get('REMOTE_ADDR') in getattr(settings, 'SERVER_TIMING_ALLOWED_IPS', []):
+        return True
+    if not hasattr(request, 'auser'):
+        return False
+    user = await request.auser()
+    return bool(user.is_active and user.is_staff)
+
+
+def get_route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return f'{request.method} {match.view_name}'
+
+
+def _routes_key():
+    return f'{KEY_PREFIX}:timing:routes'
+
+
+def _bucket_key(route, bucket, metric):
+    digest = hashlib.md5(route.encode('utf-8'), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:timing:{digest}:{bucket}:{metric}'
+
+
+def record(route, timer):
+    """Add a finished request to the totals and flush them when due."""
+    global _last_flush
+    values = (
+        1,
+        round(timer.total * 1e6),
+        round(timer.sql * 1e6),
+        timer.queries,
+        round(timer.serialize * 1e6),
+        round(timer.render * 1e6),
+    )
+    with _lock:
+        totals = _pending.setdefault(route, [0] * len(METRICS))
+        for i, value in enumerate(values):
+            totals[i] += value
+        due = time.monotonic() - _last_flush >= FLUSH_INTERVAL
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        flush()
+
+
+def flush():
+    """Write this process's pending totals to the shared per-minute counters."""
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return
+    cache = get_cache()
+    routes = cache.get(_routes_key()) or set()
+    if not routes.issuperset(pending):
+        cache.set(_routes_key(), routes | set(pending), None)
+    bucket = int(time.time() // 60)
+    timeout = (get_window() + 1) * 60
+    for route, totals in pending.items():
+        for metric, value in zip(METRICS, totals):
+            key = _bucket_key(route, bucket, metric)
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                cache.set(key, value, timeout)
+
+
+def _window_keys(routes, window):
+    current = int(time.time() // 60)
+    buckets = range(current - window + 1, current + 1)
+    return {
+        (route, metric): [_bucket_key(route, bucket, metric) for bucket in buckets]
+        for route in routes for metric in METRICS
+    }
+
+
+def get_route_stats(window=None):
+    """
+    Return ``{route: {requests, mean_ms, sql_ms, queries, serialize_ms,
+    render_ms}}`` averaged over the last ``window`` minutes.
+    """
+    cache = get_cache()
+    routes = sorted(cache.get(_routes_key()) or ())
+    keys = _window_keys(routes, window or get_window())
+    values = cache.get_many([key for bucket_keys in keys.values() for key in bucket_keys])
+
+    stats = {}
+    for route in routes:
+        totals = {
+            metric: sum(values.get(key, 0) for key in keys[route, metric])
+            for metric in METRICS
+        }
+        requests = totals['requests']
+        if not requests:
+            continue
+        stats[route] = {
+            'requests': requests,
+            'mean_ms': totals['total'] / requests / 1000,
+            'sql_ms': totals['sql'] / requests / 1000,
+            'queries': totals['queries'] / requests,
+            'serialize_ms': totals['serialize'] / requests / 1000,
+            'render_ms': totals['render'] / requests / 1000,
+        }
+    return stats
+
+
+def reset_stats():
+    with _lock:
+        _pending.clear()
+    cache = get_cache()
+    routes = cache.get(_routes_key()) or ()
+    keys = _window_keys(routes, get_window())
+    cache.delete_many([key for bucket_keys in keys.values() for key in bucket_keys] + [_routes_key()])
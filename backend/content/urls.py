@@ -11,6 +11,10 @@ router.register(r'3d-printing', views.ThreeDPrintingProjectViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('home/', views.HomeView.as_view(), name='home'),
+    path('changes/', views.ChangeFeedView.as_view(), name='changes'),
+    path('changes/events/', views.ChangeEventsView.as_view(), name='change-events'),
+    path('search/', views.SearchView.as_view(), name='search'),
     path('site-settings/', views.SiteSettingsView.as_view(), name='site-settings'),
     path('contact/', views.ContactMessageView.as_view(), name='contact'),
 ]
@@ -1,18 +1,44 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework import viewsets, generics, status
+from rest_framework.exceptions import ValidationError
+from django.db.models import Count, Max, Prefetch
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import transaction
 from .models import Service, ProductCategory, Product, Course, SiteSettings, ThreeDPrintingProject, ContactMessage
 from .serializers import (
-    ServiceSerializer, ProductCategorySerializer, ProductSerializer,
+    ServiceSerializer, ProductCategorySerializer, ProductCategoryWithProductsSerializer, ProductSerializer,
     CourseSerializer, SiteSettingsSerializer, ThreeDPrintingProjectSerializer, ContactMessageSerializer
 )
+from .emails import queue_contact_emails
+from .mixins import (
+    AsyncDispatchMixin, AsyncReadOnlyModelMixin, CachedResponseMixin, LanguageViewMixin, ReplicaReadMixin,
+    ValuesListMixin,
+)
+from .pagination import KeysetPagination
+from .signals import CACHED_MODELS
+from .throttling import ContactRateThrottle
+from . import changes, events, search, throttling
+
+
+class AsyncReadOnlyModelViewSet(
+    ReplicaReadMixin, AsyncDispatchMixin, AsyncReadOnlyModelMixin, viewsets.ReadOnlyModelViewSet
+):
+    """
+    Read-only viewset served by async handlers under ASGI, from a read replica
+    when there is one. Public content needs no session lookup, so
+    authentication is skipped.
+    """
+    authentication_classes = []
 
 
-class ServiceViewSet(viewsets.ReadOnlyModelViewSet):
+class ServiceViewSet(CachedResponseMixin, LanguageViewMixin, ValuesListMixin, AsyncReadOnlyModelViewSet):
     """
     API endpoint for services.
     Supports list and detail views.
@@ -22,17 +48,71 @@ class ServiceViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
 
 
-class ProductCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductCategoryViewSet(CachedResponseMixin, LanguageViewMixin, ValuesListMixin, AsyncReadOnlyModelViewSet):
     """
     API endpoint for product categories.
+    ``expand=products`` embeds the first ``products_limit`` products of each
+    category, ``max_products_limit`` at most and by default; the products
+    list pages through the rest. The products are loaded with one prefetch
+    query for the whole page.
     """
     queryset = ProductCategory.objects.all()
     serializer_class = ProductCategorySerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug'
+    product_ordering = ['order', 'name_en']
+    max_products_limit = api_settings.PAGE_SIZE
+
+    def expands_products(self):
+        return 'products' in self.request.query_params.get('expand', '').split(',')
+
+    def get_products_limit(self):
+        limit = self.request.query_params.get('products_limit')
+        if limit is None:
+            return self.max_products_limit
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError({'products_limit': 'Expected a positive integer.'})
+        return min(limit, self.max_products_limit)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.expands_products():
+            return queryset
+        # Sliced per category with a window function, still in one query
+        products = self.project_queryset(Product.objects.all())
+        products = products.order_by(*self.product_ordering)[:self.get_products_limit()]
+        return queryset.prefetch_related(Prefetch('products', queryset=products, to_attr='expanded_products'))
 
+    def get_serializer_class(self):
+        if self.expands_products():
+            return ProductCategoryWithProductsSerializer
+        return super().get_serializer_class()
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+    def get_cache_models(self):
+        if self.expands_products():
+            return (ProductCategory, Product)
+        return super().get_cache_models()
+
+    def get_validator_aggregates(self):
+        aggregates = super().get_validator_aggregates()
+        if self.expands_products():
+            aggregates['last_products'] = Max('products__updated_at')
+            aggregates['product_count'] = Count('products')
+        return aggregates
+
+    def get_validators_from(self, result):
+        last_modified, count = super().get_validators_from(result)
+        if count and 'product_count' in result:
+            # Deleting a category's last product changes neither of the others
+            count = f"{count}-{result['product_count']}"
+        return last_modified, count
+
+
+class ProductViewSet(CachedResponseMixin, LanguageViewMixin, ValuesListMixin, AsyncReadOnlyModelViewSet):
     """
     API endpoint for products.
     Supports filtering by category slug and featured status.
@@ -40,13 +120,17 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Product.objects.select_related('category').all()
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
+    cache_models = (Product, ProductCategory)
+    validator_fields = ('updated_at', 'category__updated_at')
+    language_related = ('category',)
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['category__slug', 'is_featured']
     ordering_fields = ['order', 'created_at']
     ordering = ['order', 'name_en']
 
 
-class CourseViewSet(viewsets.ReadOnlyModelViewSet):
+class CourseViewSet(CachedResponseMixin, LanguageViewMixin, ValuesListMixin, AsyncReadOnlyModelViewSet):
     """
     API endpoint for courses.
     Supports filtering by level and featured status.
@@ -54,25 +138,31 @@ class CourseViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [AllowAny]
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['level', 'is_featured']
     ordering_fields = ['order', 'created_at']
     ordering = ['order', 'title_en']
 
 
-class SiteSettingsView(generics.RetrieveAPIView):
+class SiteSettingsView(ReplicaReadMixin, AsyncDispatchMixin, LanguageViewMixin, generics.RetrieveAPIView):
     """
     API endpoint for site settings (singleton).
     """
     queryset = SiteSettings.objects.all()
     serializer_class = SiteSettingsSerializer
     permission_classes = [AllowAny]
+    authentication_classes = []
 
     def get_object(self):
-        return SiteSettings.load()
+        return SiteSettings.cached()
+
+    async def async_get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(await SiteSettings.acached())
+        return Response(serializer.data)
 
 
-class ThreeDPrintingProjectViewSet(viewsets.ReadOnlyModelViewSet):
+class ThreeDPrintingProjectViewSet(CachedResponseMixin, LanguageViewMixin, ValuesListMixin, AsyncReadOnlyModelViewSet):
     """
     API endpoint for 3D printing projects.
     Supports filtering by featured status.
@@ -80,93 +170,401 @@ class ThreeDPrintingProjectViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ThreeDPrintingProject.objects.all()
     serializer_class = ThreeDPrintingProjectSerializer
     permission_classes = [AllowAny]
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['is_featured']
     ordering_fields = ['order', 'created_at']
     ordering = ['order', 'title_en']
 
 
-class ContactMessageView(generics.CreateAPIView):
+class HomeView(ReplicaReadMixin, AsyncDispatchMixin, CachedResponseMixin, LanguageViewMixin, generics.GenericAPIView):
+    """
+    API endpoint bundling everything the homepage needs in one response:
+    services, featured products, featured courses and site settings. Each
+    section holds at most ``section_limit`` rows, in the list order.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    cache_models = CACHED_MODELS
+    section_limit = api_settings.PAGE_SIZE
+    # Timestamp fields, beyond ``updated_at``, that a section's body depends on
+    section_validator_fields = {
+        # Products embed their category's names and slug
+        'featured_products': ('category__updated_at',),
+    }
+
+    def get_sections(self):
+        return {
+            'services': (self.project_queryset(Service.objects.all()), ServiceSerializer),
+            'featured_products': (
+                self.project_queryset(
+                    Product.objects.select_related('category').filter(is_featured=True),
+                    related=('category',),
+                ),
+                ProductSerializer,
+            ),
+            'featured_courses': (
+                self.project_queryset(Course.objects.filter(is_featured=True)),
+                CourseSerializer,
+            ),
+        }
+
+    def get_section_aggregates(self, name):
+        fields = ('updated_at', *self.section_validator_fields.get(name, ()))
+        aggregates = {f'last_{index}': Max(field) for index, field in enumerate(fields)}
+        return dict(aggregates, count=Count('pk'))
+
+    def combine_validators(self, results, site_settings):
+        """
+        Validators for the bundle from each section's aggregate and the
+        settings. The aggregates cover every row of a section, not only the
+        ones shown, so they may change when the body doesn't, never the
+        other way round.
+        """
+        timestamps = [
+            value for result in results for key, value in result.items()
+            if key.startswith('last_') and value is not None
+        ]
+        if site_settings.updated_at is not None:
+            timestamps.append(site_settings.updated_at)
+        counts = '-'.join(str(result['count']) for result in results)
+        return (max(timestamps) if timestamps else None), counts
+
+    def get_validators(self):
+        results = [
+            queryset.aggregate(**self.get_section_aggregates(name))
+            for name, (queryset, serializer_class) in self.get_sections().items()
+        ]
+        return self.combine_validators(results, SiteSettings.cached())
+
+    async def async_get_validators(self):
+        results = [
+            await queryset.aaggregate(**self.get_section_aggregates(name))
+            for name, (queryset, serializer_class) in self.get_sections().items()
+        ]
+        return self.combine_validators(results, await SiteSettings.acached())
+
+    def get(self, request, *args, **kwargs):
+        return self.cached_response(self.bundle, request, *args, **kwargs)
+
+    async def async_get(self, request, *args, **kwargs):
+        return await self.async_cached_response(self.async_bundle, request, *args, **kwargs)
+
+    def bundle(self, request, *args, **kwargs):
+        context = self.get_serializer_context()
+        data = {
+            name: serializer_class(queryset[:self.section_limit], many=True, context=context).data
+            for name, (queryset, serializer_class) in self.get_sections().items()
+        }
+        data['site_settings'] = SiteSettingsSerializer(SiteSettings.cached(), context=context).data
+        return Response(data)
+
+    async def async_bundle(self, request, *args, **kwargs):
+        context = self.get_serializer_context()
+        data = {
+            name: serializer_class(
+                [instance async for instance in queryset[:self.section_limit]], many=True, context=context
+            ).data
+            for name, (queryset, serializer_class) in self.get_sections().items()
+        }
+        data['site_settings'] = SiteSettingsSerializer(await SiteSettings.acached(), context=context).data
+        return Response(data)
+
+
+class SearchView(AsyncDispatchMixin, LanguageViewMixin, generics.GenericAPIView):
+    """
+    API endpoint for bilingual full-text search.
+    Accepts ``q``, an optional comma-separated ``type`` filter
+    (product, service, course, 3d-printing) and ``limit``.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    default_limit = 20
+    max_limit = 100
+    serializer_classes = {
+        'product': ProductSerializer,
+        'service': ServiceSerializer,
+        'course': CourseSerializer,
+        '3d-printing': ThreeDPrintingProjectSerializer,
+    }
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def get_hits(self):
+        query = self.request.query_params.get('q', '').strip()
+        types = self.request.query_params.get('type')
+        types = types.split(',') if types else None
+        return search.search(query, types=types, limit=self.get_limit()) if query else []
+
+    def get_match_querysets(self, hits):
+        """Return ``{type: (queryset, pks)}`` to load each model's matches in one query."""
+        pks_by_type = {}
+        for search_type, pk, rank in hits:
+            pks_by_type.setdefault(search_type, []).append(pk)
+        querysets = {}
+        for search_type, pks in pks_by_type.items():
+            model = search.SEARCH_MODELS[search_type][0]
+            queryset = model.objects.all()
+            if model is Product:
+                queryset = self.project_queryset(queryset.select_related('category'), related=('category',))
+            else:
+                queryset = self.project_queryset(queryset)
+            querysets[search_type] = (queryset, pks)
+        return querysets
+
+    def get(self, request, *args, **kwargs):
+        hits = self.get_hits()
+        objects = {
+            search_type: queryset.in_bulk(pks)
+            for search_type, (queryset, pks) in self.get_match_querysets(hits).items()
+        }
+        return self.get_search_response(hits, objects)
+
+    async def async_get(self, request, *args, **kwargs):
+        # The FTS query is raw SQL without an async variant
+        hits = await sync_to_async(self.get_hits)()
+        objects = {
+            search_type: await queryset.ain_bulk(pks)
+            for search_type, (queryset, pks) in self.get_match_querysets(hits).items()
+        }
+        return self.get_search_response(hits, objects)
+
+    def get_search_response(self, hits, objects):
+        """Serialize the loaded matches in rank order."""
+        context = self.get_serializer_context()
+        results = []
+        for search_type, pk, rank in hits:
+            instance = objects[search_type].get(pk)
+            if instance is None:
+                continue
+            results.append({
+                'type': search_type,
+                'rank': rank,
+                'data': self.serializer_classes[search_type](instance, context=context).data,
+            })
+        return Response({'count': len(results), 'results': results})
+
+
+class ChangeFeedView(AsyncDispatchMixin, LanguageViewMixin, generics.GenericAPIView):
+    """
+    API endpoint for delta sync: the content changes after ``since``, the
+    ``next`` value of the previous response, oldest first. Without ``since``
+    it only returns the current cursor. Deletions come as tombstones without
+    ``data``; created and updated objects come with their current data. A
+    cursor from before the last tombstone compaction gets 410 Gone, and the
+    client has to sync again from the lists.
+
+    Reads from the primary: a cursor from an earlier response or from the
+    event stream may be ahead of a lagging replica, which would take it for
+    an unknown cursor.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    default_limit = 100
+    max_limit = 1000
+    serializer_classes = {
+        'service': ServiceSerializer,
+        'product-category': ProductCategorySerializer,
+        'product': ProductSerializer,
+        'course': CourseSerializer,
+        '3d-printing': ThreeDPrintingProjectSerializer,
+        'site-settings': SiteSettingsSerializer,
+    }
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def get_since(self):
+        since = self.request.query_params.get('since')
+        if since is None:
+            return None
+        try:
+            since = int(since)
+        except ValueError:
+            since = -1
+        if since < 0:
+            raise ValidationError({'since': 'Expected the next value of a previous response.'})
+        return since
+
+    def get_record_querysets(self, entries):
+        """Return ``{type: (queryset, pks)}`` to load each model's changed objects in one query."""
+        pks_by_type = {}
+        for change in entries:
+            if change.action != changes.DELETED:
+                pks_by_type.setdefault(change.change_type, []).append(change.object_id)
+        querysets = {}
+        for change_type, pks in pks_by_type.items():
+            model = changes.CHANGE_MODELS[change_type]
+            queryset = model.objects.all()
+            if model is Product:
+                queryset = self.project_queryset(queryset.select_related('category'), related=('category',))
+            else:
+                queryset = self.project_queryset(queryset)
+            querysets[change_type] = (queryset, pks)
+        return querysets
+
+    def get(self, request, *args, **kwargs):
+        since = self.get_since()
+        if since is None:
+            return self.get_cursor_response(changes.get_latest_seq())
+        if since < changes.get_horizon():
+            return self.get_expired_response()
+        limit = self.get_limit()
+        entries = list(changes.get_changes(since)[:limit + 1])
+        if not entries and since > changes.get_latest_seq():
+            return self.get_expired_response()
+        objects = {
+            change_type: queryset.in_bulk(pks)
+            for change_type, (queryset, pks) in self.get_record_querysets(entries[:limit]).items()
+        }
+        return self.get_feed_response(since, entries, limit, objects)
+
+    async def async_get(self, request, *args, **kwargs):
+        since = self.get_since()
+        if since is None:
+            return self.get_cursor_response(await changes.aget_latest_seq())
+        if since < await changes.aget_horizon():
+            return self.get_expired_response()
+        limit = self.get_limit()
+        entries = [change async for change in changes.get_changes(since)[:limit + 1]]
+        if not entries and since > await changes.aget_latest_seq():
+            return self.get_expired_response()
+        objects = {
+            change_type: await queryset.ain_bulk(pks)
+            for change_type, (queryset, pks) in self.get_record_querysets(entries[:limit]).items()
+        }
+        return self.get_feed_response(since, entries, limit, objects)
+
+    def get_cursor_response(self, seq):
+        return Response({'changes': [], 'next': seq, 'has_more': False})
+
+    def get_expired_response(self):
+        # Also for a cursor past the latest change, e.g. after a restore
+        return Response(
+            {'detail': 'The cursor has expired. Sync again from the lists.'},
+            status=status.HTTP_410_GONE
+        )
+
+    def get_feed_response(self, since, entries, limit, objects):
+        context = self.get_serializer_context()
+        results = []
+        for change in entries[:limit]:
+            item = {
+                'seq': change.seq,
+                'type': change.change_type,
+                'id': change.object_id,
+                'action': change.action,
+                'changed_at': change.changed_at,
+            }
+            instance = objects.get(change.change_type, {}).get(change.object_id)
+            if instance is not None:
+                item['data'] = self.serializer_classes[change.change_type](instance, context=context).data
+            results.append(item)
+        return Response({
+            'changes': results,
+            'next': results[-1]['seq'] if results else since,
+            'has_more': len(entries) > limit,
+        })
+
+
+class ChangeEventsView(View):
+    """
+    Server-Sent Events stream of content changes (see ``content.events``):
+    a ``change`` event ``{model, id, version, action}`` per created, updated
+    or deleted object. ``Last-Event-ID``, or ``since`` from the change feed,
+    resumes after that position. Only served through ASGI.
+    """
+    def get_last_event_id(self):
+        value = self.request.headers.get('Last-Event-ID') or self.request.GET.get('since')
+        try:
+            return max(0, int(value)) if value else None
+        except ValueError:
+            return None
+
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            # WSGI reads an async stream to the end before sending anything
+            return HttpResponse('Event streams need the ASGI server.', status=501, content_type='text/plain')
+        response = StreamingHttpResponse(events.stream(self.get_last_event_id()), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Keeps nginx from buffering the events
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class ContactMessageView(AsyncDispatchMixin, generics.CreateAPIView):
     """
     API endpoint for contact form submissions.
-    Accepts POST requests and sends email notification.
+    Accepts POST requests and queues email notifications.
     """
     queryset = ContactMessage.objects.all()
     serializer_class = ContactMessageSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [ContactRateThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        
-        # Save the contact message
-        contact_message = serializer.save()
-        
-        # Send email notification
+        # A repeated submission is answered without touching the database or mail
+        fingerprint = throttling.get_fingerprint(serializer.validated_data)
+        previous = throttling.claim_submission(fingerprint)
+        if previous is not None:
+            return self.get_duplicate_response(serializer, previous)
+        try:
+            self.perform_create(serializer)
+        except Exception:
+            throttling.release_submission(fingerprint)
+            raise
+        throttling.remember_submission(fingerprint, serializer.data)
+        return self.get_created_response(serializer)
+
+    async def async_post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        fingerprint = throttling.get_fingerprint(serializer.validated_data)
+        previous = await throttling.aclaim_submission(fingerprint)
+        if previous is not None:
+            return self.get_duplicate_response(serializer, previous)
         try:
-            site_settings = SiteSettings.load()
-            recipient_email = site_settings.email
-            
-            # Email to admin
-            admin_subject = f'New Contact Form Submission: {contact_message.subject}'
-            admin_message = f"""
-New contact form submission from Hydratech website:
-
-Name: {contact_message.name}
-Email: {contact_message.email}
-Phone: {contact_message.phone or 'Not provided'}
-Subject: {contact_message.subject}
-
-Message:
-{contact_message.message}
-
----
-Received at: {contact_message.created_at}
-            """
-            
-            send_mail(
-                admin_subject,
-                admin_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [recipient_email],
-                fail_silently=False,
-            )
-            
-            # Auto-reply to customer
-            customer_subject = 'Thank you for contacting Hydratech'
-            customer_message = f"""
-Dear {contact_message.name},
-
-Thank you for contacting Hydratech. We have received your message regarding "{contact_message.subject}".
-
-Our team will review your inquiry and get back to you as soon as possible.
-
-Best regards,
-Hydratech Team
-
----
-This is an automated response. Please do not reply to this email.
-            """
-            
-            send_mail(
-                customer_subject,
-                customer_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [contact_message.email],
-                fail_silently=True,
-            )
-            
-        except Exception as e:
-            print(f"Error sending email: {e}")
-            # Don't fail the request if email fails
-        
+            await sync_to_async(self.perform_create)(serializer)
+        except Exception:
+            await throttling.arelease_submission(fingerprint)
+            raise
+        await throttling.aremember_submission(fingerprint, serializer.data)
+        return self.get_created_response(serializer)
+
+    def perform_create(self, serializer):
+        # Save the contact message and queue its emails; the send_outbox
+        # command delivers them outside the request
+        with transaction.atomic():
+            contact_message = serializer.save()
+            queue_contact_emails(contact_message)
+
+    def get_created_response(self, serializer):
         headers = self.get_success_headers(serializer.data)
+        return self.get_success_response(serializer.data, status.HTTP_201_CREATED, headers)
+
+    def get_duplicate_response(self, serializer, previous):
+        # The first submission may still be saving; echo the submitted fields then
+        data = serializer.data if previous == throttling.PENDING else previous
+        return self.get_success_response(data, status.HTTP_200_OK)
+
+    def get_success_response(self, data, status_code, headers=None):
         return Response(
             {
                 'success': True,
                 'message': 'Thank you for your message. We will contact you soon!',
-                'data': serializer.data
+                'data': data
             },
-            status=status.HTTP_201_CREATED,
+            status=status_code,
             headers=headers
         )
@@ -3,14 +3,31 @@ ASGI config for hydratech_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serving through ASGI runs the content API on async views (``CONTENT_ASYNC_VIEWS``),
+so requests answered from the response cache never leave the event loop and
+slow clients don't each hold a worker thread. For example::
+
+    pip install uvicorn
+    uvicorn hydratech_backend.asgi:application --workers 4
+
+The ``benchmark_concurrency`` command compares this mode with WSGI. The
+Server-Sent Events stream at ``/api/changes/events/`` is only served here.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hydratech_backend.settings')
+os.environ.setdefault('CONTENT_ASYNC_VIEWS', '1')
+
+# What get_asgi_application() does, with a handler that serves event streams
+# without a thread each (see content/events.py)
+django.setup(set_prefix=False)
+
+from content.events import EventStreamASGIHandler  # noqa: E402
 
-application = get_asgi_application()
+application = EventStreamASGIHandler()
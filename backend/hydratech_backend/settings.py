@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,7 +51,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'content.middleware.ServerTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'content.middleware.ReplicaPinMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -80,13 +85,126 @@ WSGI_APPLICATION = 'hydratech_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# DATABASE_PROFILE picks the database setup:
+#   sqlite        the local file with SQLite's defaults, for development
+#   sqlite-tuned  the same file in WAL mode, so reads don't wait for writes,
+#                 with the SQLITE_PRAGMAS below and persistent connections
+#   postgresql    PostgreSQL, configured by the POSTGRES_* variables
+# The benchmark_concurrency command compares them (see --profile and --writers).
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'sqlite')
+
+# Set on every new SQLite connection (see content/database.py)
+SQLITE_PRAGMAS = {}
+
+if DATABASE_PROFILE in ('sqlite', 'sqlite-tuned'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+    if DATABASE_PROFILE == 'sqlite-tuned':
+        DATABASES['default'].update({
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            # Take the write lock when a transaction starts; a read transaction
+            # that later writes can fail with "database is locked" regardless
+            # of busy_timeout
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        })
+        SQLITE_PRAGMAS = {
+            'journal_mode': 'WAL',
+            # Safe in WAL mode; only a power loss can drop the last commits
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,  # milliseconds
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,  # KiB
+            'temp_store': 'MEMORY',
+        }
+elif DATABASE_PROFILE == 'postgresql':
+    # Requires: pip install "psycopg[binary,pool]"
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'hydratech'),
+            'USER': os.environ.get('POSTGRES_USER', 'hydratech'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+    if os.environ.get('POSTGRES_POOL', 'pgbouncer') == 'pgbouncer':
+        # PgBouncer in transaction mode shares server connections between
+        # workers. Keep the connection to PgBouncer open; server-side cursors
+        # don't survive PgBouncer moving the session between transactions.
+        DATABASES['default'].update({
+            'CONN_MAX_AGE': 600,
+            'DISABLE_SERVER_SIDE_CURSORS': True,
+        })
+    else:
+        # POSTGRES_POOL=psycopg: a connection pool in each worker process
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('POSTGRES_POOL_MIN', '2')),
+                'max_size': int(os.environ.get('POSTGRES_POOL_MAX', '10')),
+                'timeout': 10,
+            },
+        }
+else:
+    raise ImproperlyConfigured(f'Unknown DATABASE_PROFILE {DATABASE_PROFILE!r}')
+
+# Read replicas, which the public read-only API reads from (see content/database.py):
+#   SQLITE_REPLICAS         copies of the database file, comma-separated, e.g.
+#                           refreshed with: sqlite3 db.sqlite3 ".backup replica.sqlite3"
+#   POSTGRES_REPLICA_HOSTS  standby servers, comma-separated
+# They become the database aliases replica1, replica2, ...
+if DATABASE_PROFILE == 'postgresql':
+    replicas = [{'HOST': host} for host in os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',') if host]
+else:
+    # Read-only, so a missing copy fails to connect instead of being created empty
+    replicas = [
+        {'NAME': f'file:{path}?mode=ro', 'OPTIONS': {}}
+        for path in os.environ.get('SQLITE_REPLICAS', '').split(',') if path
+    ]
+DATABASE_REPLICAS = []
+for number, overrides in enumerate(replicas, 1):
+    DATABASES[f'replica{number}'] = dict(DATABASES['default'], **overrides, TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['content.database.ReplicaRouter']
+# Seconds that reads stay on the primary after a content change; should be
+# longer than the replicas ever lag behind. The pin is kept in the content
+# cache, which must be shared by every worker when replicas are configured
+# (system check content.E001, a warning with DEBUG).
+DATABASE_REPLICA_MAX_LAG = 10
+# Seconds before a replica that failed to connect is tried again
+DATABASE_REPLICA_RETRY = 30
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Use a shared backend (e.g. Redis or Memcached) in production so that
+# invalidations reach every worker process; LocMem is only correct with a
+# single worker (check --deploy warns about it, content.W002).
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hydratech',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
     }
 }
 
+# Response cache for the read-only content API (see content/cache.py)
+CONTENT_CACHE_ALIAS = 'default'
+CONTENT_CACHE_TIMEOUT = 60 * 60  # seconds
+# Cached JSON bodies from this size on are stored and sent Brotli- or
+# gzip-compressed, as the client accepts (see content/compression.py)
+COMPRESSION_MIN_SIZE = 1024  # bytes
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -137,6 +255,58 @@ STATICFILES_DIRS = [
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Static JSON snapshots of the API (see content/snapshots.py and the
+# export_snapshots command). SNAPSHOT_HOST is used for absolute media URLs.
+SNAPSHOT_ROOT = BASE_DIR / 'publish'
+SNAPSHOT_HOST = 'localhost'
+SNAPSHOT_SECURE = False
+# Re-render affected snapshot files after every committed content change,
+# on a background thread of the process that made it
+SNAPSHOT_AUTO_EXPORT = False
+
+# Responsive image renditions (see content/images.py and the process_images command)
+IMAGE_RENDITION_WIDTHS = [320, 640, 960, 1280]
+IMAGE_RENDITION_FORMATS = ['avif', 'webp', 'jpeg']
+
+# Per-request SQL, serializer and render timing (see content/timing.py). The
+# Server-Timing header is only sent to staff users and the listed addresses;
+# behind a reverse proxy REMOTE_ADDR is the proxy, so don't list it there.
+SERVER_TIMING_ENABLED = True
+SERVER_TIMING_ALLOWED_IPS = []
+# Minutes covered by the per-route aggregate shown by the timing_stats command
+SERVER_TIMING_WINDOW = 15
+
+# Serve the content API from async views (see AsyncDispatchMixin in
+# content/mixins.py). hydratech_backend/asgi.py turns this on; under WSGI the
+# views stay synchronous, since every async view would cost a thread hop.
+CONTENT_ASYNC_VIEWS = os.environ.get('CONTENT_ASYNC_VIEWS', '0') == '1'
+
+# Contact form protection (see content/throttling.py). Token buckets per client
+# address and for all clients together: capacity is the burst size, rate the
+# refill in submissions per minute. Behind a reverse proxy, set
+# REST_FRAMEWORK['NUM_PROXIES'] so clients are told apart by X-Forwarded-For.
+CONTACT_THROTTLE_BUCKETS = {
+    'ip': {'capacity': 5, 'rate': 2},
+    'global': {'capacity': 60, 'rate': 30},
+}
+# Seconds during which an identical submission is absorbed without saving it
+CONTACT_DEDUP_WINDOW = 10 * 60
+# Replied and archived messages older than this move to the archive table
+# when the archive_contacts command runs (see content/archive.py)
+CONTACT_ARCHIVE_AFTER_DAYS = 180
+
+# Tombstones of deleted content stay in the /api/changes/ feed this long;
+# the compact_changes command removes older ones (see content/changes.py)
+CHANGE_FEED_RETENTION_DAYS = 30
+# Server-Sent Events at /api/changes/events/ (see content/events.py). Each
+# ASGI process polls the change feed this often while clients are connected.
+CHANGE_EVENTS_POLL_INTERVAL = 1.0  # seconds
+CHANGE_EVENTS_HEARTBEAT = 15  # seconds between keepalive comments
+# Events a slow client may have waiting before it is sent a reset
+CHANGE_EVENTS_QUEUE_SIZE = 100
+# Most missed changes replayed to a reconnecting client; more get a reset
+CHANGE_EVENTS_REPLAY_LIMIT = 1000
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -147,7 +317,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'content.pagination.AsyncPageNumberPagination',
     'PAGE_SIZE': 20,
 }
 
@@ -20,14 +20,10 @@ const Home = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [servicesData, productsData, coursesData] = await Promise.all([
-          api.getServices(),
-          api.getProducts({ is_featured: true }),
-          api.getCourses({ is_featured: true }),
-        ]);
-        setServices(servicesData);
-        setProducts(productsData);
-        setCourses(coursesData);
+        const homeData = await api.getHome();
+        setServices(homeData.services);
+        setProducts(homeData.featured_products);
+        setCourses(homeData.featured_courses);
       } catch (error) {
         console.error('Error fetching data:', error);
       } finally {
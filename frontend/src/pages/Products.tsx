@@ -3,31 +3,32 @@ import { motion } from 'framer-motion';
 import { useTranslation } from 'react-i18next';
 import { useNavigate } from 'react-router-dom';
 import { useLanguage } from '../hooks/useLanguage';
-import { api } from '../services/api';
-import type { Product, ProductCategory } from '../types/api';
+import { api, CATALOGUE_PRODUCTS_LIMIT } from '../services/api';
+import type { CategoryProduct, ProductCategoryWithProducts } from '../types/api';
+
+interface MoreProducts {
+  products: CategoryProduct[];
+  next: string | null;
+}
 
 const Products = () => {
   const { t } = useTranslation();
   const { currentLanguage } = useLanguage();
   const navigate = useNavigate();
   
-  const [products, setProducts] = useState<Product[]>([]);
-  const [categories, setCategories] = useState<ProductCategory[]>([]);
+  const [categories, setCategories] = useState<ProductCategoryWithProducts[]>([]);
   const [selectedCategory, setSelectedCategory] = useState<string>('all');
   const [loading, setLoading] = useState(true);
+  // Pages of a category's products past those the catalogue embeds, by slug
+  const [morePages, setMorePages] = useState<Record<string, MoreProducts>>({});
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     const fetchData = async () => {
       try {
         setLoading(true);
-        const [productsData, categoriesData] = await Promise.all([
-          selectedCategory === 'all' 
-            ? api.getProducts() 
-            : api.getProducts({ category__slug: selectedCategory }),
-          api.getProductCategories(),
-        ]);
-        setProducts(productsData);
-        setCategories(categoriesData);
+        // Every category with its first products, in one request
+        setCategories(await api.getProductCatalogue());
       } catch (error) {
         console.error('Error fetching products:', error);
       } finally {
@@ -36,7 +37,55 @@ const Products = () => {
     };
 
     fetchData();
-  }, [selectedCategory]);
+  }, []);
+
+  const getCategoryProducts = (category: ProductCategoryWithProducts) => {
+    const seen = new Set<number>();
+    return [...category.products, ...(morePages[category.slug]?.products || [])].filter(
+      (product) => !seen.has(product.id) && seen.add(product.id)
+    );
+  };
+
+  const hasMoreProducts = (category: ProductCategoryWithProducts) => {
+    const more = morePages[category.slug];
+    return more ? more.next !== null : category.products.length >= CATALOGUE_PRODUCTS_LIMIT;
+  };
+
+  const loadMoreProducts = async (category: ProductCategoryWithProducts) => {
+    const known = new Set(getCategoryProducts(category).map((product) => product.id));
+    const loaded: CategoryProduct[] = [];
+    let next = morePages[category.slug]?.next;
+    // The first page repeats the embedded products; keep going until something is new
+    do {
+      const page = await api.getCategoryProductsPage(category.slug, next);
+      loaded.push(...page.results);
+      next = page.next;
+    } while (next && !loaded.some((product) => !known.has(product.id)));
+    setMorePages((pages) => ({
+      ...pages,
+      [category.slug]: { products: [...(pages[category.slug]?.products || []), ...loaded], next: next ?? null },
+    }));
+  };
+
+  const visibleCategories = categories.filter(
+    (category) => selectedCategory === 'all' || category.slug === selectedCategory
+  );
+  const expandableCategories = visibleCategories.filter(hasMoreProducts);
+
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      await Promise.all(expandableCategories.map(loadMoreProducts));
+    } catch (error) {
+      console.error('Error fetching products:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const products = visibleCategories
+    .flatMap((category) => getCategoryProducts(category).map((product) => ({ ...product, category })))
+    .sort((a, b) => a.order - b.order || a.name_en.localeCompare(b.name_en));
 
   const fadeInUp = {
     initial: { opacity: 0, y: 40 },
@@ -225,7 +274,7 @@ const Products = () => {
                           {currentLanguage === 'ar' ? 'الفئة' : 'Category'}
                         </p>
                         <p className="text-white text-sm">
-                          {currentLanguage === 'ar' ? product.category_name_ar : product.category_name_en}
+                          {currentLanguage === 'ar' ? product.category.name_ar : product.category.name_en}
                         </p>
                       </div>
                       <div className="w-px bg-primary-500/30"></div>
@@ -248,6 +297,21 @@ const Products = () => {
               ))}
             </motion.div>
           )}
+
+          {/* Load More */}
+          {!loading && expandableCategories.length > 0 && (
+            <div className="flex justify-center mt-12">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="px-8 py-3 rounded-lg font-semibold bg-primary-600 text-white hover:bg-primary-700 transition-colors disabled:opacity-50"
+              >
+                {loadingMore
+                  ? (currentLanguage === 'ar' ? 'جارٍ التحميل...' : 'Loading...')
+                  : (currentLanguage === 'ar' ? 'عرض المزيد' : 'Load More')}
+              </button>
+            </div>
+          )}
         </div>
       </section>
     </div>
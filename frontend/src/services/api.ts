@@ -1,16 +1,29 @@
-import type { Service, ProductCategory, Product, Course, SiteSettings, ThreeDPrintingProject } from '../types/api';
+import type {
+  Service, ProductCategory, ProductCategoryWithProducts, Product, Course, SiteSettings, ThreeDPrintingProject, HomeData,
+} from '../types/api';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
 
-export type { Service, ProductCategory, Product, Course, SiteSettings, ThreeDPrintingProject };
-interface PaginatedResponse<T> {
-  count: number;
+export type {
+  Service, ProductCategory, ProductCategoryWithProducts, Product, Course, SiteSettings, ThreeDPrintingProject, HomeData,
+};
+export interface PaginatedResponse<T> {
+  count?: number;
   next: string | null;
   previous: string | null;
   results: T[];
 }
 
+// Products embedded per category by getProductCatalogue; the API caps it at its page size
+export const CATALOGUE_PRODUCTS_LIMIT = 20;
+
 export const api = {
+  getHome: async (): Promise<HomeData> => {
+    const response = await fetch(`${API_BASE_URL}/home/`);
+    if (!response.ok) throw new Error('Failed to fetch homepage data');
+    return response.json();
+  },
+
   getServices: async (): Promise<Service[]> => {
     const response = await fetch(`${API_BASE_URL}/services/`);
     if (!response.ok) throw new Error('Failed to fetch services');
@@ -31,6 +44,29 @@ export const api = {
     return Array.isArray(data) ? data : data.results || [];
   },
 
+  // Every category, following the category list's `next` links, each with its first products embedded
+  getProductCatalogue: async (productsLimit = CATALOGUE_PRODUCTS_LIMIT): Promise<ProductCategoryWithProducts[]> => {
+    const categories: ProductCategoryWithProducts[] = [];
+    let url: string | null = `${API_BASE_URL}/product-categories/?expand=products&products_limit=${productsLimit}`;
+    while (url) {
+      const response = await fetch(url);
+      if (!response.ok) throw new Error('Failed to fetch product catalogue');
+      const data: ProductCategoryWithProducts[] | PaginatedResponse<ProductCategoryWithProducts> = await response.json();
+      if (Array.isArray(data)) return data;
+      categories.push(...(data.results || []));
+      url = data.next;
+    }
+    return categories;
+  },
+
+  // One page of a category's products; pass the previous page's `next` to continue
+  getCategoryProductsPage: async (slug: string, next?: string | null): Promise<PaginatedResponse<Product>> => {
+    const url = next || `${API_BASE_URL}/products/?category__slug=${encodeURIComponent(slug)}`;
+    const response = await fetch(url);
+    if (!response.ok) throw new Error('Failed to fetch products');
+    return response.json();
+  },
+
   getProducts: async (params?: {
     category__slug?: string;
     is_featured?: boolean;
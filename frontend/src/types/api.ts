@@ -31,12 +31,22 @@ export interface Product {
   description_en: string;
   description_ar: string;
   image: string | null;
+  image_width: number | null;
+  image_height: number | null;
+  image_srcset: Record<string, string> | null;
   is_featured: boolean;
   order: number;
   created_at: string;
   updated_at: string;
 }
 
+// A product embedded in its category by /product-categories/?expand=products
+export type CategoryProduct = Omit<Product, 'category' | 'category_name_en' | 'category_name_ar' | 'category_slug'>;
+
+export interface ProductCategoryWithProducts extends ProductCategory {
+  products: CategoryProduct[];
+}
+
 export interface Course {
   id: number;
   title_en: string;
@@ -76,6 +86,9 @@ export interface ThreeDPrintingProject {
   description_en: string;
   description_ar: string;
   image: string | null;
+  image_width: number | null;
+  image_height: number | null;
+  image_srcset: Record<string, string> | null;
   is_featured: boolean;
   material: string;
   print_time: string;
@@ -84,3 +97,10 @@ export interface ThreeDPrintingProject {
   updated_at: string;
 }
 
+
+export interface HomeData {
+  services: Service[];
+  featured_products: Product[];
+  featured_courses: Course[];
+  site_settings: SiteSettings;
+}